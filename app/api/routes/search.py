@@ -1,7 +1,12 @@
 from fastapi import APIRouter, status, Depends
 from typing import List
 
-from app.schemas.search import SearchRequest, SearchResult, IndexResponse
+from app.schemas.search import (
+    BatchSearchRequest,
+    SearchRequest,
+    SearchResult,
+    IndexResponse,
+)
 from app.api import deps
 from app.interfaces.services.search_service import ISearchService
 from app.interfaces.services.index_service import IIndexService
@@ -27,11 +32,29 @@ def index_library(
     "/libraries/{lib_id}/search",
     response_model=List[SearchResult],
     status_code=status.HTTP_200_OK,
-    description="Search a library using either keyword or k-NN vector search",
+    description="Search a library using keyword, exact k-NN or approximate (HNSW / IVF) vector search",
 )
 def search_library(
     lib_id: int,
     request: SearchRequest,
     service: ISearchService = Depends(deps.get_search_service),
 ) -> List[SearchResult]:
-    return service.search(request.search_type, lib_id, request.query, request.k)
+    return service.search(
+        request.search_type, lib_id, request.query, request.k, options=request
+    )
+
+
+@router.post(
+    "/libraries/{lib_id}/search/batch",
+    response_model=List[List[SearchResult]],
+    status_code=status.HTTP_200_OK,
+    description="Run several queries against a library in one request; results are returned in query order",
+)
+def search_library_batch(
+    lib_id: int,
+    request: BatchSearchRequest,
+    service: ISearchService = Depends(deps.get_search_service),
+) -> List[List[SearchResult]]:
+    return service.search_batch(
+        request.search_type, lib_id, request.queries, request.k, options=request
+    )
@@ -1,11 +1,46 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import field_validator
+from typing import Literal
+from pydantic import field_validator, model_validator
 
 
 class Settings(BaseSettings):
     COHERE_API_KEY: str
     EMBEDDING_MODEL: str = "embed-english-v3.0"
     DB_FILE: str = "default_db.jsonl"
+    ACTION_LOG_GROUP_BYTES: int = 1048576
+    ACTION_LOG_GROUP_WINDOW_MS: float = 0.0
+    ACTION_LOG_DURABILITY: Literal["none", "flush", "fsync-batched", "fsync-each"] = (
+        "flush"
+    )
+    ACTION_LOG_FSYNC_INTERVAL_MS: float = 100.0
+    CHECKPOINT_FILE: str = ""
+    CHECKPOINT_INTERVAL_S: float = 60.0
+    CHECKPOINT_MIN_LOG_BYTES: int = 67108864
+    KEYWORD_SCORING: Literal["count", "bm25"] = "bm25"
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    KEYWORD_POSTINGS_COMPRESSION: bool = False
+    KEYWORD_POSITIONS: bool = True
+    KEYWORD_MAX_EXPANSIONS: int = 1024
+    KEYWORD_INDEX_SNAPSHOT: str = ""
+    SEARCH_THREADS: int = 0
+    SEARCH_SHARD_MIN_ROWS: int = 65536
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 100
+    HNSW_EF_SEARCH: int = 64
+    IVF_NLIST: int = 0
+    IVF_NPROBE: int = 8
+    IVF_MIN_TRAIN_SIZE: int = 10000
+    IVF_RETRAIN_GROWTH: float = 2.0
+    VECTOR_DATA_DIR: str = ""
+    PQ_M: int = 64
+    QUANTIZATION_MIN_TRAIN_SIZE: int = 4096
+    RERANK_CANDIDATES: int = 100
+    LSH_BITS: int = 256
+    LSH_TABLES: int = 4
+    LSH_CANDIDATES: int = 1000
+    HYBRID_CANDIDATES: int = 50
+    HYBRID_RRF_K: int = 60
 
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", case_sensitive=False
@@ -21,6 +56,39 @@ class Settings(BaseSettings):
             return f"{v}.jsonl"
         return v
 
+    @field_validator("IVF_RETRAIN_GROWTH")
+    @classmethod
+    def ensure_retrain_growth(cls, v: float) -> float:
+        """Retraining at no growth would re-cluster a library on every write."""
+        if v <= 1:
+            raise ValueError("IVF_RETRAIN_GROWTH must be greater than 1")
+        return v
+
+    @model_validator(mode="after")
+    def default_vector_data_dir(self) -> "Settings":
+        """Keep quantized libraries' full-precision side files next to DB_FILE."""
+        if not self.VECTOR_DATA_DIR:
+            self.VECTOR_DATA_DIR = f"{self.DB_FILE.rsplit('.', 1)[0]}_vectors"
+        return self
+
+    @model_validator(mode="after")
+    def default_checkpoint_file(self) -> "Settings":
+        """Keep the action log checkpoint next to DB_FILE."""
+        if not self.CHECKPOINT_FILE:
+            self.CHECKPOINT_FILE = (
+                f"{self.DB_FILE.rsplit('.', 1)[0]}_checkpoint.snapshot"
+            )
+        return self
+
+    @model_validator(mode="after")
+    def default_keyword_index_snapshot(self) -> "Settings":
+        """Keep the keyword index snapshot next to DB_FILE."""
+        if not self.KEYWORD_INDEX_SNAPSHOT:
+            self.KEYWORD_INDEX_SNAPSHOT = (
+                f"{self.DB_FILE.rsplit('.', 1)[0]}_keyword.snapshot"
+            )
+        return self
+
 
 def get_settings() -> Settings:
     return Settings()
@@ -0,0 +1,42 @@
+from typing import Iterable, Optional, Set
+import numpy as np
+from app.core.math_utils import sorted_contains
+
+
+class ChunkFilter:
+    """Chunk ids a search may return: an optional allow-list minus an exclusion set.
+
+    Built once per request from the search filters and pushed down into the
+    indexes, so top-k is selected among eligible chunks only.
+    """
+
+    def __init__(
+        self, allowed: Optional[Iterable[int]] = None, excluded: Iterable[int] = ()
+    ):
+        self.allowed: Optional[Set[int]] = None if allowed is None else set(allowed)
+        self.excluded: Set[int] = set(excluded)
+        if self.allowed is not None:
+            self.allowed -= self.excluded
+            self.excluded = set()
+        self._sorted: Optional[np.ndarray] = None
+
+    def allows(self, chunk_id: int) -> bool:
+        if self.allowed is not None:
+            return chunk_id in self.allowed
+        return chunk_id not in self.excluded
+
+    def sorted_ids(self) -> np.ndarray:
+        """The allow-list (or, without one, the exclusions) as a sorted array."""
+        if self._sorted is None:
+            ids = self.excluded if self.allowed is None else self.allowed
+            self._sorted = np.sort(np.fromiter(ids, dtype=np.int64, count=len(ids)))
+        return self._sorted
+
+    def mask(self, chunk_ids: np.ndarray) -> np.ndarray:
+        """Which entries of a chunk id array (e.g. a posting list) the filter keeps."""
+        if self.allowed is None and not self.excluded:
+            return np.ones(chunk_ids.shape, dtype=bool)
+        present = sorted_contains(
+            self.sorted_ids(), chunk_ids.astype(np.int64, copy=False)
+        )
+        return present if self.allowed is not None else ~present
@@ -1,3 +1,4 @@
+import math
 import numpy as np
 
 
@@ -13,3 +14,112 @@ def cosine_similarity(v1: list[float], v2: list[float]) -> float:
         return 0.0
 
     return float(np.dot(a, b) / (norm_a * norm_b))
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale vectors (1-D or row-wise 2-D) to unit length, leaving zero vectors as zeros."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the k highest scores, best first."""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= scores.size:
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def pack_signs(projections: np.ndarray) -> np.ndarray:
+    """Pack the sign bits of each row of projections (width a multiple of 64) into uint64 words."""
+    bits = np.packbits(np.atleast_2d(projections) > 0, axis=1, bitorder="little")
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def hamming_distances(signatures: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Number of differing bits between the query signature and each column of
+    ``(words, n)`` packed signatures; one contiguous pass per word."""
+    distances = np.zeros(signatures.shape[1], dtype=np.int32)
+    for word, query_word in zip(signatures, query):
+        diff = np.bitwise_xor(word, query_word)
+        if hasattr(np, "bitwise_count"):
+            distances += np.bitwise_count(diff)
+        else:
+            distances += (
+                _POPCOUNT[diff.view(np.uint8)]
+                .reshape(-1, 8)
+                .sum(axis=1, dtype=np.int32)
+            )
+    return distances
+
+
+def assign_clusters(
+    vectors: np.ndarray,
+    centroids: np.ndarray,
+    spherical: bool = False,
+    batch_size: int = 8192,
+) -> np.ndarray:
+    """Return the index of the closest centroid for every row.
+
+    Spherical assignment maximizes the dot product (cosine on unit vectors);
+    otherwise squared euclidean distance is minimized.
+    """
+    offsets = None if spherical else 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], batch_size):
+        scores = vectors[start : start + batch_size] @ centroids.T
+        if offsets is not None:
+            scores -= offsets
+        labels[start : start + batch_size] = np.argmax(scores, axis=1)
+    return labels
+
+
+def kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 20,
+    spherical: bool = False,
+    seed: int = 0,
+) -> np.ndarray:
+    """Lloyd's k-means; returns an ``(n_clusters, dim)`` float32 centroid matrix."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, vectors.shape[0])
+    centroids = vectors[rng.choice(vectors.shape[0], n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = assign_clusters(vectors, centroids, spherical)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(vectors.shape[0], int(empty.sum()))]
+            counts[empty] = 1
+        centroids = sums / counts[:, None].astype(np.float32)
+        if spherical:
+            centroids = normalize(centroids)
+    return centroids
+
+
+def sorted_contains(haystack: np.ndarray, needles: np.ndarray) -> np.ndarray:
+    """Mask of the needles present in a sorted array: a binary search per needle
+    when the needles are few, a sort-merge otherwise."""
+    if haystack.size == 0 or needles.size == 0:
+        return np.zeros(needles.shape, dtype=bool)
+    if needles.size * math.log2(haystack.size + 1) < haystack.size + needles.size:
+        positions = np.minimum(np.searchsorted(haystack, needles), haystack.size - 1)
+        return haystack[positions] == needles
+    return np.isin(needles, haystack, assume_unique=True)
+
+
+def intersect_sorted(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Intersection of two sorted, duplicate-free arrays, probing the smaller
+    one into the larger."""
+    small, large = (a, b) if a.size <= b.size else (b, a)
+    return small[sorted_contains(large, small)]
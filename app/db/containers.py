@@ -1,18 +1,23 @@
 import threading
 from dependency_injector import containers, providers
 
+from app.db.hnsw_index import HnswIndex
 from app.db.id_generator import IdGenerator
 from app.db.inverted_index import InvertedIndex
+from app.db.ivf_index import IvfIndex
+from app.db.lsh_index import LshIndex
 from app.db.repositories.chunk_repository import ChunkRepository
 from app.db.repositories.document_repository import DocumentRepository
 from app.db.repositories.library_repository import LibraryRepository
 from app.db.repositories.search_repository import SearchRepository
 from app.db.storage.action_handler_registry import ActionHandlerRegistry
 from app.db.storage.action_logger import ActionLogger
+from app.db.storage.checkpoint import Checkpointer
 from app.db.storage.persistence_manager import PersistenceManager
 from app.db.storage.replay_mode_manager import RepositoryReplayModeManager
 from app.db.storage.storage import Storage
 from app.db.tokenization import DefaultTokenizationStrategy
+from app.db.vector_store import VectorStore
 
 
 class DbContainer(containers.DeclarativeContainer):
@@ -22,7 +27,14 @@ class DbContainer(containers.DeclarativeContainer):
     lock = providers.Factory(threading.RLock)
 
 
-    storage = providers.Singleton(Storage, file_path=config.DB_FILE)
+    storage = providers.Singleton(
+        Storage,
+        file_path=config.DB_FILE,
+        group_bytes=config.ACTION_LOG_GROUP_BYTES.as_int(),
+        group_window_ms=config.ACTION_LOG_GROUP_WINDOW_MS.as_float(),
+        durability=config.ACTION_LOG_DURABILITY,
+        fsync_interval_ms=config.ACTION_LOG_FSYNC_INTERVAL_MS.as_float(),
+    )
     action_logger = providers.Singleton(ActionLogger)
     persistence_manager = providers.Singleton(
         PersistenceManager, storage=storage, logger=action_logger
@@ -32,8 +44,51 @@ class DbContainer(containers.DeclarativeContainer):
     id_generator = providers.Singleton(IdGenerator)
     tokenization_strategy = providers.Singleton(DefaultTokenizationStrategy)
     inverted_index = providers.Singleton(
-        InvertedIndex, tokenization_strategy=tokenization_strategy
+        InvertedIndex,
+        tokenization_strategy=tokenization_strategy,
+        scoring=config.KEYWORD_SCORING,
+        k1=config.BM25_K1.as_float(),
+        b=config.BM25_B.as_float(),
+        compress=config.KEYWORD_POSTINGS_COMPRESSION,
+        positions=config.KEYWORD_POSITIONS,
+        max_expansions=config.KEYWORD_MAX_EXPANSIONS.as_int(),
+    )
+    vector_store = providers.Singleton(
+        VectorStore,
+        lock=lock,
+        data_dir=config.VECTOR_DATA_DIR,
+        pq_m=config.PQ_M.as_int(),
+        quantization_min_train_size=config.QUANTIZATION_MIN_TRAIN_SIZE.as_int(),
+        rerank=config.RERANK_CANDIDATES.as_int(),
+        search_threads=config.SEARCH_THREADS.as_int(),
+        shard_min_rows=config.SEARCH_SHARD_MIN_ROWS.as_int(),
+    )
+    hnsw_index = providers.Singleton(
+        HnswIndex,
+        vector_store=vector_store,
+        m=config.HNSW_M.as_int(),
+        ef_construction=config.HNSW_EF_CONSTRUCTION.as_int(),
+        ef_search=config.HNSW_EF_SEARCH.as_int(),
+        lock=lock,
+    )
+    ivf_index = providers.Singleton(
+        IvfIndex,
+        vector_store=vector_store,
+        nlist=config.IVF_NLIST.as_int(),
+        nprobe=config.IVF_NPROBE.as_int(),
+        min_train_size=config.IVF_MIN_TRAIN_SIZE.as_int(),
+        retrain_growth=config.IVF_RETRAIN_GROWTH.as_float(),
+        lock=lock,
+    )
+    lsh_index = providers.Singleton(
+        LshIndex,
+        vector_store=vector_store,
+        n_bits=config.LSH_BITS.as_int(),
+        candidates=config.LSH_CANDIDATES.as_int(),
+        lock=lock,
+        n_tables=config.LSH_TABLES.as_int(),
     )
+    vector_indexes = providers.List(vector_store, hnsw_index, ivf_index, lsh_index)
 
 
     document_repository = providers.Singleton(
@@ -49,7 +104,10 @@ class DbContainer(containers.DeclarativeContainer):
         storage=providers.Factory(dict),
         id_generator=id_generator,
         persistence_manager=persistence_manager,
+        vector_store=vector_store,
+        inverted_index=inverted_index,
         lock=lock,
+        vector_indexes=vector_indexes,
     )
 
     chunk_repository = providers.Singleton(
@@ -58,6 +116,8 @@ class DbContainer(containers.DeclarativeContainer):
         id_generator=id_generator,
         persistence_manager=persistence_manager,
         document_repository=document_repository,
+        vector_store=vector_store,
+        vector_indexes=vector_indexes,
         lock=lock,
     )
 
@@ -75,6 +135,20 @@ class DbContainer(containers.DeclarativeContainer):
 
     action_handler_registry = providers.Singleton(ActionHandlerRegistry)
 
+    checkpointer = providers.Singleton(
+        Checkpointer,
+        path=config.CHECKPOINT_FILE,
+        persistence_manager=persistence_manager,
+        library_repository=library_repository,
+        document_repository=document_repository,
+        chunk_repository=chunk_repository,
+        id_generator=id_generator,
+        interval_s=config.CHECKPOINT_INTERVAL_S.as_float(),
+        min_log_bytes=config.CHECKPOINT_MIN_LOG_BYTES.as_int(),
+        inverted_index=inverted_index,
+        keyword_index_path=config.KEYWORD_INDEX_SNAPSHOT,
+    )
+
     replay_mode_manager = providers.Singleton(
         RepositoryReplayModeManager, repositories=replayable_repositories
     )
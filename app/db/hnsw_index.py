@@ -0,0 +1,353 @@
+import heapq
+import math
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+import numpy as np
+from app.interfaces.indexing import IVectorIndex, IVectorStore
+from app.core.exceptions import ValidationError
+from app.core.filters import ChunkFilter
+from app.core.math_utils import normalize
+
+if TYPE_CHECKING:
+    from app.schemas.search import SearchOptions
+
+# (distance, node) pairs; distance is the negated cosine similarity.
+Candidate = Tuple[float, int]
+
+# Pending write recorded while a library's graph is being built: (chunk_id, vector or None for delete).
+PendingWrite = Tuple[int, Optional[np.ndarray]]
+
+
+class HnswGraph:
+    """Hierarchical navigable small-world graph over the embeddings of one library.
+
+    Nodes are append-only. Deleting or re-embedding a chunk tombstones its node:
+    tombstoned nodes still route searches but are never returned. A node's
+    vector and links exist before any link points to it, so searches can walk
+    the graph while it is being inserted into.
+    """
+
+    def __init__(self, dimension: int, m: int, ef_construction: int, seed: int = 0):
+        self.dimension = dimension
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.level_mult = 1 / math.log(m)
+        self.vectors = np.zeros((64, dimension), dtype=np.float32)
+        self.chunk_ids: List[int] = []
+        self.nodes: Dict[int, int] = {}
+        self.links: List[List[List[int]]] = []
+        self.deleted: Set[int] = set()
+        self.entry_point: Optional[int] = None
+        self.max_level = -1
+        self._random = random.Random(seed)
+
+    @property
+    def size(self) -> int:
+        return len(self.nodes)
+
+    def _distances(self, query: np.ndarray, nodes: List[int]) -> np.ndarray:
+        return -(self.vectors[nodes] @ query)
+
+    def _greedy_closest(
+        self, query: np.ndarray, entry: Candidate, top: int, bottom: int
+    ) -> Candidate:
+        """Descend from ``top`` to ``bottom`` always moving to the closest neighbour."""
+        best_dist, best = entry
+        for level in range(top, bottom - 1, -1):
+            changed = True
+            while changed:
+                changed = False
+                neighbours = self.links[best][level]
+                if not neighbours:
+                    continue
+                dists = self._distances(query, neighbours)
+                i = int(np.argmin(dists))
+                if dists[i] < best_dist:
+                    best_dist, best = float(dists[i]), neighbours[i]
+                    changed = True
+        return best_dist, best
+
+    def _search_layer(
+        self, query: np.ndarray, entries: List[Candidate], ef: int, level: int
+    ) -> List[Candidate]:
+        visited = {node for _, node in entries}
+        candidates = list(entries)
+        heapq.heapify(candidates)
+        found = [(-dist, node) for dist, node in entries]
+        heapq.heapify(found)
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if dist > -found[0][0]:
+                break
+            fresh = [n for n in self.links[node][level] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            for n, d in zip(fresh, self._distances(query, fresh).tolist()):
+                if len(found) < ef or d < -found[0][0]:
+                    heapq.heappush(candidates, (d, n))
+                    heapq.heappush(found, (-d, n))
+                    if len(found) > ef:
+                        heapq.heappop(found)
+        return sorted((-neg, node) for neg, node in found)
+
+    def _select_neighbours(self, candidates: List[Candidate], m: int) -> List[int]:
+        """Diversity heuristic: keep a candidate only if it is closer to the base
+        element than to every neighbour already selected, then top up with the
+        closest pruned candidates."""
+        if len(candidates) <= 1:
+            return [node for _, node in candidates]
+        nodes = [node for _, node in candidates]
+        vectors = self.vectors[nodes]
+        # Distance from each candidate to its closest already-selected neighbour.
+        closest = np.full(len(nodes), np.inf, dtype=np.float32)
+        selected: List[int] = []
+        pruned: List[int] = []
+        for i, (dist, node) in enumerate(candidates):
+            if len(selected) >= m:
+                break
+            if closest[i] < dist:
+                pruned.append(node)
+                continue
+            selected.append(node)
+            np.minimum(closest, -(vectors @ vectors[i]), out=closest)
+        return selected + pruned[: m - len(selected)]
+
+    def _shrink(self, node: int, level: int, limit: int) -> None:
+        neighbours = self.links[node][level]
+        dists = self._distances(self.vectors[node], neighbours).tolist()
+        self.links[node][level] = self._select_neighbours(
+            sorted(zip(dists, neighbours)), limit
+        )
+
+    def _append_vector(self, vector: np.ndarray) -> int:
+        node = len(self.chunk_ids)
+        if node == self.vectors.shape[0]:
+            grown = np.zeros((2 * node, self.dimension), dtype=np.float32)
+            grown[:node] = self.vectors
+            self.vectors = grown
+        self.vectors[node] = vector
+        return node
+
+    def insert(self, chunk_id: int, vector: np.ndarray) -> None:
+        self.delete(chunk_id)
+        node = self._append_vector(vector)
+        level = int(-math.log(1.0 - self._random.random()) * self.level_mult)
+        self.chunk_ids.append(chunk_id)
+        self.nodes[chunk_id] = node
+        self.links.append([[] for _ in range(level + 1)])
+
+        if self.entry_point is None:
+            self.entry_point, self.max_level = node, level
+            return
+
+        entry = (
+            float(self._distances(vector, [self.entry_point])[0]),
+            self.entry_point,
+        )
+        entry = self._greedy_closest(vector, entry, self.max_level, level + 1)
+        entries = [entry]
+        for lc in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(vector, entries, self.ef_construction, lc)
+            limit = self.m0 if lc == 0 else self.m
+            neighbours = self._select_neighbours(found, self.m)
+            self.links[node][lc] = neighbours
+            for neighbour in neighbours:
+                self.links[neighbour][lc].append(node)
+                if len(self.links[neighbour][lc]) > limit:
+                    self._shrink(neighbour, lc, limit)
+            entries = found
+
+        if level > self.max_level:
+            self.entry_point, self.max_level = node, level
+
+    def delete(self, chunk_id: int) -> None:
+        node = self.nodes.pop(chunk_id, None)
+        if node is not None:
+            self.deleted.add(node)
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        ef: int,
+        chunk_filter: Optional[ChunkFilter] = None,
+    ) -> List[Tuple[int, float]]:
+        entry_point = self.entry_point
+        if entry_point is None or not self.nodes:
+            return []
+        # An insert may raise max_level between the two reads; start no higher
+        # than the entry point's own top level.
+        top = min(self.max_level, len(self.links[entry_point]) - 1)
+        entry = (float(self._distances(query, [entry_point])[0]), entry_point)
+        entry = self._greedy_closest(query, entry, top, 1)
+        ef = max(ef, k)
+        while True:
+            found = self._search_layer(query, [entry], ef, 0)
+            results = []
+            for dist, node in found:
+                if node in self.deleted:
+                    continue
+                chunk_id = self.chunk_ids[node]
+                if chunk_filter is not None and not chunk_filter.allows(chunk_id):
+                    continue
+                results.append((chunk_id, -dist))
+                if len(results) == k:
+                    return results
+            # Tombstones or filtered-out nodes took up the beam: widen it until
+            # k live results are found or the whole graph has been visited.
+            if ef >= len(self.chunk_ids):
+                return results
+            ef *= 2
+
+
+class HnswIndex(IVectorIndex):
+    """Approximate k-NN index keeping one HNSW graph per library.
+
+    A library's graph is built by a background job, scheduled on its first
+    HNSW query, from a snapshot of the vector store; writes that land during
+    the build are replayed onto the graph before it is swapped in. From then
+    on the graph is maintained incrementally, so libraries that are never
+    searched this way cost nothing at write or replay time. Until its graph
+    is ready, a library is searched exactly. Graphs whose tombstones outnumber
+    their live nodes are rebuilt the same way and keep serving meanwhile.
+
+    Filtered queries skip ineligible nodes while collecting results. When the
+    allow-list is no larger than ``ef`` or the graph walk yields fewer than
+    ``k`` eligible chunks, the query is answered exactly by the vector store.
+    """
+
+    def __init__(
+        self,
+        vector_store: IVectorStore,
+        m: int,
+        ef_construction: int,
+        ef_search: int,
+        lock: threading.RLock,
+    ):
+        self.vector_store = vector_store
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.graphs: Dict[int, HnswGraph] = {}
+        self.lock = lock
+        self._pending: Dict[int, List[PendingWrite]] = {}
+        self._building: Dict[int, Future] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="hnsw-build"
+        )
+
+    def _schedule_build(self, library_id: int) -> None:
+        if library_id not in self._building:
+            self._pending[library_id] = []
+            self._building[library_id] = self._executor.submit(self.build, library_id)
+
+    def _record(
+        self, library_id: int, chunk_id: int, vector: Optional[np.ndarray]
+    ) -> None:
+        pending = self._pending.get(library_id)
+        if pending is not None:
+            pending.append((chunk_id, vector))
+
+    def build(self, library_id: int) -> None:
+        """Build a graph over the current vectors of a library and atomically swap it in."""
+        try:
+            chunk_ids, matrix = self.vector_store.get_vectors(library_id)
+            if not len(chunk_ids):
+                return
+            graph = HnswGraph(matrix.shape[1], self.m, self.ef_construction)
+            for chunk_id, vector in zip(chunk_ids.tolist(), matrix):
+                graph.insert(chunk_id, vector)
+            with self.lock:
+                if not self.vector_store.count(library_id):
+                    return  # The library was dropped during the build.
+                for chunk_id, vector in self._pending.get(library_id, []):
+                    if vector is None or vector.shape[0] != graph.dimension:
+                        graph.delete(chunk_id)
+                    else:
+                        graph.insert(chunk_id, vector)
+                self.graphs[library_id] = graph
+        finally:
+            with self.lock:
+                self._pending.pop(library_id, None)
+                self._building.pop(library_id, None)
+
+    def wait_for_build(self, library_id: int, timeout: Optional[float] = None) -> None:
+        with self.lock:
+            future = self._building.get(library_id)
+        if future is not None:
+            future.result(timeout)
+
+    def add(self, library_id: int, chunk_id: int, embedding: List[float]) -> None:
+        with self.lock:
+            graph = self.graphs.get(library_id)
+            if graph is None and library_id not in self._building:
+                return
+            vector = normalize(embedding)
+            self._record(library_id, chunk_id, vector)
+            if graph is None:
+                return
+            if vector.shape[0] != graph.dimension:
+                del self.graphs[library_id]
+                return
+            graph.insert(chunk_id, vector)
+
+    def remove(self, library_id: int, chunk_id: int) -> None:
+        with self.lock:
+            self._record(library_id, chunk_id, None)
+            graph = self.graphs.get(library_id)
+            if graph is None:
+                return
+            graph.delete(chunk_id)
+            if len(graph.deleted) > graph.size:
+                self._schedule_build(library_id)
+
+    def drop_library(self, library_id: int) -> None:
+        with self.lock:
+            self.graphs.pop(library_id, None)
+            self._pending.pop(library_id, None)
+            future = self._building.pop(library_id, None)
+            if future is not None:
+                future.cancel()
+
+    def search(
+        self,
+        library_id: int,
+        query_embedding: List[float],
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        chunk_filter: Optional[ChunkFilter] = None,
+    ) -> List[Tuple[int, float]]:
+        query = normalize(query_embedding)
+        ef = self.ef_search
+        if options is not None and options.ef_search is not None:
+            ef = options.ef_search
+        if chunk_filter is not None and chunk_filter.allowed is not None:
+            if len(chunk_filter.allowed) <= max(ef, k):
+                return self.vector_store.search(
+                    library_id, query_embedding, k, options, chunk_filter
+                )
+        with self.lock:
+            graph = self.graphs.get(library_id)
+            if graph is None:
+                self._schedule_build(library_id)
+        # Searched outside the lock: exact search takes the vector store's own
+        # lock, and the graph stays walkable while writers insert into it.
+        if graph is None:
+            return self.vector_store.search(
+                library_id, query_embedding, k, options, chunk_filter
+            )
+        if query.shape[0] != graph.dimension:
+            raise ValidationError(
+                f"expected {graph.dimension} dimensions, got {query.shape[0]}",
+                field="query",
+            )
+        results = graph.search(query, k, ef, chunk_filter)
+        if chunk_filter is not None and len(results) < k:
+            return self.vector_store.search(
+                library_id, query_embedding, k, options, chunk_filter
+            )
+        return results
@@ -1,3 +1,4 @@
+from typing import Tuple
 from app.interfaces.id_generation import IIdGenerator
 
 
@@ -33,3 +34,7 @@ class IdGenerator(IIdGenerator):
     def set_chunk_id(self, value: int) -> None:
         if value >= self.chunk_num:
             self.chunk_num = value + 1
+
+    def get_next_ids(self) -> Tuple[int, int, int]:
+        """The next library, document and chunk ids to be handed out."""
+        return self.lib_num, self.doc_num, self.chunk_num
@@ -0,0 +1,83 @@
+import json
+import os
+import struct
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+MAGIC = b"VDBSNAP\x00"
+# Bumped whenever the layout of the header or of any array changes; older
+# snapshots (keyword index or checkpoint) are then ignored and rebuilt from
+# the log.
+VERSION = 1
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGNMENT = 8
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
+
+
+def fsync_directory(path: str) -> None:
+    """Make a rename to, or the creation of, ``path`` durable by syncing the
+    directory entry that names it."""
+    fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_snapshot(
+    path: str, header: Dict[str, Any], arrays: Dict[str, np.ndarray]
+) -> None:
+    """Write named arrays after a JSON header: magic, version and header size,
+    the header (listing each array's offset, dtype and size), then the arrays
+    8-byte aligned so they can be viewed in place once memory-mapped. The file
+    is written aside and renamed over ``path`` so a crash never leaves a torn
+    snapshot behind; the rename is synced before returning."""
+    layout: Dict[str, Tuple[int, str, int]] = {}
+    offset = 0
+    for name, values in arrays.items():
+        layout[name] = (offset, values.dtype.str, int(values.size))
+        offset = _aligned(offset + values.nbytes)
+    encoded = json.dumps({**header, "arrays": layout}).encode("utf-8")
+    body = _aligned(_PREAMBLE.size + len(encoded))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(encoded)))
+        f.write(encoded)
+        f.write(b"\0" * (body - _PREAMBLE.size - len(encoded)))
+        for name, values in arrays.items():
+            f.write(np.ascontiguousarray(values).data)
+            f.write(b"\0" * (_aligned(values.nbytes) - values.nbytes))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    fsync_directory(path)
+
+
+def read_snapshot(path: str) -> Optional[Tuple[Dict[str, Any], Dict[str, np.ndarray]]]:
+    """The header and arrays of a snapshot, the arrays being read-only views
+    of one memory map, or None if the file is missing, truncated or was
+    written by another version."""
+    try:
+        with open(path, "rb") as f:
+            magic, version, size = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC or version != VERSION:
+                return None
+            header = json.loads(f.read(size).decode("utf-8"))
+        body = _aligned(_PREAMBLE.size + size)
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        arrays = {}
+        for name, (offset, dtype, count) in header.pop("arrays").items():
+            dtype = np.dtype(dtype)
+            start = body + offset
+            end = start + count * dtype.itemsize
+            if end > data.size:
+                return None
+            arrays[name] = data[start:end].view(dtype)
+        return header, arrays
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
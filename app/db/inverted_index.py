@@ -1,38 +1,1074 @@
-from typing import Dict, Set
+import math
+import threading
+from array import array
+from typing import (
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+import numpy as np
+from app.core.filters import ChunkFilter
+from app.core.math_utils import intersect_sorted, sorted_contains, top_k_indices
+from app.db.keyword_query import (
+    And,
+    Clause,
+    Fuzzy,
+    Near,
+    Not,
+    Phrase,
+    Term,
+    Wildcard,
+    clause_words,
+    parse_query,
+)
+from app.db.index_snapshot import read_snapshot, write_snapshot
+from app.db.postings import BLOCK_SIZE, PostingList
+from app.db.term_dictionary import TermDictionary
+from app.db.tokenization import ANALYZERS, get_analyzer
+from app.db.trigram_index import TrigramIndex
+from app.db.vocabulary import Vocabulary
 from app.interfaces.indexing import IInvertedIndex, ITokenizationStrategy
 
+_EMPTY = (np.empty(0, dtype=np.uint32), np.empty(0))
+
+
+def term_positions(terms: Iterable[Hashable]) -> Dict[Hashable, List[int]]:
+    """Each distinct term (or term id) of a token sequence with the positions
+    it occurs at."""
+    positions: Dict[Hashable, List[int]] = {}
+    for position, term in enumerate(terms):
+        positions.setdefault(term, []).append(position)
+    return positions
+
+
+class IndexPartition:
+    """Postings and BM25 statistics of one library. Terms are interned in a
+    vocabulary, and posting lists are kept in a list indexed by term id. A
+    term's document frequency is the size of its posting list.
+
+    A forward map keeps each chunk's token sequence as an array of term ids,
+    so removing a chunk needs no text and re-indexing one only rewrites the
+    postings whose frequency (or positions, when positional) changed, besides
+    dropping the terms it lost. A chunk's length is the size of its array.
+    """
+
+    def __init__(self, compress: bool = False, positional: bool = False):
+        self.compress = compress
+        self.positional = positional
+        self.vocabulary = Vocabulary()
+        self.postings: List[Optional[PostingList]] = []
+        self.terms = TermDictionary()
+        self.trigrams = TrigramIndex()
+        self.forward: Dict[int, array] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.forward)
+
+    @property
+    def average_length(self) -> float:
+        return self.total_length / len(self.forward) if self.forward else 0.0
+
+    def posting_list(self, word: str) -> Optional[PostingList]:
+        term_id = self.vocabulary.get(word)
+        return None if term_id is None else self.postings[term_id]
+
+    def document_frequency(self, word: str) -> int:
+        term_id = self.vocabulary.get(word)
+        return 0 if term_id is None else len(self.postings[term_id])
+
+    def idf(self, word: str) -> float:
+        df = self.document_frequency(word)
+        return math.log(1 + (len(self.forward) - df + 0.5) / (df + 0.5))
+
+    def add(self, chunk_id: int, terms: List[str]) -> None:
+        positions = term_positions(terms)
+        ids = dict(zip(positions, self.vocabulary.add_all(list(positions))))
+        if self.vocabulary.capacity > len(self.postings):
+            self.postings.extend(
+                [None] * (self.vocabulary.capacity - len(self.postings))
+            )
+        term_ids = array("I", map(ids.__getitem__, terms))
+        positions = dict(zip(ids.values(), positions.values()))
+        length = len(term_ids)
+        previous: Dict[int, List[int]] = {}
+        if chunk_id in self.forward:
+            self.total_length -= len(self.forward[chunk_id])
+            previous = term_positions(self.forward[chunk_id])
+            self._remove_terms(chunk_id, [t for t in previous if t not in positions])
+        self.forward[chunk_id] = term_ids
+        self.total_length += length
+        for term_id, term_positions_ in positions.items():
+            postings = self.postings[term_id]
+            if postings is None:
+                postings = self.postings[term_id] = PostingList(
+                    self.compress, self.positional
+                )
+                term = self.vocabulary.term(term_id)
+                self.terms.add(term)
+                self.trigrams.add(term)
+            elif term_id in previous and (
+                previous[term_id] == term_positions_
+                if self.positional
+                else len(previous[term_id]) == len(term_positions_)
+            ):
+                # Unchanged posting: only its length bounds may need lowering.
+                postings.lower_length(chunk_id, length)
+                continue
+            postings.add(chunk_id, len(term_positions_), length, term_positions_)
+
+    def remove(self, chunk_id: int) -> None:
+        term_ids = self.forward.pop(chunk_id, None)
+        if term_ids is None:
+            return
+        self._remove_terms(chunk_id, set(term_ids))
+        self.total_length -= len(term_ids)
+
+    def _remove_terms(self, chunk_id: int, term_ids: Iterable[int]) -> None:
+        for term_id in term_ids:
+            postings = self.postings[term_id]
+            if postings is None or not postings.remove(chunk_id):
+                continue
+            if not postings:
+                term = self.vocabulary.term(term_id)
+                self.postings[term_id] = None
+                self.vocabulary.release(term_id)
+                self.terms.remove(term)
+                self.trigrams.remove(term)
+
+    def merge(self) -> None:
+        for postings in self.postings:
+            if postings is not None:
+                postings.merge()
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The partition as flat arrays for a snapshot: the live terms sorted
+        (renumbered in that order), the forward map as chunk ids, lengths and
+        concatenated term ids, and each posting list's merged encoded parts
+        concatenated with their end offsets and bookkeeping."""
+        terms = sorted(self.vocabulary)
+        renumber = np.zeros(self.vocabulary.capacity, dtype=np.uint32)
+        old_ids = np.array(
+            [self.vocabulary.get(term) for term in terms], dtype=np.int64
+        )
+        renumber[old_ids] = np.arange(len(terms), dtype=np.uint32)
+        forward = np.frombuffer(
+            b"".join(map(bytes, self.forward.values())), dtype=np.uint32
+        )
+        states = [self.postings[term_id].frozen_state() for term_id in old_ids.tolist()]
+        sizes = [len(self.postings[term_id]) for term_id in old_ids.tolist()]
+        arrays = {
+            "terms": np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+            "chunk_ids": np.fromiter(
+                self.forward, dtype=np.uint32, count=len(self.forward)
+            ),
+            "lengths": np.fromiter(
+                map(len, self.forward.values()),
+                dtype=np.uint32,
+                count=len(self.forward),
+            ),
+            "tokens": renumber[forward],
+            "sizes": np.array(sizes, dtype=np.uint32),
+            "last": np.array([state[3] for state in states], dtype=np.int64),
+            "max_frequencies": np.array(
+                [state[4] for state in states], dtype=np.uint16
+            ),
+            "min_lengths": np.array([state[5] for state in states], dtype=np.uint32),
+        }
+        for part, name in enumerate(("ids", "frequencies", "positions")):
+            encoded = [state[part] for state in states]
+            arrays[name] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+            arrays[f"{name}_ends"] = np.cumsum(
+                [len(data) for data in encoded], dtype=np.uint64
+            )
+        return arrays
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Dict[str, np.ndarray],
+        compress: bool = False,
+        positional: bool = False,
+    ) -> "IndexPartition":
+        """A partition from ``to_arrays``. Posting lists keep pointing into the
+        given arrays (a memory-mapped snapshot) until they are next merged."""
+        partition = cls(compress, positional)
+        terms = (
+            arrays["terms"].tobytes().decode("utf-8").split("\n")
+            if arrays["terms"].size
+            else []
+        )
+        partition.vocabulary = Vocabulary.from_terms(terms)
+        partition.terms.add_all(terms)
+        partition.trigrams.add_all(terms)
+
+        parts = []
+        for name in ("ids", "frequencies", "positions"):
+            ends = arrays[f"{name}_ends"].tolist()
+            data = memoryview(arrays[name])
+            parts.append([data[start:end] for start, end in zip([0] + ends, ends)])
+        partition.postings = [
+            PostingList.from_frozen_state(compress, positional, size, state)
+            for size, *state in zip(
+                arrays["sizes"].tolist(),
+                *parts,
+                arrays["last"].tolist(),
+                arrays["max_frequencies"].tolist(),
+                arrays["min_lengths"].tolist(),
+            )
+        ]
+
+        tokens = memoryview(arrays["tokens"]).cast("B")
+        end = 0
+        for chunk_id, length in zip(
+            arrays["chunk_ids"].tolist(), arrays["lengths"].tolist()
+        ):
+            term_ids = array("I")
+            term_ids.frombytes(tokens[4 * end : 4 * (end + length)])
+            partition.forward[chunk_id] = term_ids
+            end += length
+        partition.total_length = end
+        return partition
+
 
 class InvertedIndex(IInvertedIndex):
-    def __init__(self, tokenization_strategy: ITokenizationStrategy):
+    """Term -> posting list (sorted chunk ids and term frequencies), partitioned
+    by library.
+
+    Each library owns its postings and statistics, so a search only touches the
+    target library and dropping a library is a single dictionary delete.
+    ``scoring="count"`` scores a chunk by how many distinct query words it
+    contains; ``scoring="bm25"`` ranks with Okapi BM25 using the library's
+    document frequencies and average chunk length, all updated incrementally.
+    Posting lists are scored as arrays, with chunk lengths kept in an array
+    indexed by chunk id. Re-indexing a chunk replaces its previous text,
+    updating only the postings that changed, and removing one needs no text.
+
+    Queries are made of words, ``"quoted phrases"``, ``prefix*`` and
+    ``word~n`` terms, ``a NEAR/n b`` proximity clauses and ``AND``/``OR``/``NOT``
+    with parentheses (see ``parse_query``). Wildcards expand through the
+    library's sorted term dictionary and fuzzy terms through a trigram index of
+    its vocabulary; a chunk scores its best expansion, fuzzy ones discounted
+    by ``1 / (1 + edits)``. Boolean clauses are evaluated as a plan over posting
+    lists: an AND starts from its most selective operand and only probes the
+    others for the chunks left, and NOT probes the chunks matched so far. With ``positions`` enabled, postings keep token
+    positions and phrase/proximity clauses are checked on the candidates
+    common to all their words; otherwise they match any chunk containing all
+    their words. A phrase or proximity match scores like a term whose idf is
+    the sum of its words' and whose frequency is the number of matches.
+
+    Given ``k``, a query is evaluated with MaxScore: terms are visited from the
+    highest score upper bound down (phrase and proximity clauses are
+    evaluated up front, giving exact bounds), and once the remaining bounds cannot
+    lift an unseen chunk past the current k-th score, their posting lists are
+    only probed (by binary search) for the surviving candidates instead of
+    being scanned. Candidates that cannot reach the k-th score are dropped.
+    Within a term that must still be scanned, BM25 first scores the posting
+    blocks with the highest bounds (from each block's largest frequency and
+    shortest chunk), then skips the blocks whose bound cannot reach the k-th
+    score found (block-max pruning), so even a single frequent term need not
+    score its whole list.
+
+    The index can be saved to and loaded from a memory-mapped binary snapshot
+    tied to an offset in the action log (``save_snapshot``/``load_snapshot``).
+    """
+
+    def __init__(
+        self,
+        tokenization_strategy: ITokenizationStrategy,
+        scoring: str = "count",
+        k1: float = 1.2,
+        b: float = 0.75,
+        compress: bool = False,
+        positions: bool = False,
+        max_expansions: int = 1024,
+        lock: Optional[threading.RLock] = None,
+    ):
         self._tokenization_strategy = tokenization_strategy
-        self.index: Dict[str, Set[int]] = {}
-
-    def _tokenize(self, text: str) -> Set[str]:
-        return self._tokenization_strategy.tokenize(text)
-
-    def index_chunk(self, chunk_id: int, text: str) -> None:
-        words = self._tokenize(text)
-        for word in words:
-            if word not in self.index:
-                self.index[word] = set()
-            self.index[word].add(chunk_id)
-
-    def remove_chunk(self, chunk_id: int, text: str) -> None:
-        words = self._tokenize(text)
-        for word in words:
-            if word in self.index:
-                self.index[word].discard(chunk_id)
-                if not self.index[word]:
-                    del self.index[word]
-
-    def search_word(self, query: str) -> Dict[int, int]:
-        query_words = self._tokenize(query)
-        if not query_words:
-            return {}
-
-        scores: Dict[int, int] = {}
-        for word in query_words:
-            if word in self.index:
-                for chunk_id in self.index[word]:
-                    scores[chunk_id] = scores.get(chunk_id, 0) + 1
-        return scores
+        self.scoring = scoring
+        self.k1 = k1
+        self.b = b
+        self.compress = compress
+        self.positions = positions
+        self.max_expansions = max_expansions
+        self.partitions: Dict[Optional[int], IndexPartition] = {}
+        self._analyzers: Dict[Optional[int], ITokenizationStrategy] = {}
+        self._chunk_lengths = np.zeros(64, dtype=np.uint32)
+        # Writes made while a library is re-indexed under a new analyzer.
+        self._journals: Dict[int, Dict[int, Optional[str]]] = {}
+        self.lock = lock or threading.RLock()
+
+    def _analyzer(self, library_id: Optional[int]) -> ITokenizationStrategy:
+        return self._analyzers.get(library_id, self._tokenization_strategy)
+
+    def set_analyzer(
+        self,
+        library_id: int,
+        analyzer: str,
+        chunks: Optional[Callable[[], Sequence[Tuple[int, str]]]] = None,
+    ) -> None:
+        """Select a library's analysis pipeline by name (see ``ANALYZERS``;
+        ``"default"`` is this index's own strategy). Switching pipelines drops
+        the library's postings, so its chunks must be indexed again.
+
+        Given ``chunks``, a callable returning the library's (chunk id, text)
+        pairs, the library is instead re-indexed into a new partition while
+        searches go on against the old one, and the pipeline and partition are
+        swapped in together. Chunks indexed or removed in the meantime are
+        journaled and replayed onto the new partition before the swap."""
+        strategy = (
+            self._tokenization_strategy
+            if analyzer == "default"
+            else get_analyzer(analyzer)
+        )
+        with self.lock:
+            # A later switch supersedes one still re-indexing.
+            self._journals.pop(library_id, None)
+            if strategy is self._analyzer(library_id):
+                return
+            if chunks is None:
+                self._install_analyzer(library_id, strategy)
+                self.partitions.pop(library_id, None)
+                return
+            journal: Dict[int, Optional[str]] = {}
+            self._journals[library_id] = journal
+        try:
+            pairs = chunks()
+            partition = IndexPartition(self.compress, self.positions)
+            batch = strategy.tokenize_many([text for _, text in pairs])
+            for (chunk_id, _), terms in zip(pairs, batch):
+                partition.add(chunk_id, terms)
+        except Exception:
+            with self.lock:
+                if self._journals.get(library_id) is journal:
+                    del self._journals[library_id]
+            raise
+        with self.lock:
+            if self._journals.get(library_id) is not journal:
+                return  # Dropped, or switched again, while re-indexing.
+            del self._journals[library_id]
+            for chunk_id, text in journal.items():
+                if text is None:
+                    partition.remove(chunk_id)
+                else:
+                    partition.add(chunk_id, strategy.terms(text))
+            self._install_analyzer(library_id, strategy)
+            self.partitions.pop(library_id, None)
+            if partition:
+                self.partitions[library_id] = partition
+                for chunk_id, term_ids in partition.forward.items():
+                    self._set_length(chunk_id, len(term_ids))
+
+    def _install_analyzer(
+        self, library_id: int, strategy: ITokenizationStrategy
+    ) -> None:
+        if strategy is self._tokenization_strategy:
+            self._analyzers.pop(library_id, None)
+        else:
+            self._analyzers[library_id] = strategy
+
+    def index_chunk(
+        self, chunk_id: int, text: str, library_id: Optional[int] = None
+    ) -> None:
+        strategy = self._analyzer(library_id)
+        terms = strategy.terms(text)
+        with self.lock:
+            if self._analyzer(library_id) is not strategy:
+                terms = self._analyzer(library_id).terms(text)
+            self._add(library_id, chunk_id, terms)
+            self._journal(library_id, chunk_id, text)
+
+    def index_chunks(
+        self, chunks: Sequence[Tuple[int, str]], library_id: Optional[int] = None
+    ) -> None:
+        """Index (chunk id, text) pairs of one library, analyzing the texts
+        in one batch."""
+        texts = [text for _, text in chunks]
+        strategy = self._analyzer(library_id)
+        batch = strategy.tokenize_many(texts)
+        with self.lock:
+            if self._analyzer(library_id) is not strategy:
+                # The library switched pipelines while the batch was analyzed.
+                batch = self._analyzer(library_id).tokenize_many(texts)
+            for (chunk_id, text), terms in zip(chunks, batch):
+                self._add(library_id, chunk_id, terms)
+                self._journal(library_id, chunk_id, text)
+
+    def _journal(
+        self, library_id: Optional[int], chunk_id: int, text: Optional[str]
+    ) -> None:
+        journal = self._journals.get(library_id)
+        if journal is not None:
+            journal[chunk_id] = text
+
+    def _add(self, library_id: Optional[int], chunk_id: int, terms: List[str]) -> None:
+        partition = self.partitions.get(library_id)
+        if partition is None:
+            partition = self.partitions[library_id] = IndexPartition(
+                self.compress, self.positions
+            )
+        partition.add(chunk_id, terms)
+        self._set_length(chunk_id, len(partition.forward[chunk_id]))
+
+    def _set_length(self, chunk_id: int, length: int) -> None:
+        if chunk_id >= self._chunk_lengths.size:
+            lengths = np.zeros(
+                max(chunk_id + 1, 2 * self._chunk_lengths.size), dtype=np.uint32
+            )
+            lengths[: self._chunk_lengths.size] = self._chunk_lengths
+            self._chunk_lengths = lengths
+        self._chunk_lengths[chunk_id] = length
+
+    def remove_chunk(self, chunk_id: int, library_id: Optional[int] = None) -> None:
+        with self.lock:
+            if library_id is None:
+                library_id = next(
+                    (
+                        lid
+                        for lid, p in self.partitions.items()
+                        if chunk_id in p.forward
+                    ),
+                    None,
+                )
+            self._journal(library_id, chunk_id, None)
+            partition = self.partitions.get(library_id)
+            if partition is None:
+                return
+            partition.remove(chunk_id)
+            if not partition:
+                del self.partitions[library_id]
+
+    def drop_library(self, library_id: int) -> None:
+        with self.lock:
+            self.partitions.pop(library_id, None)
+            self._analyzers.pop(library_id, None)
+            self._journals.pop(library_id, None)
+
+    def merge(self) -> None:
+        """Fold every posting list's pending writes into its frozen part, e.g.
+        after a bulk load."""
+        with self.lock:
+            for partition in self.partitions.values():
+                partition.merge()
+
+    def _snapshot_settings(self) -> Dict[str, object]:
+        return {
+            "compress": self.compress,
+            "positions": self.positions,
+            "tokenization_strategy": type(self._tokenization_strategy).__name__,
+        }
+
+    def save_snapshot(self, path: str, log_offset: int) -> None:
+        """Write the index, as of byte ``log_offset`` of the action log, to a
+        binary snapshot (see ``app/db/index_snapshot.py``)."""
+        names = {id(analyzer): name for name, analyzer in ANALYZERS.items()}
+        with self.lock:
+            arrays: Dict[str, np.ndarray] = {}
+            for number, partition in enumerate(self.partitions.values()):
+                for name, values in partition.to_arrays().items():
+                    arrays[f"{number}/{name}"] = values
+            header = {
+                "log_offset": log_offset,
+                "settings": self._snapshot_settings(),
+                "libraries": list(self.partitions),
+                "analyzers": {
+                    str(library_id): names[id(analyzer)]
+                    for library_id, analyzer in self._analyzers.items()
+                },
+            }
+        # The arrays are copies, so indexing and searches go on while they are written.
+        write_snapshot(path, header, arrays)
+
+    def indexed_chunks(self, library_id: Optional[int] = None) -> Set[int]:
+        """Ids of the chunks indexed in a library's partition."""
+        with self.lock:
+            partition = self.partitions.get(library_id)
+            return set(partition.forward) if partition is not None else set()
+
+    def load_snapshot(
+        self, path: str, log_end: Optional[int] = None, log_start: int = 0
+    ) -> Optional[int]:
+        """Replace the index with a snapshot, memory-mapped, and return the log
+        offset it was taken at. Returns None, leaving the index untouched, if
+        there is no usable snapshot, it was written with other settings or its
+        offset is outside the log kept, from ``log_start`` to ``log_end``; the
+        index must then be rebuilt from the log."""
+        snapshot = read_snapshot(path)
+        if snapshot is None:
+            return None
+        header, arrays = snapshot
+        if header["settings"] != self._snapshot_settings():
+            return None
+        if log_end is not None and header["log_offset"] > log_end:
+            return None
+        if header["log_offset"] < log_start:
+            return None
+        with self.lock:
+            self.partitions = {}
+            self._analyzers = {
+                int(library_id): get_analyzer(name)
+                for library_id, name in header["analyzers"].items()
+            }
+            self._chunk_lengths = np.zeros(64, dtype=np.uint32)
+            for number, library_id in enumerate(header["libraries"]):
+                prefix = f"{number}/"
+                partition = IndexPartition.from_arrays(
+                    {
+                        name[len(prefix) :]: values
+                        for name, values in arrays.items()
+                        if name.startswith(prefix)
+                    },
+                    self.compress,
+                    self.positions,
+                )
+                self.partitions[library_id] = partition
+                chunk_ids = arrays[f"{prefix}chunk_ids"]
+                if chunk_ids.size:
+                    if chunk_ids.max() >= self._chunk_lengths.size:
+                        lengths = np.zeros(int(chunk_ids.max()) + 1, dtype=np.uint32)
+                        lengths[: self._chunk_lengths.size] = self._chunk_lengths
+                        self._chunk_lengths = lengths
+                    self._chunk_lengths[chunk_ids] = arrays[f"{prefix}lengths"]
+            return header["log_offset"]
+
+    def search_word(
+        self,
+        query: str,
+        chunk_filter: Optional[ChunkFilter] = None,
+        library_id: Optional[int] = None,
+        k: Optional[int] = None,
+        fuzziness: Optional[int] = None,
+    ) -> Dict[int, float]:
+        return self.search_words([query], chunk_filter, library_id, k, fuzziness)[0]
+
+    def search_words(
+        self,
+        queries: List[str],
+        chunk_filter: Optional[ChunkFilter] = None,
+        library_id: Optional[int] = None,
+        k: Optional[int] = None,
+        fuzziness: Optional[int] = None,
+    ) -> List[Dict[int, float]]:
+        """Score several queries against one library (every library if None),
+        looking up (and filtering) each distinct clause's postings once. With
+        ``k``, only the k best chunks per query are returned, best first.
+        ``fuzziness`` lets every plain query word match terms within that
+        many edits. Queries are analyzed with each library's own pipeline."""
+        with self.lock:
+            if library_id is None:
+                libraries = list(self.partitions) or [None]
+            else:
+                libraries = [library_id]
+            parsed: Dict[int, List[List[Clause]]] = {}
+            partitions = []
+            for library in libraries:
+                analyzer = self._analyzer(library)
+                if id(analyzer) not in parsed:
+                    parsed[id(analyzer)] = [
+                        parse_query(query, analyzer, fuzziness) for query in queries
+                    ]
+                if library in self.partitions:
+                    partitions.append((self.partitions[library], parsed[id(analyzer)]))
+
+            results: List[Dict[int, float]] = [{} for _ in queries]
+            for partition, query_clauses in partitions:
+                if k is None:
+                    batch = self._search_partition(
+                        partition, query_clauses, chunk_filter
+                    )
+                else:
+                    batch = self._top_k_partition(
+                        partition, query_clauses, chunk_filter, k
+                    )
+                for scores, partition_scores in zip(results, batch):
+                    scores.update(partition_scores)
+            if k is not None and len(partitions) > 1:
+                results = [
+                    dict(
+                        sorted(scores.items(), key=lambda item: item[1], reverse=True)[
+                            :k
+                        ]
+                    )
+                    for scores in results
+                ]
+            return results
+
+    def _search_partition(
+        self,
+        partition: IndexPartition,
+        query_clauses: List[List[Clause]],
+        chunk_filter: Optional[ChunkFilter],
+    ) -> List[Dict[int, float]]:
+        evaluated: Dict[Clause, Tuple[np.ndarray, np.ndarray]] = {}
+        results = []
+        for clauses in query_clauses:
+            positives, negatives = _split(clauses)
+            for clause in positives:
+                if clause not in evaluated:
+                    evaluated[clause] = self._evaluate(partition, clause, chunk_filter)
+            chunk_ids, scores = _union([evaluated[clause] for clause in positives])
+            chunk_ids, scores = self._exclude(partition, chunk_ids, scores, negatives)
+            results.append(dict(zip(chunk_ids.tolist(), scores.tolist())))
+        return results
+
+    def _evaluate(
+        self,
+        partition: IndexPartition,
+        clause: Clause,
+        chunk_filter: Optional[ChunkFilter],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """The eligible chunks matching a clause, with their scores. An
+        allow-list filter seeds the evaluation as the candidate set."""
+        if chunk_filter is not None and chunk_filter.allowed is not None:
+            return self._restricted(partition, clause, chunk_filter.sorted_ids())
+        chunk_ids, scores = self._restricted(partition, clause)
+        if chunk_filter is not None:
+            keep = chunk_filter.mask(chunk_ids)
+            chunk_ids, scores = chunk_ids[keep], scores[keep]
+        return chunk_ids, scores
+
+    def _restricted(
+        self,
+        partition: IndexPartition,
+        clause: Clause,
+        candidates: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Chunks matching a clause (among the sorted ``candidates`` if given)
+        and their scores. Candidates are binary-searched in posting lists, so
+        an AND evaluated from its most selective operand never scores the long
+        lists behind its common words."""
+        if isinstance(clause, Term):
+            postings = partition.posting_list(clause.word)
+            if postings is None:
+                return _EMPTY
+            chunk_ids, frequencies = postings.arrays()
+            if candidates is not None:
+                hits, positions = self._probe(chunk_ids, candidates)
+                chunk_ids, frequencies = candidates[hits], frequencies[positions[hits]]
+            return chunk_ids, self._scores(
+                partition, partition.idf(clause.word), chunk_ids, frequencies
+            )
+        if isinstance(clause, Wildcard):
+            # A chunk matching several expansions scores its best one.
+            matches = [
+                self._restricted(partition, Term(word), candidates)
+                for word in partition.terms.expand(clause.pattern, self.max_expansions)
+            ]
+            return _union(matches, np.maximum)
+        if isinstance(clause, Fuzzy):
+            # Expansions score as terms, discounted by their edit distance.
+            matches = []
+            for word, distance in self._similar(partition, clause):
+                chunk_ids, scores = self._restricted(partition, Term(word), candidates)
+                matches.append((chunk_ids, scores / (1 + distance)))
+            return _union(matches, np.maximum)
+        if isinstance(clause, (Phrase, Near)):
+            chunk_ids, counts = self._matches(partition, clause, candidates)
+            return chunk_ids, self._scores(
+                partition, self._idf(partition, clause), chunk_ids, counts
+            )
+        if isinstance(clause, Not):
+            return _EMPTY
+        positives, negatives = _split(clause.clauses)
+        if isinstance(clause, And):
+            if not positives:
+                return _EMPTY
+            positives.sort(key=lambda child: self._estimate(partition, child))
+            chunk_ids, scores = self._restricted(partition, positives[0], candidates)
+            for child in positives[1:]:
+                if chunk_ids.size == 0:
+                    break
+                child_ids, child_scores = self._restricted(partition, child, chunk_ids)
+                scores = scores[np.searchsorted(chunk_ids, child_ids)] + child_scores
+                chunk_ids = child_ids
+        else:
+            chunk_ids, scores = _union(
+                [self._restricted(partition, child, candidates) for child in positives]
+            )
+        return self._exclude(partition, chunk_ids, scores, negatives)
+
+    def _exclude(
+        self,
+        partition: IndexPartition,
+        chunk_ids: np.ndarray,
+        scores: np.ndarray,
+        negatives: List[Clause],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        for clause in negatives:
+            if chunk_ids.size == 0:
+                break
+            excluded = self._restricted(partition, clause, chunk_ids)[0]
+            keep = ~sorted_contains(excluded, chunk_ids)
+            chunk_ids, scores = chunk_ids[keep], scores[keep]
+        return chunk_ids, scores
+
+    def _estimate(self, partition: IndexPartition, clause: Clause) -> float:
+        """Upper estimate of how many chunks a clause matches."""
+        if isinstance(clause, Term):
+            return partition.document_frequency(clause.word)
+        if isinstance(clause, Phrase):
+            return min(partition.document_frequency(word) for word in clause.words)
+        if isinstance(clause, Wildcard):
+            return sum(
+                partition.document_frequency(word)
+                for word in partition.terms.expand(clause.pattern, self.max_expansions)
+            )
+        if isinstance(clause, Fuzzy):
+            return sum(
+                partition.document_frequency(word)
+                for word, _ in self._similar(partition, clause)
+            )
+        if isinstance(clause, Near):
+            return min(
+                self._estimate(partition, clause.left),
+                self._estimate(partition, clause.right),
+            )
+        if isinstance(clause, Not):
+            return math.inf
+        estimates = [
+            self._estimate(partition, child) for child in _split(clause.clauses)[0]
+        ]
+        if isinstance(clause, And):
+            return min(estimates, default=0)
+        return sum(estimates)
+
+    def _matches(
+        self,
+        partition: IndexPartition,
+        clause: Clause,
+        candidates: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Chunks matching a phrase or proximity clause and the number of
+        matches in each."""
+        if isinstance(clause, Phrase):
+            postings = [partition.posting_list(word) for word in set(clause.words)]
+            if None in postings:
+                return _EMPTY
+            lists = sorted(
+                (word_postings.arrays()[0] for word_postings in postings), key=len
+            )
+            chunk_ids = (
+                lists[0]
+                if candidates is None
+                else intersect_sorted(candidates, lists[0])
+            )
+            for other in lists[1:]:
+                chunk_ids = intersect_sorted(chunk_ids, other)
+        else:
+            chunk_ids = self._restricted(partition, clause.left, candidates)[0]
+            chunk_ids = self._restricted(partition, clause.right, chunk_ids)[0]
+        if not self.positions or chunk_ids.size == 0:
+            return chunk_ids, np.ones(chunk_ids.size)
+        keys = self._occurrences(partition, clause, chunk_ids)
+        chunk_ids, counts = np.unique(keys >> 32, return_counts=True)
+        return chunk_ids.astype(np.uint32), counts
+
+    def _occurrences(
+        self, partition: IndexPartition, clause: Clause, candidates: np.ndarray
+    ) -> np.ndarray:
+        """Sorted ``chunk_id << 32 | position`` keys of where a clause starts
+        in the candidate chunks."""
+        if isinstance(clause, Term):
+            postings = partition.posting_list(clause.word)
+            if postings is None:
+                return np.empty(0, dtype=np.int64)
+            chunk_ids, frequencies, positions = postings.postings()
+            keep = np.repeat(sorted_contains(candidates, chunk_ids), frequencies)
+            chunk_ids = np.repeat(chunk_ids.astype(np.int64), frequencies)[keep]
+            return (chunk_ids << 32) | positions[keep]
+        if isinstance(clause, Phrase):
+            keys = self._occurrences(partition, Term(clause.words[0]), candidates)
+            for offset, word in enumerate(clause.words[1:], start=1):
+                keys = intersect_sorted(
+                    keys, self._occurrences(partition, Term(word), candidates) - offset
+                )
+            return keys
+        if isinstance(clause, Near):
+            left = self._occurrences(partition, clause.left, candidates)
+            right = self._occurrences(partition, clause.right, candidates)
+            nearest = np.searchsorted(right, left - clause.distance)
+            near = nearest < right.size
+            near[near] = right[nearest[near]] <= left[near] + clause.distance
+            return left[near]
+        if isinstance(clause, Wildcard):
+            children = [
+                Term(word)
+                for word in partition.terms.expand(clause.pattern, self.max_expansions)
+            ]
+        elif isinstance(clause, Fuzzy):
+            children = [Term(word) for word, _ in self._similar(partition, clause)]
+        else:
+            children = clause.clauses
+        keys = [self._occurrences(partition, child, candidates) for child in children]
+        return np.unique(np.concatenate(keys)) if keys else np.empty(0, dtype=np.int64)
+
+    def _similar(
+        self, partition: IndexPartition, clause: Fuzzy
+    ) -> List[Tuple[str, int]]:
+        return partition.trigrams.similar(
+            clause.word, clause.distance, self.max_expansions
+        )
+
+    def _idf(self, partition: IndexPartition, clause: Clause) -> float:
+        return sum(partition.idf(word) for word in clause_words(clause))
+
+    def _scores(
+        self,
+        partition: IndexPartition,
+        idf: float,
+        chunk_ids: np.ndarray,
+        frequencies: np.ndarray,
+    ) -> np.ndarray:
+        if self.scoring != "bm25":
+            return np.ones(chunk_ids.size)
+        k1, b = self.k1, self.b
+        length_factor = k1 * b / (partition.average_length or 1.0)
+        norm = k1 * (1 - b) + length_factor * self._chunk_lengths[chunk_ids]
+        frequencies = frequencies.astype(np.float64)
+        return idf * frequencies * (k1 + 1) / (frequencies + norm)
+
+    def _upper_bound(
+        self, partition: IndexPartition, word: str, postings: PostingList
+    ) -> float:
+        return float(
+            self._upper_bounds(
+                partition,
+                word,
+                np.array([postings.max_frequency]),
+                np.array([postings.min_length]),
+            )[0]
+        )
+
+    def _upper_bounds(
+        self,
+        partition: IndexPartition,
+        word: str,
+        frequencies: np.ndarray,
+        lengths: np.ndarray,
+    ) -> np.ndarray:
+        """Score bounds of postings of ``word`` with at most these frequencies
+        in chunks at least this long."""
+        if self.scoring != "bm25":
+            return np.ones(frequencies.size)
+        k1, b = self.k1, self.b
+        frequencies = frequencies.astype(np.float64)
+        norm = k1 * (1 - b) + k1 * b * lengths / (partition.average_length or 1.0)
+        return partition.idf(word) * frequencies * (k1 + 1) / (frequencies + norm)
+
+    def _top_term(
+        self,
+        partition: IndexPartition,
+        word: str,
+        chunk_filter: Optional[ChunkFilter],
+        negatives: List[Clause],
+        k: int,
+        threshold: float,
+        remaining: float,
+    ) -> Optional[Tuple[Tuple[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]]:
+        """Block-max evaluation of a term: score the blocks with the highest
+        bounds, at least k postings' worth, then every block whose bound plus
+        ``remaining`` (the most the later clauses can add) still reaches the
+        k-th score found or the ``threshold`` of the earlier clauses. Returns
+        the matches scored and the ids and frequencies of the postings
+        skipped, or None if no block can be skipped after all."""
+        postings = partition.posting_list(word)
+        chunk_ids, frequencies, starts, max_frequencies, min_lengths = postings.blocks(
+            self._chunk_lengths
+        )
+        bounds = self._upper_bounds(partition, word, max_frequencies, min_lengths)
+        if bounds.min() == bounds.max():
+            return None
+        sizes = np.diff(starts, append=chunk_ids.size)
+        idf = partition.idf(word)
+
+        def score(rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            """The eligible ``rows`` and their scores."""
+            ids = chunk_ids[rows]
+            scores = self._scores(partition, idf, ids, frequencies[rows])
+            if chunk_filter is not None:
+                keep = chunk_filter.mask(ids)
+                rows, ids, scores = rows[keep], ids[keep], scores[keep]
+            if negatives:
+                kept = self._exclude(partition, ids, np.arange(ids.size), negatives)[1]
+                rows, scores = rows[kept], scores[kept]
+            return rows, scores
+
+        # Blocks at the highest bound can never be skipped; they usually hold
+        # the best scores, so score them (and more, until k) for a threshold.
+        order = np.argsort(-bounds, kind="stable")
+        first = np.zeros(bounds.size, dtype=bool)
+        first[
+            order[
+                : max(
+                    np.count_nonzero(bounds == bounds[order[0]]),
+                    np.searchsorted(np.cumsum(sizes[order]), k) + 1,
+                )
+            ]
+        ] = True
+        first_rows, first_scores = score(np.flatnonzero(np.repeat(first, sizes)))
+        if first_scores.size >= k:
+            threshold = max(threshold, float(np.partition(first_scores, -k)[-k]))
+        skipped = ~first & (bounds + remaining < threshold)
+        if not skipped.any():
+            return None
+        rows, scores = score(np.flatnonzero(np.repeat(~first & ~skipped, sizes)))
+        # Both passes found disjoint rows; placing them by row keeps the
+        # matches sorted by chunk id.
+        matched = np.zeros(chunk_ids.size, dtype=bool)
+        matched[first_rows] = matched[rows] = True
+        all_scores = np.empty(chunk_ids.size)
+        all_scores[first_rows], all_scores[rows] = first_scores, scores
+        skipped = np.repeat(skipped, sizes)
+        return (
+            (chunk_ids[matched], all_scores[matched]),
+            (chunk_ids[skipped], frequencies[skipped]),
+        )
+
+    def _top_k_partition(
+        self,
+        partition: IndexPartition,
+        query_clauses: List[List[Clause]],
+        chunk_filter: Optional[ChunkFilter],
+        k: int,
+    ) -> List[Dict[int, float]]:
+        postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        evaluated: Dict[Clause, Tuple[np.ndarray, np.ndarray]] = {}
+        results = []
+        for clauses in query_clauses:
+            positives, negatives = _split(clauses)
+            bounds = {}
+            for clause in positives:
+                if isinstance(clause, Term):
+                    word_postings = partition.posting_list(clause.word)
+                    if word_postings is not None:
+                        bounds[clause] = self._upper_bound(
+                            partition, clause.word, word_postings
+                        )
+                    continue
+                if clause not in evaluated:
+                    evaluated[clause] = self._evaluate(partition, clause, chunk_filter)
+                if evaluated[clause][1].size:
+                    bounds[clause] = float(evaluated[clause][1].max())
+            ordered = sorted(bounds, key=bounds.get, reverse=True)
+            # remaining[i]: the most the clauses from i on can add to a score.
+            remaining = [0.0] * (len(ordered) + 1)
+            for i in range(len(ordered) - 1, -1, -1):
+                remaining[i] = remaining[i + 1] + bounds[ordered[i]]
+            candidates = np.empty(0, dtype=np.uint32)
+            scores = np.empty(0)
+            threshold = -math.inf
+            for i, clause in enumerate(ordered):
+                pruned = None
+                if (
+                    remaining[i] > threshold
+                    and isinstance(clause, Term)
+                    and clause not in evaluated
+                    and self.scoring == "bm25"
+                    and (chunk_filter is None or chunk_filter.allowed is None)
+                    and len(partition.posting_list(clause.word)) > BLOCK_SIZE
+                ):
+                    pruned = self._top_term(
+                        partition,
+                        clause.word,
+                        chunk_filter,
+                        negatives,
+                        k,
+                        threshold,
+                        remaining[i + 1],
+                    )
+                if pruned is not None:
+                    (chunk_ids, clause_scores), (skipped, frequencies) = pruned
+                    # Candidates of earlier clauses still collect their score
+                    # from the skipped blocks.
+                    hits, positions = self._probe(skipped, candidates)
+                    scores[hits] += self._scores(
+                        partition,
+                        partition.idf(clause.word),
+                        candidates[hits],
+                        frequencies[positions[hits]],
+                    )
+                    candidates, scores = _union(
+                        [(candidates, scores), (chunk_ids, clause_scores)]
+                    )
+                elif remaining[i] > threshold:
+                    if clause not in evaluated:
+                        evaluated[clause] = self._evaluate(
+                            partition, clause, chunk_filter
+                        )
+                    chunk_ids, clause_scores = self._exclude(
+                        partition, *evaluated[clause], negatives
+                    )
+                    candidates, scores = _union(
+                        [(candidates, scores), (chunk_ids, clause_scores)]
+                    )
+                elif isinstance(clause, Term):
+                    # No unseen chunk can reach the top k: only probe candidates.
+                    if clause.word not in postings:
+                        postings[clause.word] = partition.posting_list(
+                            clause.word
+                        ).arrays()
+                    chunk_ids, frequencies = postings[clause.word]
+                    hits, positions = self._probe(chunk_ids, candidates)
+                    scores[hits] += self._scores(
+                        partition,
+                        partition.idf(clause.word),
+                        candidates[hits],
+                        frequencies[positions[hits]],
+                    )
+                else:
+                    chunk_ids, clause_scores = evaluated[clause]
+                    hits, positions = self._probe(chunk_ids, candidates)
+                    scores[hits] += clause_scores[positions[hits]]
+                if candidates.size >= k:
+                    threshold = np.partition(scores, -k)[-k]
+                    keep = scores + remaining[i + 1] >= threshold
+                    candidates, scores = candidates[keep], scores[keep]
+            top = top_k_indices(scores, k)
+            results.append(dict(zip(candidates[top].tolist(), scores[top].tolist())))
+        return results
+
+    @staticmethod
+    def _probe(
+        chunk_ids: np.ndarray, candidates: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices of the candidates found in a sorted posting array, and where."""
+        if chunk_ids.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        positions = np.minimum(
+            np.searchsorted(chunk_ids, candidates), chunk_ids.size - 1
+        )
+        return np.flatnonzero(chunk_ids[positions] == candidates), positions
+
+
+def _split(clauses) -> Tuple[List[Clause], List[Clause]]:
+    """Positive clauses, and the operands of the negated ones."""
+    positives = [clause for clause in clauses if not isinstance(clause, Not)]
+    negatives = [clause.clause for clause in clauses if isinstance(clause, Not)]
+    return positives, negatives
+
+
+def _union(
+    matches: List[Tuple[np.ndarray, np.ndarray]], combine: np.ufunc = np.add
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge (chunk ids, scores) pairs, combining the scores of shared chunks
+    (summed by default)."""
+    matches = [(chunk_ids, scores) for chunk_ids, scores in matches if chunk_ids.size]
+    if not matches:
+        return _EMPTY
+    if len(matches) == 1:
+        return matches[0]
+    chunk_ids, inverse = np.unique(
+        np.concatenate([ids for ids, _ in matches]), return_inverse=True
+    )
+    all_scores = np.concatenate([s for _, s in matches])
+    if combine is np.add:
+        return chunk_ids, np.bincount(inverse, weights=all_scores)
+    scores = np.full(chunk_ids.size, -np.inf)
+    combine.at(scores, inverse, all_scores)
+    return chunk_ids, scores
@@ -0,0 +1,224 @@
+import math
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+import numpy as np
+from app.interfaces.indexing import IVectorIndex, IVectorStore
+from app.core.exceptions import ValidationError
+from app.core.filters import ChunkFilter
+from app.core.math_utils import assign_clusters, kmeans, normalize, top_k_indices
+from app.db.vector_blocks import VectorBlock
+
+if TYPE_CHECKING:
+    from app.schemas.search import SearchOptions
+
+# k-means is trained on at most this many sampled rows per centroid.
+TRAINING_SAMPLES_PER_LIST = 64
+
+# Pending write recorded while a library is being trained: (chunk_id, vector or None for delete).
+PendingWrite = Tuple[int, Optional[np.ndarray]]
+
+
+class IvfPartition:
+    """Inverted-file layout of one library: ``nlist`` centroids, each owning a
+    contiguous block with the rows assigned to it."""
+
+    def __init__(self, centroids: np.ndarray):
+        self.centroids = centroids
+        self.lists = [VectorBlock(centroids.shape[1], capacity=16) for _ in centroids]
+        self.assignments: Dict[int, int] = {}
+        self.trained_size = 0
+
+    @property
+    def dimension(self) -> int:
+        return self.centroids.shape[1]
+
+    def load(self, chunk_ids: np.ndarray, matrix: np.ndarray) -> None:
+        labels = assign_clusters(matrix, self.centroids, spherical=True)
+        for chunk_id, label, vector in zip(chunk_ids.tolist(), labels.tolist(), matrix):
+            self.lists[label].upsert(chunk_id, vector)
+            self.assignments[chunk_id] = label
+        self.trained_size = len(chunk_ids)
+
+    def upsert(self, chunk_id: int, vector: np.ndarray) -> None:
+        self.remove(chunk_id)
+        label = int(np.argmax(self.centroids @ vector))
+        self.lists[label].upsert(chunk_id, vector)
+        self.assignments[chunk_id] = label
+
+    def remove(self, chunk_id: int) -> None:
+        label = self.assignments.pop(chunk_id, None)
+        if label is not None:
+            self.lists[label].remove(chunk_id)
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        nprobe: int,
+        chunk_filter: Optional[ChunkFilter] = None,
+    ) -> List[Tuple[int, float]]:
+        # Lists emptied by removals are skipped so they don't use up probes.
+        filled = np.flatnonzero([block.size for block in self.lists])
+        probed = filled[top_k_indices(self.centroids[filled] @ query, nprobe)]
+        scores, chunk_ids = [], []
+        for block in (self.lists[i] for i in probed):
+            rows = block.eligible_rows(chunk_filter)
+            if rows is None:
+                rows = np.arange(block.size)
+            if len(rows):
+                scores.append(block.matrix[rows] @ query)
+                chunk_ids.append(block.chunk_ids[rows])
+        if not scores:
+            return []
+        scores, chunk_ids = np.concatenate(scores), np.concatenate(chunk_ids)
+        return [(int(chunk_ids[i]), float(scores[i])) for i in top_k_indices(scores, k)]
+
+
+class IvfIndex(IVectorIndex):
+    """Approximate k-NN index partitioning each library with k-means.
+
+    Once a library holds ``min_train_size`` vectors a background job clusters a
+    snapshot of it and swaps the trained partition in; writes that land during
+    training are replayed onto the new partition before the swap. The job is
+    re-run whenever the library grows by ``retrain_growth`` since its last
+    training. Until a library is trained, queries fall back to exact search, as
+    do filtered queries whose probed lists hold fewer than ``k`` eligible chunks.
+    """
+
+    def __init__(
+        self,
+        vector_store: IVectorStore,
+        nlist: int,
+        nprobe: int,
+        min_train_size: int,
+        retrain_growth: float,
+        lock: threading.RLock,
+    ):
+        self.vector_store = vector_store
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self.partitions: Dict[int, IvfPartition] = {}
+        self.lock = lock
+        self._pending: Dict[int, List[PendingWrite]] = {}
+        self._training: Dict[int, Future] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ivf-train"
+        )
+
+    def _needs_training(self, library_id: int) -> bool:
+        if library_id in self._training:
+            return False
+        size = self.vector_store.count(library_id)
+        partition = self.partitions.get(library_id)
+        if partition is None:
+            return size >= self.min_train_size
+        return size >= self.retrain_growth * partition.trained_size
+
+    def _schedule_training(self, library_id: int) -> None:
+        self._pending[library_id] = []
+        self._training[library_id] = self._executor.submit(self.train, library_id)
+
+    def _record(
+        self, library_id: int, chunk_id: int, vector: Optional[np.ndarray]
+    ) -> None:
+        pending = self._pending.get(library_id)
+        if pending is not None:
+            pending.append((chunk_id, vector))
+
+    def train(self, library_id: int) -> None:
+        """Cluster the current vectors of a library and atomically swap the result in."""
+        try:
+            chunk_ids, matrix = self.vector_store.get_vectors(library_id)
+            if not len(chunk_ids):
+                return
+            nlist = self.nlist or max(1, int(math.sqrt(len(chunk_ids))))
+            sample = matrix
+            if len(matrix) > TRAINING_SAMPLES_PER_LIST * nlist:
+                rows = np.random.default_rng(library_id).choice(
+                    len(matrix), TRAINING_SAMPLES_PER_LIST * nlist, replace=False
+                )
+                sample = matrix[rows]
+            partition = IvfPartition(kmeans(sample, nlist, spherical=True))
+            partition.load(chunk_ids, matrix)
+            with self.lock:
+                if not self.vector_store.count(library_id):
+                    return  # The library was dropped during training.
+                for chunk_id, vector in self._pending.get(library_id, []):
+                    if vector is None or vector.shape[0] != partition.dimension:
+                        partition.remove(chunk_id)
+                    else:
+                        partition.upsert(chunk_id, vector)
+                self.partitions[library_id] = partition
+        finally:
+            with self.lock:
+                self._pending.pop(library_id, None)
+                self._training.pop(library_id, None)
+
+    def wait_for_training(
+        self, library_id: int, timeout: Optional[float] = None
+    ) -> None:
+        with self.lock:
+            future = self._training.get(library_id)
+        if future is not None:
+            future.result(timeout)
+
+    def add(self, library_id: int, chunk_id: int, embedding: List[float]) -> None:
+        vector = normalize(embedding)
+        with self.lock:
+            self._record(library_id, chunk_id, vector)
+            partition = self.partitions.get(library_id)
+            if partition is not None:
+                if vector.shape[0] == partition.dimension:
+                    partition.upsert(chunk_id, vector)
+                else:
+                    del self.partitions[library_id]
+            if self._needs_training(library_id):
+                self._schedule_training(library_id)
+
+    def remove(self, library_id: int, chunk_id: int) -> None:
+        with self.lock:
+            self._record(library_id, chunk_id, None)
+            partition = self.partitions.get(library_id)
+            if partition is not None:
+                partition.remove(chunk_id)
+
+    def drop_library(self, library_id: int) -> None:
+        with self.lock:
+            self.partitions.pop(library_id, None)
+            self._pending.pop(library_id, None)
+            future = self._training.pop(library_id, None)
+            if future is not None:
+                future.cancel()
+
+    def search(
+        self,
+        library_id: int,
+        query_embedding: List[float],
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        chunk_filter: Optional[ChunkFilter] = None,
+    ) -> List[Tuple[int, float]]:
+        nprobe = self.nprobe
+        if options is not None and options.nprobe is not None:
+            nprobe = options.nprobe
+        with self.lock:
+            partition = self.partitions.get(library_id)
+            if partition is None:
+                return self.vector_store.search(
+                    library_id, query_embedding, k, options, chunk_filter
+                )
+            query = normalize(query_embedding)
+            if query.shape[0] != partition.dimension:
+                raise ValidationError(
+                    f"expected {partition.dimension} dimensions, got {query.shape[0]}",
+                    field="query",
+                )
+            results = partition.search(query, k, nprobe, chunk_filter)
+            if chunk_filter is not None and len(results) < k:
+                return self.vector_store.search(
+                    library_id, query_embedding, k, options, chunk_filter
+                )
+            return results
@@ -0,0 +1,199 @@
+import re
+from typing import List, NamedTuple, Optional, Tuple, Union
+from app.core.exceptions import ValidationError
+from app.interfaces.indexing import ITokenizationStrategy
+
+
+class Term(NamedTuple):
+    word: str
+
+
+class Phrase(NamedTuple):
+    words: Tuple[str, ...]
+
+
+class Wildcard(NamedTuple):
+    pattern: str
+
+
+class Fuzzy(NamedTuple):
+    word: str
+    distance: int
+
+
+class Near(NamedTuple):
+    left: "Clause"
+    right: "Clause"
+    distance: int
+
+
+class And(NamedTuple):
+    clauses: Tuple["Clause", ...]
+
+
+class Or(NamedTuple):
+    clauses: Tuple["Clause", ...]
+
+
+class Not(NamedTuple):
+    clause: "Clause"
+
+
+Clause = Union[Term, Phrase, Wildcard, Fuzzy, Near, And, Or, Not]
+
+_TOKENS = re.compile(r'"[^"]*"|[()]|\bNEAR/\d+\b|[^\s()"]+')
+_OPERATORS = {"AND", "OR", "NOT"}
+_FUZZY = re.compile(r"(.+)~(\d?)")
+
+
+def auto_fuzziness(word: str) -> int:
+    """Edits allowed by a bare ``word~``: none up to 2 characters, one up to
+    5, two beyond."""
+    return 0 if len(word) <= 2 else 1 if len(word) <= 5 else 2
+
+
+class _Parser:
+    """Recursive descent over the query tokens. Precedence, loosest first:
+    OR (also implied between adjacent clauses), AND, NOT, NEAR/n."""
+
+    def __init__(
+        self,
+        text: str,
+        tokenizer: ITokenizationStrategy,
+        fuzziness: Optional[int] = None,
+    ):
+        self.tokens = _TOKENS.findall(text)
+        self.position = 0
+        self.tokenizer = tokenizer
+        self.fuzziness = fuzziness
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def next(self) -> str:
+        self.position += 1
+        return self.tokens[self.position - 1]
+
+    def parse_or(self) -> List[Clause]:
+        clauses: List[Clause] = []
+        while self.peek() not in (None, ")"):
+            if self.peek() in ("OR", "AND"):
+                self.next()
+                continue
+            clause = self.parse_and()
+            if clause is not None:
+                clauses.append(clause)
+        return list(dict.fromkeys(clauses))
+
+    def parse_and(self) -> Optional[Clause]:
+        clauses = [self.parse_not()]
+        while self.peek() == "AND":
+            self.next()
+            clauses.append(self.parse_not())
+        clauses = [clause for clause in dict.fromkeys(clauses) if clause is not None]
+        if len(clauses) > 1:
+            return And(tuple(clauses))
+        return clauses[0] if clauses else None
+
+    def parse_not(self) -> Optional[Clause]:
+        if self.peek() == "NOT":
+            self.next()
+            clause = self.parse_not()
+            return Not(clause) if clause is not None else None
+        return self.parse_near()
+
+    def parse_near(self) -> Optional[Clause]:
+        left = self.parse_primary()
+        while self.peek() is not None and self.peek().startswith("NEAR/"):
+            distance = int(self.next()[5:])
+            right = self.parse_primary()
+            for operand in (left, right):
+                if isinstance(operand, (And, Not)):
+                    raise ValidationError(
+                        "NEAR operands must be words, phrases or OR groups",
+                        field="query",
+                    )
+            if left is not None and right is not None:
+                left = Near(left, right, distance)
+            elif right is not None:
+                left = right
+        return left
+
+    def parse_primary(self) -> Optional[Clause]:
+        token = self.peek()
+        if (
+            token is None
+            or token == ")"
+            or token in _OPERATORS
+            or token.startswith("NEAR/")
+        ):
+            return None
+        self.next()
+        if token == "(":
+            clauses = self.parse_or()
+            if self.peek() == ")":
+                self.next()
+            if len(clauses) > 1:
+                return Or(tuple(clauses))
+            return clauses[0] if clauses else None
+        fuzziness = self.fuzziness
+        if token.startswith('"') and len(token) > 1:
+            token = token[1:-1]
+            fuzziness = None
+        elif _FUZZY.fullmatch(token):
+            token, distance = _FUZZY.fullmatch(token).groups()
+            fuzziness = int(distance) if distance else -1
+        elif "*" in token or "?" in token:
+            # A literal the analyzer drops whole, such as the stopword in
+            # ``the*``, is kept as typed rather than leaving a bare ``*``.
+            pattern = "".join(
+                piece
+                if piece in ("*", "?")
+                else "".join(self.tokenizer.terms(piece)) or piece.lower()
+                for piece in re.split(r"([*?])", token)
+            )
+            pattern = re.sub(r"\*+", "*", pattern)
+            if pattern == "*":
+                raise ValidationError(
+                    "wildcard terms need a literal part, e.g. learn*", field="query"
+                )
+            return Wildcard(pattern)
+        words = tuple(self.tokenizer.terms(token))
+        if len(words) > 1:
+            return Phrase(words)
+        if not words:
+            return None
+        if fuzziness == -1:
+            fuzziness = auto_fuzziness(words[0])
+        return Fuzzy(words[0], fuzziness) if fuzziness else Term(words[0])
+
+
+def parse_query(
+    text: str, tokenizer: ITokenizationStrategy, fuzziness: Optional[int] = None
+) -> List[Clause]:
+    """Split a keyword query into its distinct top-level clauses, which are
+    OR-ed: words, ``"quoted phrases"``, ``*``/``?`` wildcard terms such as
+    ``learn*``, fuzzy terms (``word~n`` matches words within ``n`` edits,
+    ``word~`` picks ``n`` from the word's length), ``a NEAR/n b`` (the two operands at most ``n`` tokens apart,
+    in either order), ``AND``, ``OR``, ``NOT`` and parentheses. Top-level
+    ``NOT`` clauses exclude chunks from the results. ``fuzziness`` makes
+    every plain word outside phrases fuzzy."""
+    parser = _Parser(text, tokenizer, fuzziness)
+    clauses = parser.parse_or()
+    while parser.peek() == ")":
+        parser.next()
+        clauses += parser.parse_or()
+    return list(dict.fromkeys(clauses))
+
+
+def clause_words(clause: Clause) -> List[str]:
+    """The words a clause's match is scored on (negated words excluded)."""
+    if isinstance(clause, Term):
+        return [clause.word]
+    if isinstance(clause, Phrase):
+        return list(clause.words)
+    if isinstance(clause, Near):
+        return clause_words(clause.left) + clause_words(clause.right)
+    if isinstance(clause, (Wildcard, Fuzzy, Not)):
+        return []
+    return [word for child in clause.clauses for word in clause_words(child)]
@@ -0,0 +1,153 @@
+import math
+import threading
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+import numpy as np
+from app.interfaces.indexing import IVectorIndex, IVectorStore
+from app.core.exceptions import ValidationError
+from app.core.filters import ChunkFilter
+from app.core.math_utils import hamming_distances, normalize, pack_signs, top_k_indices
+from app.db.vector_blocks import RowBlock
+
+if TYPE_CHECKING:
+    from app.schemas.search import SearchOptions
+
+
+class SignatureBlock(RowBlock):
+    """Packed uint64 signatures, ``words`` per chunk, laid out ``(words, capacity)``
+    so each word is scanned contiguously."""
+
+    storage = "lsh"
+
+    def __init__(self, words: int, capacity: int = 64):
+        super().__init__(words, capacity)
+        self.signatures = np.zeros((words, capacity), dtype=np.uint64)
+
+    def _resize(self, capacity: int) -> None:
+        signatures = np.zeros((self.dimension, capacity), dtype=np.uint64)
+        signatures[:, : self.size] = self.signatures[:, : self.size]
+        self.signatures = signatures
+        super()._resize(capacity)
+
+    def _write(self, row: int, vector: np.ndarray) -> None:
+        self.signatures[:, row] = vector
+
+    def _move(self, source: int, target: int) -> None:
+        self.signatures[:, target] = self.signatures[:, source]
+
+
+class LshTables:
+    """Random-hyperplane LSH of one library in ``n_tables`` independent tables:
+    each takes the sign bit of ``n_bits`` random projections per embedding, so
+    that the Hamming distance between two signatures estimates the angle
+    between the embeddings. The tables share one block, each owning a range
+    of its signature words."""
+
+    def __init__(self, dimension: int, n_bits: int, n_tables: int = 1, seed: int = 0):
+        self.dimension = dimension
+        self.words = math.ceil(n_bits / 64)
+        self.n_tables = n_tables
+        rng = np.random.default_rng(seed)
+        self.hyperplanes = rng.standard_normal(
+            (n_tables * self.words * 64, dimension)
+        ).astype(np.float32)
+        self.block = SignatureBlock(n_tables * self.words)
+
+    def signature(self, vector: np.ndarray) -> np.ndarray:
+        return pack_signs(self.hyperplanes @ vector)[0]
+
+    def nearest(
+        self, query: np.ndarray, n: int, chunk_filter: Optional[ChunkFilter] = None
+    ) -> np.ndarray:
+        """Chunk ids of the union of each table's ``n`` signatures closest to
+        the query's in Hamming distance."""
+        rows = self.block.eligible_rows(chunk_filter)
+        signatures = self.block.signatures[:, : self.block.size]
+        if rows is not None:
+            signatures = signatures[:, rows]
+        signature = self.signature(query)
+        tops = []
+        for table in range(self.n_tables):
+            words = slice(table * self.words, (table + 1) * self.words)
+            distances = hamming_distances(signatures[words], signature[words])
+            tops.append(top_k_indices(-distances, n))
+        top = np.unique(np.concatenate(tops))
+        return self.block.chunk_ids[top if rows is None else rows[top]]
+
+
+class LshIndex(IVectorIndex):
+    """Coarse k-NN index hashing every embedding with random hyperplanes.
+
+    Signatures are updated on every write at the cost of one projection, which
+    suits write-heavy libraries where graph or cluster maintenance is too
+    costly. A query takes the closest signatures by popcount Hamming distance
+    from each of ``n_tables`` tables, ``candidates`` in all (but at least ``k``
+    per table), and re-ranks their
+    union with exact cosine from the vector store. Several shorter tables
+    find near neighbours that one table's ranking happens to miss.
+    """
+
+    def __init__(
+        self,
+        vector_store: IVectorStore,
+        n_bits: int,
+        candidates: int,
+        lock: threading.RLock,
+        n_tables: int = 1,
+    ):
+        self.vector_store = vector_store
+        self.n_bits = n_bits
+        self.n_tables = n_tables
+        self.candidates = candidates
+        self.tables: Dict[int, LshTables] = {}
+        self.lock = lock
+
+    def add(self, library_id: int, chunk_id: int, embedding: List[float]) -> None:
+        vector = normalize(embedding)
+        with self.lock:
+            table = self.tables.get(library_id)
+            if table is None or table.dimension != vector.shape[0]:
+                table = self.tables[library_id] = LshTables(
+                    vector.shape[0], self.n_bits, self.n_tables, seed=library_id
+                )
+            table.block.upsert(chunk_id, table.signature(vector))
+
+    def remove(self, library_id: int, chunk_id: int) -> None:
+        with self.lock:
+            table = self.tables.get(library_id)
+            if table is None:
+                return
+            table.block.remove(chunk_id)
+            if table.block.size == 0:
+                del self.tables[library_id]
+
+    def drop_library(self, library_id: int) -> None:
+        with self.lock:
+            self.tables.pop(library_id, None)
+
+    def search(
+        self,
+        library_id: int,
+        query_embedding: List[float],
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        chunk_filter: Optional[ChunkFilter] = None,
+    ) -> List[Tuple[int, float]]:
+        candidates = self.candidates
+        if options is not None and options.lsh_candidates is not None:
+            candidates = options.lsh_candidates
+        query = normalize(query_embedding)
+        with self.lock:
+            table = self.tables.get(library_id)
+            if table is None:
+                return []
+            if query.shape[0] != table.dimension:
+                raise ValidationError(
+                    f"expected {table.dimension} dimensions, got {query.shape[0]}",
+                    field="query",
+                )
+            # Each table contributes at least k, so the union holds k chunks.
+            per_table = max(k, math.ceil(candidates / table.n_tables))
+            chunk_ids = table.nearest(query, per_table, chunk_filter)
+            return self.vector_store.rescore(
+                library_id, query_embedding, chunk_ids.tolist(), k
+            )
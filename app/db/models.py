@@ -5,6 +5,8 @@ from typing import Optional, List
 class Library(BaseModel):
     id: int
     name: str
+    vector_storage: str = "float32"
+    analyzer: str = "default"
 
 
 class Document(BaseModel):
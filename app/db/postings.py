@@ -0,0 +1,397 @@
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+
+TAIL_MIN = 32
+# Postings per block of the frozen part, each with its own maximum frequency.
+BLOCK_SIZE = 128
+MAX_FREQUENCY = 0xFFFF
+MAX_LENGTH = 0xFFFFFFFF
+
+
+def encode_varint(values: np.ndarray) -> bytes:
+    """LEB128-encode unsigned 32-bit integers: 7 bits per byte, high bit set
+    on every byte but a value's last."""
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(values.size, dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        lengths += values >= (1 << shift)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    shifts = 7 * (
+        np.arange(int(ends[-1]) if values.size else 0) - np.repeat(starts, lengths)
+    )
+    data = (np.repeat(values, lengths) >> shifts.astype(np.uint64)) & 0x7F
+    data = data.astype(np.uint8)
+    data[:-1] |= 0x80
+    data[ends[:-1] - 1] &= 0x7F
+    return data.tobytes()
+
+
+def segment_ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenated ``arange(start, start + length)`` for each segment."""
+    lengths = lengths.astype(np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts.astype(np.int64) - offsets, lengths) + np.arange(
+        int(lengths.sum())
+    )
+
+
+def encode_positions(positions: np.ndarray, frequencies: np.ndarray) -> bytes:
+    """Varint-encode flat per-posting position runs as gaps, each run
+    restarting from its first absolute position."""
+    positions = positions.astype(np.int64)
+    gaps = np.diff(positions, prepend=0)
+    starts = np.cumsum(frequencies, dtype=np.int64) - frequencies
+    gaps[starts] = positions[starts]
+    return encode_varint(gaps)
+
+
+def decode_positions(data: bytes, frequencies: np.ndarray) -> np.ndarray:
+    gaps = decode_varint(data).astype(np.int64)
+    sums = np.cumsum(gaps)
+    starts = np.cumsum(frequencies, dtype=np.int64) - frequencies
+    bases = np.repeat(sums[starts] - gaps[starts], frequencies)
+    return (sums - bases).astype(np.uint32)
+
+
+def decode_varint(data: bytes) -> np.ndarray:
+    bytes_ = np.frombuffer(data, dtype=np.uint8)
+    if bytes_.size == 0:
+        return np.empty(0, dtype=np.uint32)
+    ends = np.flatnonzero(bytes_ < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = 7 * (np.arange(bytes_.size) - np.repeat(starts, ends - starts + 1))
+    parts = (bytes_ & 0x7F).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.add.reduceat(parts, starts).astype(np.uint32)
+
+
+class PostingList:
+    """Sorted chunk ids of one term with their term frequencies.
+
+    Most postings sit in an immutable frozen part: sorted ``uint32`` chunk ids
+    and parallel ``uint16`` frequencies packed into bytes, delta + varint
+    encoded when ``compress`` is set. Writes go to a small mutable tail (new
+    or updated postings) and a tombstone set (removed frozen postings), merged
+    into the frozen part once they outgrow an eighth of it. Chunk ids grow
+    monotonically, so a new posting rarely needs a frozen-part lookup.
+
+    ``max_frequency`` and ``min_length`` (the shortest chunk ever added) bound
+    any posting's score for top-k pruning; removals leave them loose but valid.
+    The frozen part is also cut into ``BLOCK_SIZE`` blocks whose maximum
+    frequency and shortest chunk, cached until the next merge, bound the
+    scores of one block.
+
+    A ``positional`` list also keeps each posting's token positions, one per
+    occurrence, flattened in posting order (``uint32``, or per-posting gaps
+    varint encoded when compressed).
+    """
+
+    __slots__ = (
+        "_ids",
+        "_frequencies",
+        "_positions",
+        "_last",
+        "_limit",
+        "_tail",
+        "_tail_positions",
+        "_deleted",
+        "_size",
+        "compress",
+        "positional",
+        "max_frequency",
+        "min_length",
+        "_blocks",
+    )
+
+    def __init__(self, compress: bool = False, positional: bool = False):
+        self._ids = b""
+        self._frequencies = b""
+        self._positions = b""
+        self._tail_positions: Optional[Dict[int, List[int]]] = None
+        self.positional = positional
+        self._last = -1
+        self._limit = TAIL_MIN
+        self._tail: Optional[Dict[int, int]] = None
+        self._deleted: Optional[Set[int]] = None
+        self._size = 0
+        self.compress = compress
+        self.max_frequency = 0
+        self.min_length = MAX_LENGTH
+        self._blocks: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def frozen_state(self) -> Tuple[bytes, bytes, bytes, int, int, int]:
+        """Pending writes merged, the encoded ids, frequencies and positions
+        with the last chunk id, ``max_frequency`` and ``min_length``."""
+        self.merge()
+        return (
+            self._ids,
+            self._frequencies,
+            self._positions,
+            self._last,
+            self.max_frequency,
+            self.min_length,
+        )
+
+    @classmethod
+    def from_frozen_state(
+        cls,
+        compress: bool,
+        positional: bool,
+        size: int,
+        state: Tuple[bytes, bytes, bytes, int, int, int],
+    ) -> "PostingList":
+        """A list of ``size`` postings from ``frozen_state``. The encoded parts
+        may be any buffer, e.g. slices of a memory-mapped snapshot; merging
+        copies them into new bytes."""
+        postings = cls(compress, positional)
+        (
+            postings._ids,
+            postings._frequencies,
+            postings._positions,
+            postings._last,
+            postings.max_frequency,
+            postings.min_length,
+        ) = state
+        postings._size = size
+        postings._limit = max(TAIL_MIN, size >> 3)
+        return postings
+
+    def _frozen(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self.compress:
+            ids = np.cumsum(decode_varint(self._ids), dtype=np.uint32)
+            return ids, decode_varint(self._frequencies)
+        return (
+            np.frombuffer(self._ids, dtype=np.uint32),
+            np.frombuffer(self._frequencies, dtype=np.uint16),
+        )
+
+    def _frozen_positions(self, frequencies: np.ndarray) -> np.ndarray:
+        if self.compress:
+            return decode_positions(self._positions, frequencies)
+        return np.frombuffer(self._positions, dtype=np.uint32)
+
+    def _frozen_live(self, chunk_id: int) -> bool:
+        if self._deleted and chunk_id in self._deleted:
+            return False
+        ids = self._frozen()[0]
+        position = np.searchsorted(ids, chunk_id)
+        return position < ids.size and ids[position] == chunk_id
+
+    def add(
+        self,
+        chunk_id: int,
+        frequency: int,
+        length: int = 0,
+        positions: Optional[Sequence[int]] = None,
+    ) -> None:
+        """Insert a posting, or replace the frequency of an existing one.
+        ``length`` is the chunk's token count; a positional list also takes
+        the term's ``frequency`` positions in the chunk."""
+        tail = self._tail
+        if tail is None:
+            tail = self._tail = {}
+        if chunk_id not in tail:
+            if chunk_id <= self._last and self._frozen_live(chunk_id):
+                self._tombstone(chunk_id)
+            else:
+                self._size += 1
+        tail[chunk_id] = frequency if frequency < MAX_FREQUENCY else MAX_FREQUENCY
+        if frequency > self.max_frequency:
+            self.max_frequency = tail[chunk_id]
+        if length < self.min_length:
+            self.min_length = length
+        if self.positional:
+            if self._tail_positions is None:
+                self._tail_positions = {}
+            self._tail_positions[chunk_id] = list(positions[:MAX_FREQUENCY])
+        self._maybe_merge()
+
+    def remove(self, chunk_id: int) -> bool:
+        if self._tail and self._tail.pop(chunk_id, None) is not None:
+            if self._tail_positions:
+                del self._tail_positions[chunk_id]
+        elif chunk_id <= self._last and self._frozen_live(chunk_id):
+            self._tombstone(chunk_id)
+        else:
+            return False
+        self._size -= 1
+        self._maybe_merge()
+        return True
+
+    def _tombstone(self, chunk_id: int) -> None:
+        if self._deleted is None:
+            self._deleted = set()
+        self._deleted.add(chunk_id)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The live postings as sorted chunk ids and their frequencies."""
+        ids, frequencies = self._frozen()
+        if self._deleted:
+            deleted = np.fromiter(
+                self._deleted, dtype=np.uint32, count=len(self._deleted)
+            )
+            keep = ~np.isin(ids, deleted)
+            ids, frequencies = ids[keep], frequencies[keep]
+        if self._tail:
+            tail_ids = np.fromiter(self._tail, dtype=np.uint32, count=len(self._tail))
+            order = np.argsort(tail_ids)
+            tail_frequencies = np.fromiter(
+                self._tail.values(), dtype=np.uint16, count=len(self._tail)
+            )
+            positions = np.searchsorted(ids, tail_ids[order])
+            ids = np.insert(ids, positions, tail_ids[order])
+            frequencies = np.insert(frequencies, positions, tail_frequencies[order])
+        return ids, frequencies
+
+    def postings(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The live postings of a positional list as sorted chunk ids, their
+        frequencies and their positions flattened in the same order."""
+        ids, frequencies = self._frozen()
+        positions = self._frozen_positions(frequencies)
+        if self._deleted:
+            deleted = np.fromiter(
+                self._deleted, dtype=np.uint32, count=len(self._deleted)
+            )
+            keep = ~np.isin(ids, deleted)
+            positions = positions[np.repeat(keep, frequencies)]
+            ids, frequencies = ids[keep], frequencies[keep]
+        if self._tail:
+            tail_ids = sorted(self._tail)
+            ids = np.concatenate((ids, np.array(tail_ids, dtype=np.uint32)))
+            frequencies = np.concatenate(
+                (
+                    frequencies,
+                    np.array([self._tail[c] for c in tail_ids], dtype=np.uint16),
+                )
+            )
+            tail_positions = [p for c in tail_ids for p in self._tail_positions[c]]
+            positions = np.concatenate(
+                (positions, np.array(tail_positions, dtype=np.uint32))
+            )
+            order = np.argsort(ids, kind="stable")
+            starts = np.cumsum(frequencies, dtype=np.int64) - frequencies
+            positions = positions[segment_ranges(starts[order], frequencies[order])]
+            ids, frequencies = ids[order], frequencies[order]
+        return ids, frequencies, positions
+
+    def blocks(
+        self, lengths: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """The live postings as returned by :meth:`arrays`, with the start of
+        each block in them, the block's highest frequency and its shortest
+        chunk according to ``lengths`` (indexed by chunk id). A tail posting
+        joins the block its chunk id falls in."""
+        ids, frequencies = self.arrays()
+        if self._blocks is None:
+            frozen_ids, frozen_frequencies = self._frozen()
+            starts = np.arange(0, frozen_ids.size, BLOCK_SIZE)
+            if starts.size:
+                self._blocks = (
+                    frozen_ids[starts],
+                    np.maximum.reduceat(frozen_frequencies, starts),
+                    np.minimum.reduceat(lengths[frozen_ids], starts),
+                )
+            else:
+                self._blocks = (frozen_ids, frozen_frequencies, lengths[:0])
+        first_ids, max_frequencies, min_lengths = self._blocks
+        if first_ids.size == 0:
+            starts = np.zeros(min(ids.size, 1), dtype=np.int64)
+            return (
+                ids,
+                frequencies,
+                starts,
+                frequencies.max(keepdims=True, initial=0)[: starts.size],
+                lengths[ids].min(keepdims=True, initial=MAX_LENGTH)[: starts.size],
+            )
+        starts = np.searchsorted(ids, first_ids)
+        starts[0] = 0
+        if self._tail:
+            tail_ids = np.fromiter(self._tail, dtype=np.uint32, count=len(self._tail))
+            tail_frequencies = np.fromiter(
+                self._tail.values(), dtype=np.uint16, count=len(self._tail)
+            )
+            tail_blocks = np.maximum(
+                np.searchsorted(first_ids, tail_ids, side="right") - 1, 0
+            )
+            max_frequencies, min_lengths = max_frequencies.copy(), min_lengths.copy()
+            np.maximum.at(max_frequencies, tail_blocks, tail_frequencies)
+            np.minimum.at(min_lengths, tail_blocks, lengths[tail_ids])
+        return ids, frequencies, starts, max_frequencies, min_lengths
+
+    def lower_length(self, chunk_id: int, length: int) -> None:
+        """Keep the length bounds valid for a posting left unchanged while its
+        chunk got shorter."""
+        self.min_length = min(self.min_length, length)
+        if self._blocks is not None:
+            first_ids, _, min_lengths = self._blocks
+            block = max(int(np.searchsorted(first_ids, chunk_id, side="right")) - 1, 0)
+            if block < min_lengths.size:
+                min_lengths[block] = min(min_lengths[block], length)
+
+    def _maybe_merge(self) -> None:
+        pending = len(self._tail) if self._tail else 0
+        if self._deleted:
+            pending += len(self._deleted)
+        if pending > self._limit:
+            self.merge()
+
+    def merge(self) -> None:
+        """Fold the tail and tombstones into a new frozen part; a tail of
+        postings past the frozen part is simply appended to it."""
+        if not self._tail and not self._deleted:
+            return
+        if not self._deleted and min(self._tail) > self._last:
+            tail_ids = sorted(self._tail)
+            ids = np.array(tail_ids, dtype=np.uint32)
+            frequencies = np.array([self._tail[c] for c in tail_ids], dtype=np.uint16)
+            base = max(self._last, 0)
+            if self.compress:
+                self._ids = b"".join(
+                    (self._ids, encode_varint(np.diff(ids, prepend=np.uint32(base))))
+                )
+                self._frequencies = b"".join(
+                    (self._frequencies, encode_varint(frequencies))
+                )
+            else:
+                self._ids = b"".join((self._ids, ids.tobytes()))
+                self._frequencies = b"".join((self._frequencies, frequencies.tobytes()))
+            if self.positional:
+                positions = np.array(
+                    [p for c in tail_ids for p in self._tail_positions[c]],
+                    dtype=np.uint32,
+                )
+                self._positions = b"".join(
+                    (
+                        self._positions,
+                        encode_positions(positions, frequencies)
+                        if self.compress
+                        else positions.tobytes(),
+                    )
+                )
+        else:
+            if self.positional:
+                ids, frequencies, positions = self.postings()
+            else:
+                ids, frequencies = self.arrays()
+            self.max_frequency = int(frequencies.max()) if frequencies.size else 0
+            if self.compress:
+                self._ids = encode_varint(np.diff(ids, prepend=np.uint32(0)))
+                self._frequencies = encode_varint(frequencies)
+            else:
+                self._ids = ids.astype(np.uint32).tobytes()
+                self._frequencies = frequencies.astype(np.uint16).tobytes()
+            if self.positional:
+                self._positions = (
+                    encode_positions(positions, frequencies)
+                    if self.compress
+                    else positions.astype(np.uint32).tobytes()
+                )
+        self._last = int(ids[-1]) if ids.size else -1
+        self._blocks = None
+        self._limit = max(TAIL_MIN, self._size >> 3)
+        self._tail = None
+        self._tail_positions = None
+        self._deleted = None
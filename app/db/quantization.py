@@ -0,0 +1,427 @@
+import copy
+import math
+import os
+from abc import abstractmethod
+from typing import Any, List, Optional, Set, Tuple, TYPE_CHECKING
+import numpy as np
+from app.core.math_utils import kmeans, top_k_indices
+from app.db.vector_blocks import EmbeddingBlock
+
+if TYPE_CHECKING:
+    from app.schemas.search import SearchOptions
+
+# Codecs are trained on at most this many sampled rows.
+TRAINING_SAMPLE_SIZE = 65536
+
+# Rows upcast to float32 per batch by the scalar-quantized scan.
+SCAN_BATCH_SIZE = 16384
+
+# Rows encoded per batch, bounding the (rows, m, 256) distance buffer.
+ENCODE_BATCH_SIZE = 1024
+
+# Rows copied out per lock hold while a codec encodes a library off the write path.
+TRAINING_COPY_ROWS = 16384
+
+
+class VectorFile:
+    """Growable float32 row array, memory-mapped from ``path`` when one is given.
+
+    Quantized blocks keep their full-precision originals here so they can be
+    re-scored, and their embeddings rebuilt, without holding them in the Python
+    heap. The file is scratch space that lets the operating system page rows
+    out, not a persistent copy: the checkpoint and the action log are, and the
+    rows are re-added from them on startup. It is therefore truncated when
+    opened and deleted when the block is closed.
+    """
+
+    def __init__(self, dimension: int, capacity: int, path: Optional[str] = None):
+        self.dimension = dimension
+        self.path = path
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            open(path, "wb").close()
+        self.array = self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> np.ndarray:
+        if self.path is None:
+            return np.zeros((capacity, self.dimension), dtype=np.float32)
+        with open(self.path, "r+b") as f:
+            f.truncate(capacity * self.dimension * 4)
+        return np.memmap(
+            self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension)
+        )
+
+    def resize(self, capacity: int, size: int) -> None:
+        if self.path is None:
+            array = self._allocate(capacity)
+            array[:size] = self.array[:size]
+            self.array = array
+        else:
+            self.array.flush()
+            self.array = self._allocate(capacity)
+
+    def close(self) -> None:
+        if self.path is not None:
+            del self.array
+            os.remove(self.path)
+
+
+class ProductQuantizer:
+    """Splits vectors into ``m`` sub-vectors and encodes each with the index of
+    its closest centroid in a per-subspace 256-entry codebook (one byte)."""
+
+    def __init__(self, dimension: int, m: int):
+        self.m = max(1, min(m, dimension))
+        self.dsub = math.ceil(dimension / self.m)
+        self.dimension = dimension
+        self.codebooks: Optional[np.ndarray] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.atleast_2d(vectors)
+        padding = self.m * self.dsub - self.dimension
+        if padding:
+            vectors = np.pad(vectors, ((0, 0), (0, padding)))
+        return vectors.reshape(vectors.shape[0], self.m, self.dsub)
+
+    def train(self, vectors: np.ndarray) -> None:
+        parts = self._split(vectors)
+        ksub = min(256, parts.shape[0])
+        self.codebooks = np.stack(
+            [kmeans(parts[:, j], ksub, n_iter=10, seed=j) for j in range(self.m)]
+        )
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Return ``(m, n)`` codes, laid out per subspace for contiguous scans."""
+        parts = self._split(vectors).transpose(1, 0, 2)
+        centroids = self.codebooks.transpose(0, 2, 1)
+        offsets = 0.5 * np.einsum("jkd,jkd->jk", self.codebooks, self.codebooks)
+        codes = np.empty((self.m, parts.shape[1]), dtype=np.uint8)
+        for start in range(0, parts.shape[1], ENCODE_BATCH_SIZE):
+            scores = parts[:, start : start + ENCODE_BATCH_SIZE] @ centroids
+            scores -= offsets[:, None, :]
+            codes[:, start : start + scores.shape[1]] = np.argmax(scores, axis=2)
+        return codes
+
+    def lookup_table(self, query: np.ndarray) -> np.ndarray:
+        """Inner product of every query sub-vector with every centroid: ``(m, ksub)``."""
+        return np.einsum("jkd,jd->jk", self.codebooks, self._split(query)[0])
+
+    def scores(self, table: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Asymmetric distance computation: approximate inner products from codes."""
+        scores = np.zeros(codes.shape[1], dtype=np.float32)
+        for j in range(self.m):
+            scores += np.take(table[j], codes[j])
+        return scores
+
+
+class QuantizedBlock(EmbeddingBlock):
+    """Row block whose search scan runs over compact codes while normalized
+    float32 originals live in a :class:`VectorFile` for exact re-scoring.
+
+    Until the codec is trained, search is an exact scan of the originals. Once
+    ``min_train_size`` rows exist, the owner trains the codec off the write
+    path: :meth:`training_sample` and :meth:`copy_rows` copy rows out under its
+    lock, :meth:`fit` and :meth:`quantize` run without it, and :meth:`install`
+    swaps the codec in, re-encoding the rows written in the meantime.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        min_train_size: int,
+        rerank: int,
+        path: Optional[str] = None,
+        capacity: int = 64,
+    ):
+        super().__init__(dimension, capacity)
+        self.min_train_size = min_train_size
+        self.rerank = rerank
+        self.originals = VectorFile(dimension, capacity, path)
+        # Chunks written since training started, whose copied codes are stale.
+        self._written: Optional[Set[int]] = None
+
+    @property
+    @abstractmethod
+    def trained(self) -> bool:
+        pass
+
+    @abstractmethod
+    def _fit(self, sample: np.ndarray) -> Any:
+        """A codec trained on ``sample``, leaving the block unchanged."""
+
+    @abstractmethod
+    def _quantize(self, codec: Any, vectors: np.ndarray) -> np.ndarray:
+        """Codes of ``vectors`` under ``codec``, one row per vector."""
+
+    @abstractmethod
+    def _set_codes(self, codec: Any, codes: np.ndarray) -> None:
+        """Make ``codec`` current, with ``codes`` for rows ``[0, size)``."""
+
+    @abstractmethod
+    def _encode(self, row: int, vectors: np.ndarray) -> None:
+        pass
+
+    @abstractmethod
+    def _scan(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Approximate scores of ``rows`` (all live rows if None), in that order."""
+
+    @property
+    def needs_training(self) -> bool:
+        return not self.trained and self.size >= self.min_train_size
+
+    def _resize(self, capacity: int) -> None:
+        self.originals.resize(capacity, self.size)
+        super()._resize(capacity)
+
+    def _write(self, row: int, vector: np.ndarray) -> None:
+        self.originals.array[row] = vector
+        if self.trained:
+            self._encode(row, vector[None, :])
+        elif self._written is not None:
+            self._written.add(int(self.chunk_ids[row]))
+
+    def _move(self, source: int, target: int) -> None:
+        self.originals.array[target] = self.originals.array[source]
+
+    def _row(self, row: int) -> np.ndarray:
+        return np.array(self.originals.array[row])
+
+    def training_sample(self) -> np.ndarray:
+        """Copy of the rows to train the codec on; starts tracking writes."""
+        self._written = set()
+        originals = self.originals.array[: self.size]
+        if self.size <= TRAINING_SAMPLE_SIZE:
+            return np.array(originals)
+        rows = np.random.default_rng(0).choice(
+            self.size, TRAINING_SAMPLE_SIZE, replace=False
+        )
+        return originals[np.sort(rows)]
+
+    def copy_rows(self, start: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Chunk ids and originals of up to ``TRAINING_COPY_ROWS`` rows from ``start``."""
+        end = min(start + TRAINING_COPY_ROWS, self.size)
+        return (
+            self.chunk_ids[start:end].copy(),
+            np.array(self.originals.array[start:end]),
+        )
+
+    def fit(self, sample: np.ndarray) -> Any:
+        return self._fit(sample)
+
+    def quantize(self, codec: Any, vectors: np.ndarray) -> np.ndarray:
+        return self._quantize(codec, vectors)
+
+    def install(self, codec: Any, chunk_ids: np.ndarray, codes: np.ndarray) -> None:
+        """Swap in a codec with the codes it gave the copied ``chunk_ids``.
+        Live rows that were not copied, or were written since, are encoded now."""
+        live = self.chunk_ids[: self.size]
+        merged = np.empty((self.size,) + codes.shape[1:], dtype=codes.dtype)
+        found = np.zeros(self.size, dtype=bool)
+        if len(chunk_ids):
+            order = np.argsort(chunk_ids, kind="stable")
+            positions = np.minimum(
+                np.searchsorted(chunk_ids[order], live), len(chunk_ids) - 1
+            )
+            found = chunk_ids[order][positions] == live
+            if self._written:
+                found &= ~np.isin(live, np.fromiter(self._written, dtype=np.int64))
+            merged[found] = codes[order[positions[found]]]
+        stale = np.flatnonzero(~found)
+        if len(stale):
+            merged[stale] = self._quantize(codec, self.originals.array[stale])
+        self._set_codes(codec, merged)
+        self._written = None
+        self.version += 1
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        originals = self.originals.array[: self.size]
+        if not self.trained:
+            scores = (originals if rows is None else originals[rows]) @ query
+            top = top_k_indices(scores, k)
+            return self._results(top if rows is None else rows[top], scores[top])
+
+        rerank = self.rerank
+        if options is not None and options.rerank is not None:
+            rerank = options.rerank
+        scores = self._scan(query, rows)
+        positions = top_k_indices(scores, max(k, rerank))
+        candidates = positions if rows is None else rows[positions]
+        if not rerank:
+            return self._results(candidates, scores[positions])
+        return self.rescore(query, np.sort(candidates), k)
+
+    def snapshot(self) -> "QuantizedBlock":
+        view = super().snapshot()
+        view.originals = copy.copy(self.originals)
+        return view
+
+    def exact_scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        return self.originals.array[rows] @ query
+
+    def vectors(self) -> np.ndarray:
+        return np.array(self.originals.array[: self.size])
+
+    def close(self) -> None:
+        self.originals.close()
+
+
+class PqBlock(QuantizedBlock):
+    """Product-quantized rows: ``m`` bytes per chunk scored with lookup tables."""
+
+    storage = "pq"
+
+    def __init__(
+        self,
+        dimension: int,
+        m: int,
+        min_train_size: int,
+        rerank: int,
+        path: Optional[str] = None,
+        capacity: int = 64,
+    ):
+        self.quantizer = ProductQuantizer(dimension, m)
+        self.codes = np.zeros((self.quantizer.m, capacity), dtype=np.uint8)
+        super().__init__(dimension, min_train_size, rerank, path, capacity)
+
+    @property
+    def trained(self) -> bool:
+        return self.quantizer.trained
+
+    def _fit(self, sample: np.ndarray) -> ProductQuantizer:
+        quantizer = ProductQuantizer(self.dimension, self.quantizer.m)
+        quantizer.train(sample)
+        return quantizer
+
+    def _quantize(self, codec: ProductQuantizer, vectors: np.ndarray) -> np.ndarray:
+        return codec.encode(vectors).T
+
+    def _set_codes(self, codec: ProductQuantizer, codes: np.ndarray) -> None:
+        self.quantizer = codec
+        self.codes[:, : self.size] = codes.T
+
+    def _encode(self, row: int, vectors: np.ndarray) -> None:
+        self.codes[:, row : row + len(vectors)] = self.quantizer.encode(vectors)
+
+    def _scan(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        table = self.quantizer.lookup_table(query)
+        codes = self.codes[:, : self.size] if rows is None else self.codes[:, rows]
+        return self.quantizer.scores(table, codes)
+
+    def _resize(self, capacity: int) -> None:
+        codes = np.zeros((self.quantizer.m, capacity), dtype=np.uint8)
+        codes[:, : self.size] = self.codes[:, : self.size]
+        self.codes = codes
+        super()._resize(capacity)
+
+    def _move(self, source: int, target: int) -> None:
+        self.codes[:, target] = self.codes[:, source]
+        super()._move(source, target)
+
+
+class ScalarQuantizedBlock(QuantizedBlock):
+    """Rows stored element-wise in a narrower dtype; the scan upcasts one batch
+    of codes at a time so the float32 working set stays bounded."""
+
+    code_dtype = np.float16
+
+    def __init__(
+        self,
+        dimension: int,
+        min_train_size: int,
+        rerank: int,
+        path: Optional[str] = None,
+        capacity: int = 64,
+    ):
+        self.codes = np.zeros((capacity, dimension), dtype=self.code_dtype)
+        self.codec: Any = None
+        super().__init__(dimension, min_train_size, rerank, path, capacity)
+
+    @abstractmethod
+    def _query_weights(self, query: np.ndarray) -> np.ndarray:
+        pass
+
+    def _set_codes(self, codec: Any, codes: np.ndarray) -> None:
+        self.codec = codec
+        self.codes[: self.size] = codes
+
+    def _encode(self, row: int, vectors: np.ndarray) -> None:
+        self.codes[row : row + len(vectors)] = self._quantize(self.codec, vectors)
+
+    def _scan(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        weights = self._query_weights(query)
+        count = self.size if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SCAN_BATCH_SIZE):
+            end = min(start + SCAN_BATCH_SIZE, count)
+            codes = (
+                self.codes[start:end] if rows is None else self.codes[rows[start:end]]
+            )
+            scores[start:end] = codes.astype(np.float32) @ weights
+        return scores
+
+    def _resize(self, capacity: int) -> None:
+        codes = np.zeros((capacity, self.dimension), dtype=self.code_dtype)
+        codes[: self.size] = self.codes[: self.size]
+        self.codes = codes
+        super()._resize(capacity)
+
+    def _move(self, source: int, target: int) -> None:
+        self.codes[target] = self.codes[source]
+        super()._move(source, target)
+
+
+class Float16Block(ScalarQuantizedBlock):
+    """Half-precision rows: 2 bytes per dimension, no training required."""
+
+    storage = "float16"
+    code_dtype = np.float16
+
+    @property
+    def trained(self) -> bool:
+        return True
+
+    def _fit(self, sample: np.ndarray) -> None:
+        return None
+
+    def _quantize(self, codec: None, vectors: np.ndarray) -> np.ndarray:
+        return vectors.astype(np.float16)
+
+    def _query_weights(self, query: np.ndarray) -> np.ndarray:
+        return query
+
+
+class Int8Block(ScalarQuantizedBlock):
+    """Rows quantized to int8 with one scale per dimension (``max |x| / 127``),
+    the block's codec.
+
+    Scores are ``codes @ (query * scales)``, so the scales are folded into the
+    query once instead of dequantizing every row.
+    """
+
+    storage = "int8"
+    code_dtype = np.int8
+
+    @property
+    def trained(self) -> bool:
+        return self.codec is not None
+
+    def _fit(self, sample: np.ndarray) -> np.ndarray:
+        scales = np.abs(sample).max(axis=0) / 127.0
+        scales[scales == 0] = 1.0
+        return scales.astype(np.float32)
+
+    def _quantize(self, codec: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / codec), -127, 127).astype(np.int8)
+
+    def _query_weights(self, query: np.ndarray) -> np.ndarray:
+        return query * self.codec
@@ -1,28 +1,41 @@
 import threading
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, Iterable, List, Optional, Any, Callable, Set
+import numpy as np
 from app.db.models import Chunk
 from app.interfaces.repositories.chunk_repository import IChunkRepository
 from app.interfaces.repositories.replayable_repository import IReplayableRepository
 from app.interfaces.id_generation import IIdGenerator
 from app.interfaces.persistence import IPersistenceManager
 from app.interfaces.repositories.document_repository import IDocumentRepository
+from app.interfaces.indexing import IVectorIndex, IVectorStore
 
 ReplayHandler = Callable[[str, Dict[str, Any]], None]
 
 
 class ChunkRepository(IChunkRepository, IReplayableRepository):
+    """Chunks of libraries whose vector store rebuilds full embeddings (the
+    quantized storage modes) are kept without their ``embedding`` list, which
+    would dwarf the encoded row; it is filled in from the store on read."""
+
     def __init__(
         self,
         storage: Dict[int, Chunk],
         id_generator: IIdGenerator,
         persistence_manager: IPersistenceManager,
         document_repository: IDocumentRepository,
+        vector_store: IVectorStore,
+        vector_indexes: List[IVectorIndex],
         lock: threading.RLock,
     ):
         self.chunks: Dict[int, Chunk] = storage
+        self.document_chunks: Dict[int, Set[int]] = {}
+        for chunk in storage.values():
+            self._link_document(chunk.document_id, chunk.id)
         self.id_generator = id_generator
         self.persistence_manager = persistence_manager
         self.document_repository = document_repository
+        self.vector_store = vector_store
+        self.vector_indexes = vector_indexes
         self.lock = lock
         self._replay_mode = False
 
@@ -38,30 +51,93 @@ class ChunkRepository(IChunkRepository, IReplayableRepository):
             raise EntityNotFoundError.document(document_id)
         return document.library_id
 
+    def _link_document(self, document_id: int, chunk_id: int) -> None:
+        self.document_chunks.setdefault(document_id, set()).add(chunk_id)
+
+    def _unlink_document(self, document_id: int, chunk_id: int) -> None:
+        chunk_ids = self.document_chunks.get(document_id)
+        if chunk_ids is not None:
+            chunk_ids.discard(chunk_id)
+            if not chunk_ids:
+                del self.document_chunks[document_id]
+
+    def _index_embedding(
+        self, library_id: int, chunk_id: int, embedding: List[float]
+    ) -> None:
+        for vector_index in self.vector_indexes:
+            vector_index.add(library_id, chunk_id, embedding)
+
+    def _stored_embedding(
+        self, library_id: int, embedding: Optional[List[float]]
+    ) -> Optional[List[float]]:
+        if self.vector_store.keeps_embeddings(library_id):
+            return None
+        return embedding
+
+    def embedding_vector(self, chunk: Chunk) -> Optional[np.ndarray]:
+        """The chunk's embedding as float32, from the vector store if the chunk
+        was stored without it."""
+        if chunk.embedding is not None:
+            return np.asarray(chunk.embedding, dtype=np.float32)
+        return self.vector_store.get_embedding(chunk.library_id, chunk.id)
+
+    def _resolve(self, chunk: Optional[Chunk]) -> Optional[Chunk]:
+        if chunk is None or chunk.embedding is not None:
+            return chunk
+        embedding = self.vector_store.get_embedding(chunk.library_id, chunk.id)
+        if embedding is None:
+            return chunk
+        return chunk.model_copy(update={"embedding": embedding.tolist()})
+
     def get(self, chunk_id: int) -> Optional[Chunk]:
         with self.lock:
-            return self.chunks.get(chunk_id)
+            return self._resolve(self.chunks.get(chunk_id))
 
     def get_by_document(self, document_id: int) -> List[Chunk]:
         with self.lock:
             return [
-                chunk
+                self._resolve(chunk)
                 for chunk in self.chunks.values()
                 if chunk.document_id == document_id
             ]
 
+    def get_ids_by_documents(self, document_ids: Iterable[int]) -> Set[int]:
+        with self.lock:
+            chunk_ids: Set[int] = set()
+            for document_id in document_ids:
+                chunk_ids |= self.document_chunks.get(document_id, set())
+            return chunk_ids
+
     def get_by_library(self, library_id: int) -> List[Chunk]:
         with self.lock:
             return [
-                chunk
+                self._resolve(chunk)
                 for chunk in self.chunks.values()
                 if chunk.library_id == library_id
             ]
 
     def get_all(self) -> List[Chunk]:
+        with self.lock:
+            return [self._resolve(chunk) for chunk in self.chunks.values()]
+
+    def get_stored(self) -> List[Chunk]:
+        """All chunks as stored, some without their embedding (see
+        :meth:`embedding_vector`)."""
         with self.lock:
             return list(self.chunks.values())
 
+    def sync_embeddings(self, library_id: Optional[int] = None) -> None:
+        """Drop the embedding lists of chunks whose library (any library if
+        None) has since moved to a storage mode that rebuilds them."""
+        with self.lock:
+            for chunk in list(self.chunks.values()):
+                if (
+                    chunk.embedding is not None
+                    and library_id in (None, chunk.library_id)
+                    and self.vector_store.keeps_embeddings(chunk.library_id)
+                ):
+                    self.chunks[chunk.id] = chunk.model_copy(update={"embedding": None})
+
     def create(
         self,
         text: str,
@@ -73,14 +149,20 @@ class ChunkRepository(IChunkRepository, IReplayableRepository):
             new_id = (
                 disk_id if disk_id is not None else self.id_generator.get_new_chunk_id()
             )
+            library_id = self._get_lib_id_from_document(document_id)
+            if embedding is not None:
+                self._index_embedding(library_id, new_id, embedding)
             new_chunk = Chunk(
                 id=new_id,
                 text=text,
                 document_id=document_id,
-                library_id=self._get_lib_id_from_document(document_id),
+                library_id=library_id,
                 embedding=embedding,
             )
-            self.chunks[new_id] = new_chunk
+            self.chunks[new_id] = new_chunk.model_copy(
+                update={"embedding": self._stored_embedding(library_id, embedding)}
+            )
+            self._link_document(document_id, new_id)
             if disk_id is not None:
                 self.id_generator.set_chunk_id(disk_id)
             if not self._replay_mode:
@@ -90,7 +172,7 @@ class ChunkRepository(IChunkRepository, IReplayableRepository):
                         "id": new_id,
                         "text": text,
                         "document_id": document_id,
-                        "library_id": self._get_lib_id_from_document(document_id),
+                        "library_id": library_id,
                         "embedding": embedding,
                     },
                 )
@@ -104,15 +186,21 @@ class ChunkRepository(IChunkRepository, IReplayableRepository):
         embedding: Optional[List[float]],
     ) -> Optional[Chunk]:
         with self.lock:
-            chunk = self.get(chunk_id)
+            chunk = self.chunks.get(chunk_id)
             if not chunk:
                 return None
+            chunk = chunk.model_copy()
+            if embedding is not None:
+                self._index_embedding(chunk.library_id, chunk_id, embedding)
             if text is not None:
                 chunk.text = text
             if document_id is not None:
+                self._unlink_document(chunk.document_id, chunk_id)
+                self._link_document(document_id, chunk_id)
                 chunk.document_id = document_id
             if embedding is not None:
-                chunk.embedding = embedding
+                chunk.embedding = self._stored_embedding(chunk.library_id, embedding)
+            self.chunks[chunk_id] = chunk
             if not self._replay_mode:
                 self._persist(
                     "update_chunk",
@@ -123,17 +211,30 @@ class ChunkRepository(IChunkRepository, IReplayableRepository):
                         "embedding": embedding,
                     },
                 )
-            return chunk
+            return self._resolve(chunk)
 
     def delete(self, chunk_id: int) -> bool:
         with self.lock:
-            if chunk_id not in self.chunks:
+            chunk = self.chunks.pop(chunk_id, None)
+            if chunk is None:
                 return False
-            del self.chunks[chunk_id]
+            self._unlink_document(chunk.document_id, chunk_id)
+            for vector_index in self.vector_indexes:
+                vector_index.remove(chunk.library_id, chunk_id)
             if not self._replay_mode:
                 self._persist("delete_chunk", {"id": chunk_id})
             return True
 
+    def restore(self, entities: Iterable[Chunk]) -> None:
+        with self.lock:
+            for chunk in entities:
+                self._link_document(chunk.document_id, chunk.id)
+                if chunk.embedding is not None:
+                    self._index_embedding(chunk.library_id, chunk.id, chunk.embedding)
+                    if self.vector_store.keeps_embeddings(chunk.library_id):
+                        chunk = chunk.model_copy(update={"embedding": None})
+                self.chunks[chunk.id] = chunk
+
     def get_replay_handlers(self) -> Dict[str, ReplayHandler]:
         return {
             "create_chunk": lambda _action, data: self.create(
@@ -1,5 +1,5 @@
 import threading
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, Iterable, List, Optional, Any, Callable
 from app.db.models import Document
 from app.interfaces.repositories.document_repository import IDocumentRepository
 from app.interfaces.repositories.replayable_repository import IReplayableRepository
@@ -65,8 +65,10 @@ class DocumentRepository(IDocumentRepository, IReplayableRepository):
             document = self.get(document_id)
             if not document:
                 return None
+            document = document.model_copy()
             if name is not None:
                 document.name = name
+            self.documents[document_id] = document
             self._persist("update_document", {"id": document_id, "name": name})
             return document
 
@@ -78,6 +80,11 @@ class DocumentRepository(IDocumentRepository, IReplayableRepository):
             self._persist("delete_document", {"id": document_id})
             return True
 
+    def restore(self, entities: Iterable[Document]) -> None:
+        with self.lock:
+            for document in entities:
+                self.documents[document.id] = document
+
     def get_replay_handlers(self) -> Dict[str, ReplayHandler]:
         return {
             "create_document": lambda _action, data: self.create(
@@ -1,10 +1,11 @@
 import threading
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, Iterable, List, Optional, Any, Callable
 from app.db.models import Library
 from app.interfaces.repositories.library_repository import ILibraryRepository
 from app.interfaces.repositories.replayable_repository import IReplayableRepository
 from app.interfaces.id_generation import IIdGenerator
 from app.interfaces.persistence import IPersistenceManager
+from app.interfaces.indexing import IInvertedIndex, IVectorIndex, IVectorStore
 
 ReplayHandler = Callable[[str, Dict[str, Any]], None]
 
@@ -15,11 +16,17 @@ class LibraryRepository(ILibraryRepository, IReplayableRepository):
         storage: Dict[int, Library],
         id_generator: IIdGenerator,
         persistence_manager: IPersistenceManager,
+        vector_store: IVectorStore,
+        inverted_index: IInvertedIndex,
         lock: threading.RLock,
+        vector_indexes: Optional[List[IVectorIndex]] = None,
     ):
         self.libraries: Dict[int, Library] = storage
         self.id_generator = id_generator
         self.persistence_manager = persistence_manager
+        self.vector_store = vector_store
+        self.inverted_index = inverted_index
+        self.vector_indexes = vector_indexes or [vector_store]
         self.lock = lock
         self._replay_mode = False
 
@@ -35,28 +42,68 @@ class LibraryRepository(ILibraryRepository, IReplayableRepository):
         with self.lock:
             return list(self.libraries.values())
 
-    def create(self, name: str, disk_id: Optional[int] = None) -> Library:
+    def create(
+        self,
+        name: str,
+        disk_id: Optional[int] = None,
+        vector_storage: str = "float32",
+        analyzer: str = "default",
+    ) -> Library:
         with self.lock:
             new_id = (
                 disk_id
                 if disk_id is not None
                 else self.id_generator.get_new_library_id()
             )
-            new_library = Library(id=new_id, name=name)
+            new_library = Library(
+                id=new_id, name=name, vector_storage=vector_storage, analyzer=analyzer
+            )
             self.libraries[new_id] = new_library
+            self.vector_store.set_storage(new_id, vector_storage)
+            self.inverted_index.set_analyzer(new_id, analyzer)
             if disk_id is not None:
                 self.id_generator.set_library_id(disk_id)
-            self._persist("create_library", {"id": new_id, "name": name})
+            self._persist(
+                "create_library",
+                {
+                    "id": new_id,
+                    "name": name,
+                    "vector_storage": vector_storage,
+                    "analyzer": analyzer,
+                },
+            )
             return new_library
 
-    def update(self, library_id: int, name: Optional[str]) -> Optional[Library]:
+    def update(
+        self,
+        library_id: int,
+        name: Optional[str],
+        vector_storage: Optional[str] = None,
+        analyzer: Optional[str] = None,
+    ) -> Optional[Library]:
         with self.lock:
             library = self.get(library_id)
             if not library:
                 return None
+            library = library.model_copy()
             if name is not None:
                 library.name = name
-            self._persist("update_library", {"id": library_id, "name": name})
+            if vector_storage is not None:
+                library.vector_storage = vector_storage
+                self.vector_store.set_storage(library_id, vector_storage)
+            if analyzer is not None:
+                library.analyzer = analyzer
+                self.inverted_index.set_analyzer(library_id, analyzer)
+            self.libraries[library_id] = library
+            self._persist(
+                "update_library",
+                {
+                    "id": library_id,
+                    "name": name,
+                    "vector_storage": vector_storage,
+                    "analyzer": analyzer,
+                },
+            )
             return library
 
     def delete(self, library_id: int) -> bool:
@@ -64,16 +111,31 @@ class LibraryRepository(ILibraryRepository, IReplayableRepository):
             if library_id not in self.libraries:
                 return False
             del self.libraries[library_id]
+            for vector_index in self.vector_indexes:
+                vector_index.drop_library(library_id)
             self._persist("delete_library", {"id": library_id})
             return True
 
+    def restore(self, entities: Iterable[Library]) -> None:
+        with self.lock:
+            for library in entities:
+                self.libraries[library.id] = library
+                self.vector_store.set_storage(library.id, library.vector_storage)
+                self.inverted_index.set_analyzer(library.id, library.analyzer)
+
     def get_replay_handlers(self) -> Dict[str, ReplayHandler]:
         return {
             "create_library": lambda _action, data: self.create(
-                data["name"], disk_id=data["id"]
+                data["name"],
+                disk_id=data["id"],
+                vector_storage=data.get("vector_storage", "float32"),
+                analyzer=data.get("analyzer", "default"),
             ),
             "update_library": lambda _action, data: self.update(
-                data["id"], data.get("name")
+                data["id"],
+                data.get("name"),
+                data.get("vector_storage"),
+                data.get("analyzer"),
             ),
             "delete_library": lambda _action, data: self.delete(data["id"]),
         }
@@ -1,5 +1,6 @@
 import threading
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
+from app.core.filters import ChunkFilter
 from app.db.models import Chunk
 from app.interfaces.repositories.search_repository import ISearchRepository
 from app.interfaces.repositories.chunk_repository import IChunkRepository
@@ -18,17 +19,39 @@ class SearchRepository(ISearchRepository):
         self.lock = lock
 
     def search_word(
-        self, query: str, library_id: Optional[int] = None
-    ) -> List[Tuple[Chunk, int]]:
+        self,
+        query: str,
+        library_id: Optional[int] = None,
+        chunk_filter: Optional[ChunkFilter] = None,
+        k: Optional[int] = None,
+        fuzziness: Optional[int] = None,
+    ) -> List[Tuple[Chunk, float]]:
+        return self.search_words([query], library_id, chunk_filter, k, fuzziness)[0]
+
+    def search_words(
+        self,
+        queries: List[str],
+        library_id: Optional[int] = None,
+        chunk_filter: Optional[ChunkFilter] = None,
+        k: Optional[int] = None,
+        fuzziness: Optional[int] = None,
+    ) -> List[List[Tuple[Chunk, float]]]:
+        """Matching chunks per query, best first; only the top ``k`` are
+        scored to completion and fetched when ``k`` is given."""
         with self.lock:
-            scores = self.inverted_index.search_word(query)
-            results = []
-            for chunk_id, score in scores.items():
-                chunk = self.chunk_repository.get(chunk_id)
-                if chunk is None:
-                    continue
-                if library_id is not None and chunk.library_id != library_id:
-                    continue
-                results.append((chunk, score))
-            results.sort(key=lambda x: x[1], reverse=True)
-            return results
+            chunks: Dict[int, Optional[Chunk]] = {}
+            batch = []
+            batch_scores = self.inverted_index.search_words(
+                queries, chunk_filter, library_id=library_id, k=k, fuzziness=fuzziness
+            )
+            for scores in batch_scores:
+                results = []
+                for chunk_id, score in scores.items():
+                    if chunk_id not in chunks:
+                        chunks[chunk_id] = self.chunk_repository.get(chunk_id)
+                    chunk = chunks[chunk_id]
+                    if chunk is not None:
+                        results.append((chunk, score))
+                results.sort(key=lambda x: x[1], reverse=True)
+                batch.append(results)
+            return batch
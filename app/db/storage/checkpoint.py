@@ -0,0 +1,195 @@
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from app.db.index_snapshot import read_snapshot, write_snapshot
+from app.db.models import Chunk, Document, Library
+from app.db.repositories.chunk_repository import ChunkRepository
+from app.db.repositories.document_repository import DocumentRepository
+from app.db.repositories.library_repository import LibraryRepository
+from app.interfaces.id_generation import IIdGenerator
+from app.interfaces.indexing import IInvertedIndex
+from app.interfaces.persistence import ICheckpointer, IPersistenceManager
+
+
+def _chunk_arrays(
+    chunks: List[Chunk], embeddings: List[Optional[np.ndarray]]
+) -> Dict[str, np.ndarray]:
+    texts = [chunk.text.encode("utf-8") for chunk in chunks]
+    # -1 marks a chunk without an embedding, as opposed to an empty one.
+    sizes = np.fromiter(
+        (-1 if embedding is None else len(embedding) for embedding in embeddings),
+        dtype=np.int64,
+        count=len(chunks),
+    )
+    return {
+        "ids": np.fromiter((chunk.id for chunk in chunks), np.int64, len(chunks)),
+        "document_ids": np.fromiter(
+            (chunk.document_id for chunk in chunks), np.int64, len(chunks)
+        ),
+        "library_ids": np.fromiter(
+            (chunk.library_id for chunk in chunks), np.int64, len(chunks)
+        ),
+        "texts": np.frombuffer(b"".join(texts), dtype=np.uint8),
+        "text_ends": np.cumsum([len(text) for text in texts], dtype=np.int64),
+        "embeddings": np.concatenate(
+            [np.empty(0, dtype=np.float32)]
+            + [embedding for embedding in embeddings if embedding is not None]
+        ),
+        "embedding_sizes": sizes,
+    }
+
+
+def _chunks(arrays: Dict[str, np.ndarray]) -> List[Chunk]:
+    texts = arrays["texts"].tobytes()
+    embeddings = arrays["embeddings"]
+    chunks = []
+    text_start = embedding_start = 0
+    for chunk_id, document_id, library_id, text_end, size in zip(
+        arrays["ids"].tolist(),
+        arrays["document_ids"].tolist(),
+        arrays["library_ids"].tolist(),
+        arrays["text_ends"].tolist(),
+        arrays["embedding_sizes"].tolist(),
+    ):
+        embedding = None
+        if size >= 0:
+            embedding = embeddings[embedding_start : embedding_start + size].tolist()
+            embedding_start += size
+        # Fields were validated when the chunk was first created.
+        chunks.append(
+            Chunk.model_construct(
+                id=chunk_id,
+                text=texts[text_start:text_end].decode("utf-8"),
+                document_id=document_id,
+                library_id=library_id,
+                embedding=embedding,
+            )
+        )
+        text_start = text_end
+    return chunks
+
+
+class Checkpointer(ICheckpointer):
+    """Writes the libraries, documents and chunks to a binary checkpoint,
+    embeddings as float32 arrays, then deletes the log segments it covers.
+    Startup loads the checkpoint and replays only the log written after it.
+
+    The repositories are locked only to take their entity lists and id
+    counters and to queue a log rotation at that point; updates replace
+    entities instead of changing them, so the lists stay consistent while
+    they are written out. Once started, a checkpoint is taken every
+    ``interval_s`` seconds if the log grew by ``min_log_bytes`` since the
+    last one.
+
+    Given an ``inverted_index``, each checkpoint also snapshots it to
+    ``keyword_index_path`` at the same log offset, before the log up to that
+    offset is deleted, so a restart after a crash only re-indexes the log
+    tail rather than every chunk."""
+
+    def __init__(
+        self,
+        path: str,
+        persistence_manager: IPersistenceManager,
+        library_repository: LibraryRepository,
+        document_repository: DocumentRepository,
+        chunk_repository: ChunkRepository,
+        id_generator: IIdGenerator,
+        interval_s: float = 60.0,
+        min_log_bytes: int = 64 << 20,
+        inverted_index: Optional[IInvertedIndex] = None,
+        keyword_index_path: str = "",
+    ):
+        self.path = path
+        self.persistence_manager = persistence_manager
+        self.library_repository = library_repository
+        self.document_repository = document_repository
+        self.chunk_repository = chunk_repository
+        self.id_generator = id_generator
+        self.interval = interval_s
+        self.min_log_bytes = min_log_bytes
+        self.inverted_index = inverted_index
+        self.keyword_index_path = keyword_index_path
+        self._log_offset = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def checkpoint(self) -> int:
+        """Write a checkpoint and return the log offset it was taken at."""
+        with self._lock:
+            # Chunk, document, library: the order repository methods nest in.
+            with (
+                self.chunk_repository.lock,
+                self.document_repository.lock,
+                self.library_repository.lock,
+            ):
+                libraries = self.library_repository.get_all()
+                documents = self.document_repository.get_all()
+                chunks = self.chunk_repository.get_stored()
+                next_ids = self.id_generator.get_next_ids()
+                rotation = self.persistence_manager.rotate()
+            log_offset = rotation.result()
+            # Converted one embedding at a time, so that writers get the GIL in
+            # between. Embeddings the vector store holds are read after the
+            # cut; replaying the log from it re-applies any later update.
+            embeddings = [
+                self.chunk_repository.embedding_vector(chunk) for chunk in chunks
+            ]
+            header = {
+                "log_offset": log_offset,
+                "next_ids": next_ids,
+                "libraries": [library.model_dump() for library in libraries],
+                "documents": [document.model_dump() for document in documents],
+            }
+            write_snapshot(self.path, header, _chunk_arrays(chunks, embeddings))
+            if self.inverted_index is not None and self.keyword_index_path:
+                self.inverted_index.save_snapshot(self.keyword_index_path, log_offset)
+            self.persistence_manager.discard_before(log_offset)
+            self._log_offset = log_offset
+            return log_offset
+
+    def restore(self) -> int:
+        """Load the checkpoint into the repositories and return the log offset
+        to replay from, the start of the log if there is no checkpoint."""
+        snapshot = read_snapshot(self.path)
+        if snapshot is None:
+            self._log_offset = self.persistence_manager.start_offset()
+            return self._log_offset
+        header, arrays = snapshot
+        self.library_repository.restore(Library(**data) for data in header["libraries"])
+        self.document_repository.restore(
+            Document(**data) for data in header["documents"]
+        )
+        self.chunk_repository.restore(_chunks(arrays))
+        library_id, document_id, chunk_id = header["next_ids"]
+        self.id_generator.set_library_id(library_id - 1)
+        self.id_generator.set_document_id(document_id - 1)
+        self.id_generator.set_chunk_id(chunk_id - 1)
+        # Segments left behind by a crash right after the checkpoint was written.
+        self.persistence_manager.discard_before(header["log_offset"])
+        self._log_offset = header["log_offset"]
+        return self._log_offset
+
+    def start(self) -> None:
+        if self.interval > 0 and self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="checkpointer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopped.set()
+            thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            log_size = self.persistence_manager.end_offset() - self._log_offset
+            if log_size >= self.min_log_bytes:
+                try:
+                    self.checkpoint()
+                except OSError:
+                    # Keep the log whole; the next interval tries again.
+                    pass
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import Future
+from typing import Iterator, List, Optional
+from app.core.exceptions import ValidationError
+
+# From weakest to strongest; see ``Storage``.
+DURABILITY_LEVELS = ("none", "flush", "fsync-batched", "fsync-each")
+NONE, FLUSH, FSYNC_BATCHED, FSYNC_EACH = range(len(DURABILITY_LEVELS))
+
+
+def durability_level(name: str) -> int:
+    if name not in DURABILITY_LEVELS:
+        raise ValidationError(f"unknown durability level '{name}'", field="durability")
+    return DURABILITY_LEVELS.index(name)
+
+
+class DurabilityScope:
+    """The durability level asked for by one unit of work, e.g. an API
+    request (None keeps the storage's own), and the futures of the actions
+    it logged, to be waited on once it no longer holds any lock."""
+
+    def __init__(self, level: Optional[str] = None):
+        self.level = level
+        self.futures: List[Future] = []
+
+
+_scope: ContextVar[Optional[DurabilityScope]] = ContextVar(
+    "durability_scope", default=None
+)
+
+
+def current_scope() -> Optional[DurabilityScope]:
+    return _scope.get()
+
+
+@contextmanager
+def durability_scope(level: Optional[str] = None) -> Iterator[DurabilityScope]:
+    """Log the actions of the enclosed code with ``level`` and collect their
+    futures on the yielded scope."""
+    scope = DurabilityScope(level)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
@@ -5,6 +5,8 @@ from app.interfaces.persistence import (
     IActionHandlerProvider,
     IReplayModeManager,
 )
+from app.db.storage.durability import current_scope
+from concurrent.futures import Future
 from typing import Dict, Any, Generator, Tuple
 
 
@@ -13,23 +15,49 @@ class PersistenceManager(IPersistenceManager):
         self.storage = storage
         self.logger = logger
 
-    def save_action(self, action: str, data: Dict[str, Any]) -> None:
-        self.logger.serialize_action(action, data)
-        self.storage.save_action(action, data)
+    def save_action(self, action: str, data: Dict[str, Any]) -> Future:
+        """Queue an action for the log; the future resolves once it is written.
+        Inside a ``durability_scope`` the action takes the scope's level and
+        its future is added to the scope."""
+        scope = current_scope()
+        record = self.logger.serialize_action(action, data)
+        if scope is None:
+            return self.storage.save_action(record)
+        future = self.storage.save_action(record, scope.level)
+        scope.futures.append(future)
+        return future
 
-    def load_actions(self) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
-        for action, data in self.storage.load_actions():
+    def close(self) -> None:
+        self.storage.close()
+
+    def load_actions(
+        self, start: int = 0
+    ) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+        for action, data in self.storage.load_actions(start):
             yield action, data
 
+    def end_offset(self) -> int:
+        return self.storage.end_offset()
+
+    def start_offset(self) -> int:
+        return self.storage.start_offset()
+
+    def rotate(self) -> Future:
+        return self.storage.rotate()
+
+    def discard_before(self, offset: int) -> None:
+        self.storage.discard_before(offset)
+
     def replay_actions(
         self,
         handler_provider: IActionHandlerProvider,
         replay_mode_manager: IReplayModeManager,
+        start: int = 0,
     ) -> None:
         replay_mode_manager.set_replay_mode(True)
         try:
             action_handlers = handler_provider.get_action_handlers()
-            for action, data in self.load_actions():
+            for action, data in self.load_actions(start):
                 handler = action_handlers.get(action)
                 if handler:
                     handler(action, data)
@@ -1,13 +1,75 @@
 import json
 import os
-from typing import Dict, Any, Generator, Tuple
+import threading
+import time
+from concurrent.futures import Future
+from typing import BinaryIO, Dict, Any, Generator, List, Optional, Tuple
+from app.db.index_snapshot import fsync_directory
+from app.db.storage.durability import (
+    FLUSH,
+    FSYNC_BATCHED,
+    FSYNC_EACH,
+    NONE,
+    durability_level,
+)
 from app.interfaces.persistence import IStorage
 
+# First record of every segment after the first: the log offset it starts at.
+SEGMENT_ACTION = "log_segment"
+
 
 class Storage(IStorage):
-    def __init__(self, file_path: str):
+    """Append-only JSONL action log written with group commit.
+
+    ``save_action`` only queues a serialized record and returns a future. A
+    background flusher thread, started on the first write, takes the queued
+    records as one group, writes it with a single call on a file handle kept
+    open and resolves the group's futures once it is as durable as asked
+    (see ``DURABILITY_LEVELS``). Records queued while a group is being
+    written form the next group. With ``group_window_ms``, the flusher also
+    waits that long after the first record for more, unless ``group_bytes``
+    are already queued. Writers block while more than eight groups' worth of
+    records wait to be written.
+
+    A group is handled at the strongest level of its records:
+
+    * ``none``: left in the file's buffer, so a process crash may lose it;
+    * ``flush``: flushed to the operating system;
+    * ``fsync-batched``: flushed, and fsynced at most ``fsync_interval_ms``
+      later, which bounds what a power loss may lose;
+    * ``fsync-each``: flushed and fsynced before its futures resolve.
+
+    The log is a series of segments addressed by one offset space: ``rotate``
+    closes the current file as ``<file_path>.<start offset>`` and starts a new
+    one after the actions queued so far, so segments a checkpoint covers can
+    be deleted without rewriting the log.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        group_bytes: int = 1 << 20,
+        group_window_ms: float = 0.0,
+        durability: str = "flush",
+        fsync_interval_ms: float = 100.0,
+    ):
         self.file_path = os.path.abspath(file_path)
+        self.group_bytes = group_bytes
+        self.group_window = group_window_ms / 1000
+        self.durability = durability_level(durability)
+        self.fsync_interval = fsync_interval_ms / 1000
         self._check_file_exists()
+        self._segment_start = self._read_segment_start()
+        self._condition = threading.Condition()
+        # A None record asks the flusher to rotate the log at that point.
+        self._queue: List[Tuple[Optional[bytes], Future, int]] = []
+        self._synced_at = 0.0
+        self._unsynced = False
+        self._queued_bytes = 0
+        self._last: Optional[Future] = None
+        self._file: Optional[BinaryIO] = None
+        self._flusher: Optional[threading.Thread] = None
+        self._closing = False
 
     def _check_file_exists(self) -> None:
         """Create the file if it doesn't exist."""
@@ -15,23 +77,212 @@ class Storage(IStorage):
             with open(self.file_path, "w", encoding="utf-8") as f:
                 f.write("")
 
-    def save_action(self, action: str, data: Dict[str, Any]) -> None:
-        log = {"action": action, "data": data}
-        with open(self.file_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(log) + "\n")
-            f.flush()
+    def _segments(self) -> List[Tuple[int, str]]:
+        """Start offsets and paths of the rotated segments, oldest first."""
+        directory, name = os.path.split(self.file_path)
+        segments = []
+        for entry in os.listdir(directory):
+            suffix = entry[len(name) + 1 :]
+            if entry.startswith(f"{name}.") and suffix.isdigit():
+                segments.append((int(suffix), os.path.join(directory, entry)))
+        return sorted(segments)
+
+    def _read_segment_start(self) -> int:
+        with open(self.file_path, "rb") as f:
+            first = f.readline()
+        if SEGMENT_ACTION.encode("utf-8") in first[:64]:
+            return json.loads(first)["data"]["start"]
+        # A log that was never rotated, or whose new segment was not created
+        # before a crash, follows the last rotated segment.
+        segments = self._segments()
+        if not segments:
+            return 0
+        start, path = segments[-1]
+        return start + os.path.getsize(path)
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None:
+            self._file = open(self.file_path, "ab")
+            self._closing = False
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="action-log-flusher", daemon=True
+            )
+            self._flusher.start()
+
+    def save_action(self, record: str, durability: Optional[str] = None) -> Future:
+        """Queue a serialized action; the future resolves once it is written
+        with the storage's durability, or the one given for this action."""
+        level = self.durability if durability is None else durability_level(durability)
+        future: Future = Future()
+        data = (record + "\n").encode("utf-8")
+        with self._condition:
+            while self._queued_bytes > 8 * self.group_bytes:
+                self._condition.wait()
+            self._start_flusher()
+            self._queue.append((data, future, level))
+            self._queued_bytes += len(data)
+            self._last = future
+            if len(self._queue) == 1 or self._queued_bytes >= self.group_bytes:
+                self._condition.notify_all()
+        return future
+
+    def rotate(self) -> Future:
+        """Start a new segment after the actions queued so far. The future
+        resolves to the log offset it starts at, once the previous segment is
+        fsynced and renamed."""
+        future: Future = Future()
+        with self._condition:
+            self._start_flusher()
+            self._queue.append((None, future, FSYNC_EACH))
+            self._last = future
+            self._condition.notify_all()
+        return future
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._closing:
+                    if self._unsynced:
+                        # A batched fsync is due even if no other write comes.
+                        remaining = (
+                            self._synced_at + self.fsync_interval - time.monotonic()
+                        )
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if not self._queue and self._closing:
+                    return
+                if self._queue and self.group_window > 0 and not self._closing:
+                    self._condition.wait_for(
+                        lambda: self._closing or self._queued_bytes >= self.group_bytes,
+                        timeout=self.group_window,
+                    )
+                group, self._queue = self._queue, []
+                self._queued_bytes = 0
+                self._condition.notify_all()
+            run: List[Tuple[bytes, Future, int]] = []
+            for entry in group:
+                if entry[0] is not None:
+                    run.append(entry)
+                    continue
+                self._commit(run)
+                run = []
+                try:
+                    entry[1].set_result(self._rotate())
+                except (OSError, ValueError) as e:
+                    entry[1].set_exception(e)
+            self._commit(run)
+
+    def _commit(self, group: List[Tuple[bytes, Future, int]]) -> None:
+        try:
+            self._write(group)
+        except (OSError, ValueError) as e:
+            for _, future, _ in group:
+                future.set_exception(e)
+        else:
+            for _, future, _ in group:
+                future.set_result(None)
+
+    def _rotate(self) -> int:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        start = self._segment_start + self._file.tell()
+        self._file.close()
+        os.replace(self.file_path, f"{self.file_path}.{self._segment_start}")
+        self._file = open(self.file_path, "ab")
+        marker = json.dumps({"action": SEGMENT_ACTION, "data": {"start": start}})
+        self._file.write((marker + "\n").encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        # The rename and the new segment must be on disk before a checkpoint
+        # taken at ``start`` lets the segments before it be discarded.
+        fsync_directory(self.file_path)
+        self._segment_start = start
+        self._synced_at = time.monotonic()
+        self._unsynced = False
+        return start
+
+    def _write(self, group: List[Tuple[bytes, Future, int]]) -> None:
+        level = max((level for _, _, level in group), default=NONE)
+        if group:
+            self._file.write(b"".join(data for data, _, _ in group))
+        if level >= FLUSH or self._unsynced:
+            self._file.flush()
+        if level == FSYNC_EACH or (
+            (level == FSYNC_BATCHED or self._unsynced)
+            and time.monotonic() - self._synced_at >= self.fsync_interval
+        ):
+            os.fsync(self._file.fileno())
+            self._synced_at = time.monotonic()
+            self._unsynced = False
+        elif level == FSYNC_BATCHED:
+            self._unsynced = True
+
+    def flush(self) -> None:
+        """Wait until every action queued so far has reached the operating
+        system, whatever the durability level."""
+        last = self._last
+        if last is not None:
+            last.result()
+        with self._condition:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        """Write the queued actions, then stop the flusher and close the file.
+        A later write starts them again."""
+        with self._condition:
+            flusher, self._flusher = self._flusher, None
+            self._closing = True
+            self._condition.notify_all()
+        if flusher is not None:
+            flusher.join()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+            self._unsynced = False
+
+    def end_offset(self) -> int:
+        """Log offset just past the last logged action."""
+        self.flush()
+        return self._segment_start + os.path.getsize(self.file_path)
+
+    def start_offset(self) -> int:
+        """Log offset of the oldest segment still on disk."""
+        segments = self._segments()
+        return segments[0][0] if segments else self._segment_start
+
+    def discard_before(self, offset: int) -> None:
+        """Delete the rotated segments that end at or before ``offset``."""
+        segments = self._segments()
+        ends = [start for start, _ in segments[1:]] + [self._segment_start]
+        for (_, path), end in zip(segments, ends):
+            if end <= offset:
+                os.remove(path)
 
-    def load_actions(self) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
-        with open(self.file_path, "r") as f:
-            for line in f:
-                if not line.strip():
+    def load_actions(
+        self, start: int = 0
+    ) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+        """Actions logged from offset ``start`` (a previous ``end_offset``)."""
+        segments = self._segments() + [(self._segment_start, self.file_path)]
+        for segment_start, path in segments:
+            with open(path, "rb") as f:
+                if segment_start + os.fstat(f.fileno()).st_size <= start:
                     continue
-                remaining = line.strip()
-                while remaining:
-                    try:
-                        decoder = json.JSONDecoder()
-                        log, idx = decoder.raw_decode(remaining)
-                        yield log["action"], log["data"]
-                        remaining = remaining[idx:].lstrip()
-                    except json.JSONDecodeError as e:
-                        break
+                f.seek(max(start - segment_start, 0))
+                for line in f:
+                    if not line.strip():
+                        continue
+                    remaining = line.decode("utf-8").strip()
+                    while remaining:
+                        try:
+                            decoder = json.JSONDecoder()
+                            log, idx = decoder.raw_decode(remaining)
+                            if log["action"] != SEGMENT_ACTION:
+                                yield log["action"], log["data"]
+                            remaining = remaining[idx:].lstrip()
+                        except json.JSONDecodeError as e:
+                            break
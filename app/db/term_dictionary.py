@@ -0,0 +1,102 @@
+import bisect
+import fnmatch
+import re
+from typing import Iterable, Iterator, List, Set
+
+WILDCARDS = "*?"
+# Below this many pending changes, terms are inserted into (or deleted from)
+# the sorted lists one by one instead of re-sorting the vocabulary.
+INSERT_LIMIT = 1024
+
+
+class TermDictionary:
+    """Sorted vocabulary of one library, plus a sorted list of the reversed
+    terms, so ``prefix*`` and ``*suffix`` patterns are answered by a range
+    lookup (``bisect``) instead of a vocabulary scan.
+
+    Terms added or removed between lookups are buffered and folded into the
+    sorted lists on the next lookup.
+    """
+
+    def __init__(self):
+        self._terms: List[str] = []
+        self._reversed: List[str] = []
+        self._added: Set[str] = set()
+        self._removed: Set[str] = set()
+
+    def add(self, term: str) -> None:
+        self._removed.discard(term)
+        self._added.add(term)
+
+    def add_all(self, terms: Iterable[str]) -> None:
+        terms = set(terms)
+        self._removed -= terms
+        self._added |= terms
+
+    def remove(self, term: str) -> None:
+        self._added.discard(term)
+        self._removed.add(term)
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._terms)
+
+    def _refresh(self) -> None:
+        if not self._added and not self._removed:
+            return
+        if len(self._added) + len(self._removed) > INSERT_LIMIT:
+            terms = (set(self._terms) - self._removed) | self._added
+            self._terms = sorted(terms)
+            self._reversed = sorted(term[::-1] for term in terms)
+        else:
+            for terms, removed in (
+                (self._terms, self._removed),
+                (self._reversed, {term[::-1] for term in self._removed}),
+            ):
+                for term in removed:
+                    index = bisect.bisect_left(terms, term)
+                    if index < len(terms) and terms[index] == term:
+                        del terms[index]
+            for term in self._added:
+                for terms, key in ((self._terms, term), (self._reversed, term[::-1])):
+                    index = bisect.bisect_left(terms, key)
+                    if index == len(terms) or terms[index] != key:
+                        terms.insert(index, key)
+        self._added = set()
+        self._removed = set()
+
+    @staticmethod
+    def _range(terms: List[str], prefix: str) -> Iterator[str]:
+        for index in range(bisect.bisect_left(terms, prefix), len(terms)):
+            if not terms[index].startswith(prefix):
+                break
+            yield terms[index]
+
+    def expand(self, pattern: str, limit: int) -> List[str]:
+        """Up to ``limit`` terms matching a ``*``/``?`` wildcard pattern, using
+        its literal prefix (or, failing that, its literal suffix) to narrow
+        the lookup to a range of the sorted terms."""
+        self._refresh()
+        first = min((pattern.find(c) for c in WILDCARDS if c in pattern), default=-1)
+        if first == -1:
+            index = bisect.bisect_left(self._terms, pattern)
+            found = index < len(self._terms) and self._terms[index] == pattern
+            return [pattern] if found else []
+        prefix = pattern[:first]
+        suffix = re.split(r"[*?]", pattern)[-1]
+        if prefix:
+            candidates = self._range(self._terms, prefix)
+        elif suffix:
+            candidates = (
+                term[::-1] for term in self._range(self._reversed, suffix[::-1])
+            )
+        else:
+            candidates = iter(self._terms)
+        match = re.compile(fnmatch.translate(pattern)).match
+        terms = []
+        for term in candidates:
+            if match(term):
+                terms.append(term)
+                if len(terms) >= limit:
+                    break
+        return terms
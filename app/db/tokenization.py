@@ -1,11 +1,142 @@
 import string
-from typing import Set
+import unicodedata
+from typing import Dict, FrozenSet, List, Sequence, Set
+from app.core.exceptions import ValidationError
 from app.interfaces.indexing import ITokenizationStrategy
 
+_PUNCTUATION = str.maketrans("", "", string.punctuation)
+# Marks NFKD splits off accented letters, and Unicode punctuation that NFKC
+# leaves alone, all deleted in the same translate pass as ASCII punctuation.
+# The line and paragraph separators in the punctuation block separate words.
+_COMBINING_MARKS = [
+    (0x0300, 0x036F),
+    (0x1AB0, 0x1AFF),
+    (0x1DC0, 0x1DFF),
+    (0x20D0, 0x20FF),
+    (0xFE20, 0xFE2F),
+]
+_UNICODE_PUNCTUATION = "¡«·»¿" + "".join(
+    char for char in map(chr, range(0x2010, 0x205F)) if not char.isspace()
+)
+_FOLD = str.maketrans(
+    {
+        **{char: None for char in string.punctuation + _UNICODE_PUNCTUATION},
+        **{
+            code: None
+            for start, end in _COMBINING_MARKS
+            for code in range(start, end + 1)
+        },
+    }
+)
+# Joins texts so a batch is lowered and translated in one pass; texts that
+# contain it are analyzed one by one.
+_SEPARATOR = "\x00"
+# Most distinct words an analyzer remembers the filtered term of.
+TERM_CACHE_SIZE = 1 << 20
+
+ENGLISH_STOPWORDS: FrozenSet[str] = frozenset(
+    """a about above after again against all am an and any are as at be because
+    been before being below between both but by can did do does doing down during
+    each few for from further had has have having he her here hers herself him
+    himself his how i if in into is it its itself just me more most my myself no
+    nor not now of off on once only or other our ours ourselves out over own same
+    she should so some such than that the their theirs them themselves then there
+    these they this those through to too under until up very was we were what when
+    where which while who whom why will with you your yours yourself yourselves""".split()
+)
+
+
+def light_stem(word: str) -> str:
+    """Harman's S-stemmer: strips English plural endings only, so stems stay
+    real words (``queries`` -> ``query``, ``indexes`` -> ``indexe``)."""
+    if len(word) <= 3 or word[-1] != "s":
+        return word
+    if word.endswith("ies") and not word.endswith(("eies", "aies")):
+        return word[:-3] + "y"
+    if word.endswith("es") and not word.endswith(("aes", "ees", "oes")):
+        return word[:-1]
+    if not word.endswith(("us", "ss")):
+        return word[:-1]
+    return word
+
 
 class DefaultTokenizationStrategy(ITokenizationStrategy):
     def tokenize(self, text: str) -> Set[str]:
-        normalized_text = text.lower().translate(
-            str.maketrans("", "", string.punctuation)
+        return set(self.terms(text))
+
+    def terms(self, text: str) -> List[str]:
+        return text.lower().translate(_PUNCTUATION).split()
+
+    def tokenize_many(self, texts: Sequence[str]) -> List[List[str]]:
+        joined = _SEPARATOR.join(texts)
+        if not texts or joined.count(_SEPARATOR) != len(texts) - 1:
+            return super().tokenize_many(texts)
+        return [
+            text.split()
+            for text in joined.lower().translate(_PUNCTUATION).split(_SEPARATOR)
+        ]
+
+
+class Analyzer(DefaultTokenizationStrategy):
+    """Configurable analysis pipeline: Unicode normalization (NFKC, case
+    folding and accent removal), punctuation removal, then optional stopword
+    removal and light stemming of each term. Pure ASCII text skips the
+    normalization step."""
+
+    def __init__(self, stopwords: FrozenSet[str] = frozenset(), stem: bool = False):
+        self.stopwords = stopwords
+        self.stem = stem
+        # Word -> term ("" for a stopword), so each distinct word is filtered
+        # and stemmed once.
+        self._terms: Dict[str, str] = {}
+
+    def _term(self, word: str) -> str:
+        if word in self.stopwords:
+            return ""
+        return light_stem(word) if self.stem else word
+
+    def _normalize(self, text: str) -> str:
+        if text.isascii():
+            return text.lower().translate(_PUNCTUATION)
+        text = unicodedata.normalize(
+            "NFKD", unicodedata.normalize("NFKC", text).casefold()
         )
-        return set(normalized_text.split())
+        return unicodedata.normalize("NFC", text.translate(_FOLD))
+
+    def _filter(self, words: List[str]) -> List[str]:
+        if not self.stopwords and not self.stem:
+            return words
+        terms = self._terms
+        new = set(words).difference(terms)
+        if new:
+            if len(terms) + len(new) > TERM_CACHE_SIZE:
+                terms = self._terms = {}
+            for word in new:
+                terms[word] = self._term(word)
+        return list(filter(None, map(terms.__getitem__, words)))
+
+    def terms(self, text: str) -> List[str]:
+        return self._filter(self._normalize(text).split())
+
+    def tokenize_many(self, texts: Sequence[str]) -> List[List[str]]:
+        joined = _SEPARATOR.join(texts)
+        if not texts or joined.count(_SEPARATOR) != len(texts) - 1:
+            return [self.terms(text) for text in texts]
+        return [
+            self._filter(text.split())
+            for text in self._normalize(joined).split(_SEPARATOR)
+        ]
+
+
+# Named pipelines a library can select; "default" is the index's own strategy.
+ANALYZERS: Dict[str, ITokenizationStrategy] = {
+    "standard": Analyzer(),
+    "english": Analyzer(stopwords=ENGLISH_STOPWORDS, stem=True),
+}
+
+
+def get_analyzer(name: str) -> ITokenizationStrategy:
+    analyzer = ANALYZERS.get(name)
+    if analyzer is None:
+        raise ValidationError(f"unknown analyzer '{name}'", field="analyzer")
+    return analyzer
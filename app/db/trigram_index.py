@@ -0,0 +1,169 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+# Dead term ids tolerated (beyond the live count) before the index is rebuilt.
+REBUILD_MIN_DEAD = 1024
+
+
+def trigrams(term: str) -> List[str]:
+    """Character trigrams of a term padded with two ``$`` on each side, so a
+    term of length L has L + 2 of them and every edit changes at most 3."""
+    padded = f"$${term}$$"
+    return [padded[i : i + 3] for i in range(len(padded) - 2)]
+
+
+def _pattern_masks(word: str) -> Dict[str, int]:
+    masks: Dict[str, int] = {}
+    for i, char in enumerate(word):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def _distance(
+    masks: Dict[str, int], size: int, other: str, max_distance: int
+) -> Optional[int]:
+    # Bit-parallel Levenshtein (Myers / Hyyrö): bit i of the vertical deltas
+    # is row i of the current DP column, so each character of ``other`` costs
+    # a handful of integer operations instead of a row of ``min`` calls.
+    if abs(size - len(other)) > max_distance:
+        return None
+    if not size:
+        return len(other)
+    full = (1 << size) - 1
+    high = 1 << (size - 1)
+    positive, negative, score = full, 0, size
+    for char in other:
+        equal = masks.get(char, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        plus = negative | (~(horizontal | positive) & full)
+        minus = positive & horizontal
+        if plus & high:
+            score += 1
+        elif minus & high:
+            score -= 1
+        plus = ((plus << 1) | 1) & full
+        minus = (minus << 1) & full
+        positive = minus | (~(vertical | plus) & full)
+        negative = plus & vertical
+    return score if score <= max_distance else None
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> Optional[int]:
+    """Edit distance between two strings, or None if it exceeds ``max_distance``."""
+    return _distance(_pattern_masks(a), len(a), b, max_distance)
+
+
+class TrigramIndex:
+    """Character-trigram index over one library's vocabulary (not its chunks)
+    for typo-tolerant lookups.
+
+    Term ids are listed under each (trigram, term length) pair in ``int32``
+    arrays, sorted because ids are handed out in increasing order, so a lookup
+    only touches terms of a compatible length. A term within ``d`` edits of a
+    word with ``G`` distinct trigrams shares at least ``T = G - 3d`` of them.
+    By pigeonhole it appears in one of the ``G - T + 1`` shortest lists of the
+    word's trigrams: those seed the candidates, whose hits in all the lists
+    are then counted by binary search, and only candidates reaching ``T`` are
+    verified with a bounded Levenshtein distance. Removed terms leave dead ids
+    behind until they outnumber the live ones.
+
+    Added terms are buffered and only indexed on the next lookup, so building
+    or loading a vocabulary costs nothing until a fuzzy query needs it.
+    """
+
+    def __init__(self):
+        self._grams: Dict[Tuple[str, int], array] = {}
+        self._terms: List[Optional[str]] = []
+        self._ids: Dict[str, int] = {}
+        self._pending: Dict[str, None] = {}
+
+    def add(self, term: str) -> None:
+        if term not in self._ids:
+            self._pending[term] = None
+
+    def add_all(self, terms: Iterable[str]) -> None:
+        self._pending.update(dict.fromkeys(terms))
+
+    def _index_pending(self) -> None:
+        for term in self._pending:
+            self._index(term)
+        self._pending = {}
+
+    def _index(self, term: str) -> None:
+        if term in self._ids:
+            return
+        term_id = self._ids[term] = len(self._terms)
+        self._terms.append(term)
+        for gram in set(trigrams(term)):
+            term_ids = self._grams.get((gram, len(term)))
+            if term_ids is None:
+                term_ids = self._grams[(gram, len(term))] = array("i")
+            term_ids.append(term_id)
+
+    def remove(self, term: str) -> None:
+        if term in self._pending:
+            del self._pending[term]
+            return
+        term_id = self._ids.pop(term, None)
+        if term_id is None:
+            return
+        self._terms[term_id] = None
+        dead = len(self._terms) - len(self._ids)
+        if dead > max(len(self._ids), REBUILD_MIN_DEAD):
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Re-index the live terms under fresh, dense ids, dropping dead ones."""
+        live = list(self._ids)
+        self._grams = {}
+        self._terms = []
+        self._ids = {}
+        for term in live:
+            self._index(term)
+
+    def similar(self, word: str, max_edits: int, limit: int) -> List[Tuple[str, int]]:
+        """Up to ``limit`` terms within ``max_edits`` edits of the word, closest
+        first, with their distances. ``max_edits`` is lowered for short words
+        so that a match must share at least two trigrams."""
+        if self._pending:
+            self._index_pending()
+        grams = set(trigrams(word))
+        max_edits = max(0, min(max_edits, (len(grams) - 2) // 3))
+        threshold = len(grams) - 3 * max_edits
+        lengths = range(len(word) - max_edits, len(word) + max_edits + 1)
+        lists = []
+        for gram in grams:
+            arrays = [self._grams.get((gram, length)) for length in lengths]
+            lists.append([np.frombuffer(a, dtype=np.int32) for a in arrays if a])
+        lists.sort(key=lambda arrays: sum(a.size for a in arrays))
+        seeded = len(grams) - threshold + 1
+        seeds = [a for arrays in lists[:seeded] for a in arrays]
+        if not seeds:
+            return []
+        candidates, counts = np.unique(np.concatenate(seeds), return_counts=True)
+        for index in range(seeded, len(lists)):
+            # Drop candidates that can no longer reach the threshold, so the
+            # longest lists are probed with the fewest candidates.
+            keep = counts + (len(lists) - index) >= threshold
+            candidates, counts = candidates[keep], counts[keep]
+            if not candidates.size:
+                return []
+            for term_ids in lists[index]:
+                found = np.searchsorted(term_ids, candidates)
+                np.minimum(found, term_ids.size - 1, out=found)
+                counts += term_ids[found] == candidates
+        candidates = candidates[counts >= threshold]
+
+        masks = _pattern_masks(word)
+        matches = []
+        for term_id in candidates.tolist():
+            term = self._terms[term_id]
+            if term is None:
+                continue
+            distance = _distance(masks, len(word), term, max_edits)
+            if distance is not None:
+                matches.append((distance, term))
+        matches.sort()
+        return [(term, distance) for distance, term in matches[:limit]]
@@ -0,0 +1,268 @@
+import copy
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+import numpy as np
+from app.core.filters import ChunkFilter
+from app.core.math_utils import top_k_indices
+
+if TYPE_CHECKING:
+    from app.schemas.search import SearchOptions
+
+
+class RowBlock(ABC):
+    """Contiguous per-chunk rows of one library, addressed by chunk id.
+
+    Rows ``[0, size)`` are live; ``chunk_ids[row]`` maps each row back to its chunk
+    and ``norms[row]`` holds the length of the embedding before normalization, so
+    the embedding can be rebuilt from the row. Deleting a chunk moves the last row
+    into the freed slot so the live rows stay contiguous and can be scored with a
+    single vectorized pass. Subclasses decide what a row holds and how it is encoded.
+
+    ``version`` changes whenever a live row is rewritten, moved or removed, so
+    a scan of a :meth:`snapshot` taken under the owner's lock can be checked
+    against the block afterwards. Appending a row leaves it unchanged: the
+    snapshot only reads the rows that were live when it was taken.
+    """
+
+    storage = ""
+
+    def __init__(self, dimension: int, capacity: int = 64):
+        self.dimension = dimension
+        self.capacity = capacity
+        self.chunk_ids = np.zeros(capacity, dtype=np.int64)
+        self.norms = np.ones(capacity, dtype=np.float32)
+        self.rows: Dict[int, int] = {}
+        self.size = 0
+        self.version = 0
+
+    def _resize(self, capacity: int) -> None:
+        chunk_ids = np.zeros(capacity, dtype=np.int64)
+        chunk_ids[: self.size] = self.chunk_ids[: self.size]
+        norms = np.ones(capacity, dtype=np.float32)
+        norms[: self.size] = self.norms[: self.size]
+        self.chunk_ids = chunk_ids
+        self.norms = norms
+        self.capacity = capacity
+
+    @abstractmethod
+    def _write(self, row: int, vector: np.ndarray) -> None:
+        pass
+
+    @abstractmethod
+    def _move(self, source: int, target: int) -> None:
+        pass
+
+    def upsert(self, chunk_id: int, vector: np.ndarray, norm: float = 1.0) -> None:
+        row = self.rows.get(chunk_id)
+        if row is None:
+            if self.size == self.capacity:
+                self._resize(max(1, 2 * self.capacity))
+            row = self.size
+            self.size += 1
+            self.rows[chunk_id] = row
+            self.chunk_ids[row] = chunk_id
+        else:
+            self.version += 1
+        self.norms[row] = norm
+        self._write(row, vector)
+
+    def remove(self, chunk_id: int) -> None:
+        row = self.rows.pop(chunk_id, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            moved_id = int(self.chunk_ids[last])
+            self._move(last, row)
+            self.chunk_ids[row] = moved_id
+            self.norms[row] = self.norms[last]
+            self.rows[moved_id] = row
+        self.size = last
+        self.version += 1
+
+    def eligible_rows(
+        self, chunk_filter: Optional[ChunkFilter]
+    ) -> Optional[np.ndarray]:
+        """Sorted live rows that pass ``chunk_filter``, or None if all of them do."""
+        if chunk_filter is None:
+            return None
+        if chunk_filter.allowed is not None:
+            rows = [self.rows[c] for c in chunk_filter.allowed if c in self.rows]
+            return np.sort(np.array(rows, dtype=np.int64))
+        excluded = [self.rows[c] for c in chunk_filter.excluded if c in self.rows]
+        if not excluded:
+            return None
+        mask = np.ones(self.size, dtype=bool)
+        mask[excluded] = False
+        return np.flatnonzero(mask)
+
+    def snapshot(self) -> "RowBlock":
+        """A shallow copy holding the current arrays and size, to scan without
+        the owner's lock. Resizing replaces the arrays rather than growing them,
+        so the copy stays readable; rows changed in place after it was taken
+        can make its results stale, which a changed ``version`` tells."""
+        return copy.copy(self)
+
+    def close(self) -> None:
+        pass
+
+    def _results(self, rows: np.ndarray, scores: np.ndarray) -> List[Tuple[int, float]]:
+        return [
+            (int(chunk_id), float(score))
+            for chunk_id, score in zip(self.chunk_ids[rows], scores)
+        ]
+
+
+class EmbeddingBlock(RowBlock):
+    """Row block holding normalized embeddings that it can search and rebuild."""
+
+    @abstractmethod
+    def _row(self, row: int) -> np.ndarray:
+        """The normalized float32 vector stored at ``row``."""
+
+    def embedding(self, chunk_id: int) -> Optional[np.ndarray]:
+        """The chunk's embedding as it was added (to float32 precision)."""
+        row = self.rows.get(chunk_id)
+        if row is None:
+            return None
+        return self._row(row) * self.norms[row]
+
+    @abstractmethod
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """Top-k of ``rows``, as given by :meth:`eligible_rows` (all live rows if None)."""
+
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        return [self.search(query, k, options, rows) for query in queries]
+
+    def search_sharded(
+        self,
+        query: np.ndarray,
+        k: int,
+        executor: Executor,
+        shard_rows: int,
+        options: Optional["SearchOptions"] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """Like :meth:`search`, scanning ``shard_rows``-row slices on ``executor``."""
+        return self.search(query, k, options, rows)
+
+    @abstractmethod
+    def exact_scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Full-precision cosine similarity of ``query`` with each of ``rows``."""
+
+    def rescore(
+        self, query: np.ndarray, rows: np.ndarray, k: int
+    ) -> List[Tuple[int, float]]:
+        """Exact top-k among candidate ``rows``."""
+        scores = self.exact_scores(query, rows)
+        top = top_k_indices(scores, k)
+        return self._results(rows[top], scores[top])
+
+    @abstractmethod
+    def vectors(self) -> np.ndarray:
+        """Normalized float32 rows ``[0, size)``."""
+
+
+class VectorBlock(EmbeddingBlock):
+    """Pre-normalized float32 rows scored with a single matrix-vector product."""
+
+    storage = "float32"
+
+    def __init__(self, dimension: int, capacity: int = 64):
+        super().__init__(dimension, capacity)
+        self.matrix = np.zeros((capacity, dimension), dtype=np.float32)
+
+    def _resize(self, capacity: int) -> None:
+        matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+        matrix[: self.size] = self.matrix[: self.size]
+        self.matrix = matrix
+        super()._resize(capacity)
+
+    def _write(self, row: int, vector: np.ndarray) -> None:
+        self.matrix[row] = vector
+
+    def _move(self, source: int, target: int) -> None:
+        self.matrix[target] = self.matrix[source]
+
+    def _row(self, row: int) -> np.ndarray:
+        return self.matrix[row]
+
+    def _candidates(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        return self.matrix[: self.size] if rows is None else self.matrix[rows]
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        scores = self._candidates(rows) @ query
+        top = top_k_indices(scores, k)
+        return self._results(top if rows is None else rows[top], scores[top])
+
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        scores = queries @ self._candidates(rows).T
+        results = []
+        for row_scores in scores:
+            top = top_k_indices(row_scores, k)
+            results.append(
+                self._results(top if rows is None else rows[top], row_scores[top])
+            )
+        return results
+
+    def search_sharded(
+        self,
+        query: np.ndarray,
+        k: int,
+        executor: Executor,
+        shard_rows: int,
+        options: Optional["SearchOptions"] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        count = self.size if rows is None else len(rows)
+
+        def scan(start: int) -> Tuple[np.ndarray, np.ndarray]:
+            end = min(start + shard_rows, count)
+            shard = (
+                self.matrix[start:end] if rows is None else self.matrix[rows[start:end]]
+            )
+            scores = shard @ query
+            top = top_k_indices(scores, k)
+            return top + start, scores[top]
+
+        shards = list(executor.map(scan, range(0, count, shard_rows)))
+        if not shards:
+            return []
+        positions = np.concatenate([positions for positions, _ in shards])
+        scores = np.concatenate([scores for _, scores in shards])
+        best = top_k_indices(scores, k)
+        positions = positions[best]
+        return self._results(
+            positions if rows is None else rows[positions], scores[best]
+        )
+
+    def exact_scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        return self.matrix[rows] @ query
+
+    def vectors(self) -> np.ndarray:
+        return self.matrix[: self.size]
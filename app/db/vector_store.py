@@ -0,0 +1,327 @@
+import glob
+import math
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar, TYPE_CHECKING
+import numpy as np
+from app.interfaces.indexing import IVectorStore
+from app.core.exceptions import ValidationError
+from app.core.filters import ChunkFilter
+from app.core.math_utils import normalize
+from app.db.quantization import Float16Block, Int8Block, PqBlock, QuantizedBlock
+from app.db.vector_blocks import EmbeddingBlock, VectorBlock
+
+if TYPE_CHECKING:
+    from app.schemas.search import SearchOptions
+
+SCALAR_BLOCKS = {block.storage: block for block in (Float16Block, Int8Block)}
+
+T = TypeVar("T")
+
+
+class VectorStore(IVectorStore):
+    """Per-library embedding rows, encoded according to each library's
+    ``vector_storage`` setting (plain float32 by default).
+
+    Exact scans of libraries holding at least two ``shard_min_rows`` shards are
+    split across ``search_threads`` threads (NumPy releases the GIL for the
+    matrix product and the top-k selection) and the per-shard top-k merged.
+    Searches scan a snapshot of the library outside the store lock.
+
+    Quantized blocks are trained by a background job once they hold enough
+    rows (see :class:`QuantizedBlock`); they are searched exactly until then.
+    Each row keeps its original norm, so the store can hand back the full
+    embedding and chunks of quantized libraries need not keep a copy.
+    """
+
+    def __init__(
+        self,
+        lock: threading.RLock,
+        data_dir: Optional[str] = None,
+        pq_m: int = 64,
+        quantization_min_train_size: int = 4096,
+        rerank: int = 100,
+        search_threads: int = 0,
+        shard_min_rows: int = 65536,
+    ):
+        self.libraries: Dict[int, EmbeddingBlock] = {}
+        self.storage_modes: Dict[int, str] = {}
+        self.data_dir = data_dir
+        self.pq_m = pq_m
+        self.quantization_min_train_size = quantization_min_train_size
+        self.rerank = rerank
+        self.search_threads = search_threads or os.cpu_count() or 1
+        self.shard_min_rows = shard_min_rows
+        self._search_pool = None
+        if self.search_threads > 1:
+            self._search_pool = ThreadPoolExecutor(
+                max_workers=self.search_threads, thread_name_prefix="vector-search"
+            )
+        self.lock = lock
+        self._training: Dict[int, Future] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="quantizer-train"
+        )
+        if data_dir:
+            # Spill files of a previous run; the rows are re-added from the log.
+            for path in glob.glob(os.path.join(data_dir, "library_*.f32")):
+                os.remove(path)
+
+    def _check_dimension(self, vectors: EmbeddingBlock, size: int, field: str) -> None:
+        if size != vectors.dimension:
+            raise ValidationError(
+                f"expected {vectors.dimension} dimensions, got {size}", field=field
+            )
+
+    def _side_file(self, library_id: int) -> Optional[str]:
+        if not self.data_dir:
+            return None
+        return os.path.join(self.data_dir, f"library_{library_id}.f32")
+
+    def _new_block(self, library_id: int, dimension: int) -> EmbeddingBlock:
+        storage = self.storage_modes.get(library_id, VectorBlock.storage)
+        if storage == PqBlock.storage:
+            return PqBlock(
+                dimension,
+                self.pq_m,
+                self.quantization_min_train_size,
+                self.rerank,
+                path=self._side_file(library_id),
+            )
+        if storage in SCALAR_BLOCKS:
+            return SCALAR_BLOCKS[storage](
+                dimension,
+                self.quantization_min_train_size,
+                self.rerank,
+                path=self._side_file(library_id),
+            )
+        return VectorBlock(dimension)
+
+    def _drop(self, library_id: int) -> None:
+        vectors = self.libraries.pop(library_id, None)
+        if vectors is not None:
+            vectors.close()
+
+    def _schedule_training(self, library_id: int, vectors: EmbeddingBlock) -> None:
+        if (
+            isinstance(vectors, QuantizedBlock)
+            and vectors.needs_training
+            and library_id not in self._training
+        ):
+            self._training[library_id] = self._executor.submit(
+                self.train, library_id, vectors
+            )
+
+    def train(self, library_id: int, vectors: QuantizedBlock) -> None:
+        """Train the codec of a quantized block and swap it in. Only copying
+        rows out and installing the codes hold the lock."""
+        try:
+            with self.lock:
+                if self.libraries.get(library_id) is not vectors:
+                    return
+                sample = vectors.training_sample()
+            codec = vectors.fit(sample)
+            chunk_ids, codes = [], []
+            while True:
+                with self.lock:
+                    if self.libraries.get(library_id) is not vectors:
+                        return
+                    start = sum(len(ids) for ids in chunk_ids)
+                    if start >= vectors.size:
+                        break
+                    ids, originals = vectors.copy_rows(start)
+                chunk_ids.append(ids)
+                codes.append(vectors.quantize(codec, originals))
+            with self.lock:
+                if self.libraries.get(library_id) is vectors and codes:
+                    vectors.install(
+                        codec, np.concatenate(chunk_ids), np.concatenate(codes)
+                    )
+        finally:
+            with self.lock:
+                self._training.pop(library_id, None)
+                # The library may have been re-created while this job ran.
+                current = self.libraries.get(library_id)
+                if current is not None and current is not vectors:
+                    self._schedule_training(library_id, current)
+
+    def wait_for_training(
+        self, library_id: int, timeout: Optional[float] = None
+    ) -> None:
+        with self.lock:
+            future = self._training.get(library_id)
+        if future is not None:
+            future.result(timeout)
+
+    def set_storage(self, library_id: int, storage: str) -> None:
+        """Select how a library's rows are encoded, re-encoding existing rows."""
+        with self.lock:
+            self.storage_modes[library_id] = storage
+            vectors = self.libraries.get(library_id)
+            if vectors is None or vectors.storage == storage:
+                return
+            chunk_ids, matrix = vectors.chunk_ids[: vectors.size], vectors.vectors()
+            chunk_ids, matrix = chunk_ids.copy(), np.array(matrix)
+            norms = vectors.norms[: vectors.size].copy()
+            self._drop(library_id)
+            converted = self.libraries[library_id] = self._new_block(
+                library_id, vectors.dimension
+            )
+            for chunk_id, vector, norm in zip(
+                chunk_ids.tolist(), matrix, norms.tolist()
+            ):
+                converted.upsert(chunk_id, vector, norm)
+            self._schedule_training(library_id, converted)
+
+    def drop_library(self, library_id: int) -> None:
+        with self.lock:
+            self._drop(library_id)
+            self.storage_modes.pop(library_id, None)
+
+    def keeps_embeddings(self, library_id: int) -> bool:
+        """Whether the library's full embeddings are rebuilt from its rows, so
+        its chunks need not hold them (every storage mode but float32)."""
+        with self.lock:
+            storage = self.storage_modes.get(library_id, VectorBlock.storage)
+            return storage != VectorBlock.storage
+
+    def get_embedding(self, library_id: int, chunk_id: int) -> Optional[np.ndarray]:
+        with self.lock:
+            vectors = self.libraries.get(library_id)
+            return vectors.embedding(chunk_id) if vectors is not None else None
+
+    def add(self, library_id: int, chunk_id: int, embedding: List[float]) -> None:
+        raw = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(raw))
+        vector = normalize(raw)
+        with self.lock:
+            vectors = self.libraries.get(library_id)
+            if vectors is None or vectors.rows.keys() <= {chunk_id}:
+                self._drop(library_id)
+                vectors = self.libraries[library_id] = self._new_block(
+                    library_id, vector.shape[0]
+                )
+            self._check_dimension(vectors, vector.shape[0], "embedding")
+            vectors.upsert(chunk_id, vector, norm)
+            self._schedule_training(library_id, vectors)
+
+    def remove(self, library_id: int, chunk_id: int) -> None:
+        with self.lock:
+            vectors = self.libraries.get(library_id)
+            if vectors is None:
+                return
+            vectors.remove(chunk_id)
+            if vectors.size == 0:
+                self._drop(library_id)
+
+    def _search_snapshot(
+        self,
+        library_id: int,
+        dimension: int,
+        chunk_filter: Optional[ChunkFilter],
+        scan: Callable[[EmbeddingBlock, Optional[np.ndarray]], T],
+    ) -> Optional[T]:
+        """Run ``scan(block, rows)`` over a snapshot of the library taken under
+        the lock, so that neither writers nor other searches wait on the scan.
+        Rows added meanwhile are simply not seen, but if a row was updated or
+        removed the results may mix rows from before and after that write, and
+        the scan is redone under the lock. Returns None if the library holds
+        no rows."""
+        with self.lock:
+            vectors = self.libraries.get(library_id)
+            if vectors is None:
+                return None
+            self._check_dimension(vectors, dimension, "query")
+            view, version = vectors.snapshot(), vectors.version
+            rows = vectors.eligible_rows(chunk_filter)
+        results = scan(view, rows)
+        with self.lock:
+            if self.libraries.get(library_id) is vectors and vectors.version == version:
+                return results
+            vectors = self.libraries.get(library_id)
+            if vectors is None:
+                return None
+            self._check_dimension(vectors, dimension, "query")
+            return scan(vectors, vectors.eligible_rows(chunk_filter))
+
+    def search(
+        self,
+        library_id: int,
+        query_embedding: List[float],
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        chunk_filter: Optional[ChunkFilter] = None,
+    ) -> List[Tuple[int, float]]:
+        query = normalize(query_embedding)
+
+        def scan(
+            vectors: EmbeddingBlock, rows: Optional[np.ndarray]
+        ) -> List[Tuple[int, float]]:
+            if (
+                self._search_pool is not None
+                and vectors.size >= 2 * self.shard_min_rows
+            ):
+                shard_rows = max(
+                    self.shard_min_rows, math.ceil(vectors.size / self.search_threads)
+                )
+                return vectors.search_sharded(
+                    query, k, self._search_pool, shard_rows, options, rows
+                )
+            return vectors.search(query, k, options, rows)
+
+        results = self._search_snapshot(library_id, query.shape[0], chunk_filter, scan)
+        return [] if results is None else results
+
+    def search_batch(
+        self,
+        library_id: int,
+        query_embeddings: List[List[float]],
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        chunk_filter: Optional[ChunkFilter] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        queries = normalize(query_embeddings)
+
+        def scan(
+            vectors: EmbeddingBlock, rows: Optional[np.ndarray]
+        ) -> List[List[Tuple[int, float]]]:
+            return vectors.search_batch(queries, k, options, rows)
+
+        results = self._search_snapshot(
+            library_id, queries.shape[1], chunk_filter, scan
+        )
+        return [[] for _ in query_embeddings] if results is None else results
+
+    def rescore(
+        self,
+        library_id: int,
+        query_embedding: List[float],
+        chunk_ids: List[int],
+        k: int,
+    ) -> List[Tuple[int, float]]:
+        """Exact top-k among candidate chunks, e.g. those proposed by a coarse index."""
+        query = normalize(query_embedding)
+        with self.lock:
+            vectors = self.libraries.get(library_id)
+            if vectors is None:
+                return []
+            self._check_dimension(vectors, query.shape[0], "query")
+            rows = [vectors.rows[c] for c in chunk_ids if c in vectors.rows]
+            return vectors.rescore(query, np.array(rows, dtype=np.int64), k)
+
+    def get_vectors(self, library_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return a copy of the library's chunk ids and normalized embedding rows."""
+        with self.lock:
+            vectors = self.libraries.get(library_id)
+            if vectors is None:
+                return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+            return (
+                vectors.chunk_ids[: vectors.size].copy(),
+                np.array(vectors.vectors()),
+            )
+
+    def count(self, library_id: int) -> int:
+        with self.lock:
+            vectors = self.libraries.get(library_id)
+            return vectors.size if vectors is not None else 0
@@ -0,0 +1,68 @@
+from typing import Dict, Iterator, List, Optional, Sequence
+
+
+class Vocabulary:
+    """Terms of one library interned to dense integer ids, so the structures
+    built on it can be lists and arrays indexed by term id rather than
+    string-keyed dictionaries. Released ids are handed out again."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._terms: List[Optional[str]] = []
+        self._free: List[int] = []
+
+    @classmethod
+    def from_terms(cls, terms: Sequence[str]) -> "Vocabulary":
+        """A vocabulary of distinct terms with ids 0, 1, ... in order."""
+        vocabulary = cls()
+        vocabulary._terms = list(terms)
+        vocabulary._ids = dict(zip(vocabulary._terms, range(len(vocabulary._terms))))
+        return vocabulary
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._ids
+
+    @property
+    def capacity(self) -> int:
+        """One more than the highest id handed out."""
+        return len(self._terms)
+
+    def get(self, term: str) -> Optional[int]:
+        return self._ids.get(term)
+
+    def add(self, term: str) -> int:
+        """The term's id, assigning one if it is new."""
+        term_id = self._ids.get(term)
+        if term_id is None:
+            if self._free:
+                term_id = self._free.pop()
+                self._terms[term_id] = term
+            else:
+                term_id = len(self._terms)
+                self._terms.append(term)
+            self._ids[term] = term_id
+        return term_id
+
+    def add_all(self, terms: Sequence[str]) -> List[int]:
+        """The ids of distinct terms, assigning ids to the new ones."""
+        term_ids = list(map(self._ids.get, terms))
+        if None in term_ids:
+            term_ids = [
+                self.add(term) if term_id is None else term_id
+                for term, term_id in zip(terms, term_ids)
+            ]
+        return term_ids
+
+    def term(self, term_id: int) -> str:
+        return self._terms[term_id]
+
+    def release(self, term_id: int) -> None:
+        del self._ids[self._terms[term_id]]
+        self._terms[term_id] = None
+        self._free.append(term_id)
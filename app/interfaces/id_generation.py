@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Tuple
 
 
 class IIdGenerator(ABC):
@@ -25,3 +26,7 @@ class IIdGenerator(ABC):
     @abstractmethod
     def set_chunk_id(self, value: int) -> None:
         pass
+
+    @abstractmethod
+    def get_next_ids(self) -> Tuple[int, int, int]:
+        pass
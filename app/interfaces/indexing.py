@@ -1,18 +1,85 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Set
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+)
+import numpy as np
+from app.core.filters import ChunkFilter
+
+if TYPE_CHECKING:
+    from app.schemas.search import SearchOptions
 
 
 class IInvertedIndex(ABC):
     @abstractmethod
-    def index_chunk(self, chunk_id: int, text: str) -> None:
+    def index_chunk(
+        self, chunk_id: int, text: str, library_id: Optional[int] = None
+    ) -> None:
+        pass
+
+    @abstractmethod
+    def remove_chunk(self, chunk_id: int, library_id: Optional[int] = None) -> None:
+        pass
+
+    @abstractmethod
+    def index_chunks(
+        self, chunks: Sequence[Tuple[int, str]], library_id: Optional[int] = None
+    ) -> None:
+        pass
+
+    @abstractmethod
+    def set_analyzer(
+        self,
+        library_id: int,
+        analyzer: str,
+        chunks: Optional[Callable[[], Sequence[Tuple[int, str]]]] = None,
+    ) -> None:
+        pass
+
+    @abstractmethod
+    def drop_library(self, library_id: int) -> None:
+        pass
+
+    @abstractmethod
+    def save_snapshot(self, path: str, log_offset: int) -> None:
+        pass
+
+    @abstractmethod
+    def indexed_chunks(self, library_id: Optional[int] = None) -> Set[int]:
         pass
 
     @abstractmethod
-    def remove_chunk(self, chunk_id: int, text: str) -> None:
+    def load_snapshot(
+        self, path: str, log_end: Optional[int] = None, log_start: int = 0
+    ) -> Optional[int]:
         pass
 
     @abstractmethod
-    def search_word(self, query: str) -> Dict[int, int]:
+    def search_word(
+        self,
+        query: str,
+        chunk_filter: Optional[ChunkFilter] = None,
+        library_id: Optional[int] = None,
+        k: Optional[int] = None,
+        fuzziness: Optional[int] = None,
+    ) -> Dict[int, float]:
+        pass
+
+    @abstractmethod
+    def search_words(
+        self,
+        queries: List[str],
+        chunk_filter: Optional[ChunkFilter] = None,
+        library_id: Optional[int] = None,
+        k: Optional[int] = None,
+        fuzziness: Optional[int] = None,
+    ) -> List[Dict[int, float]]:
         pass
 
 
@@ -20,3 +87,81 @@ class ITokenizationStrategy(ABC):
     @abstractmethod
     def tokenize(self, text: str) -> Set[str]:
         pass
+
+    @abstractmethod
+    def terms(self, text: str) -> List[str]:
+        pass
+
+    def tokenize_many(self, texts: Sequence[str]) -> List[List[str]]:
+        """``terms`` of each text, for bulk indexing."""
+        return [self.terms(text) for text in texts]
+
+
+class IVectorIndex(ABC):
+    @abstractmethod
+    def add(self, library_id: int, chunk_id: int, embedding: List[float]) -> None:
+        pass
+
+    @abstractmethod
+    def remove(self, library_id: int, chunk_id: int) -> None:
+        pass
+
+    @abstractmethod
+    def drop_library(self, library_id: int) -> None:
+        pass
+
+    @abstractmethod
+    def search(
+        self,
+        library_id: int,
+        query_embedding: List[float],
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        chunk_filter: Optional[ChunkFilter] = None,
+    ) -> List[Tuple[int, float]]:
+        pass
+
+    def search_batch(
+        self,
+        library_id: int,
+        query_embeddings: List[List[float]],
+        k: int,
+        options: Optional["SearchOptions"] = None,
+        chunk_filter: Optional[ChunkFilter] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        return [
+            self.search(library_id, query_embedding, k, options, chunk_filter)
+            for query_embedding in query_embeddings
+        ]
+
+
+class IVectorStore(IVectorIndex):
+    @abstractmethod
+    def get_vectors(self, library_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        pass
+
+    @abstractmethod
+    def count(self, library_id: int) -> int:
+        pass
+
+    @abstractmethod
+    def set_storage(self, library_id: int, storage: str) -> None:
+        pass
+
+    @abstractmethod
+    def keeps_embeddings(self, library_id: int) -> bool:
+        pass
+
+    @abstractmethod
+    def get_embedding(self, library_id: int, chunk_id: int) -> Optional[np.ndarray]:
+        pass
+
+    @abstractmethod
+    def rescore(
+        self,
+        library_id: int,
+        query_embedding: List[float],
+        chunk_ids: List[int],
+        k: int,
+    ) -> List[Tuple[int, float]]:
+        pass
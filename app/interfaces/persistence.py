@@ -1,14 +1,41 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Generator, Tuple, Callable
+from concurrent.futures import Future
+from typing import Dict, Any, Generator, Optional, Tuple, Callable
 
 
 class IStorage(ABC):
     @abstractmethod
-    def save_action(self, action: str, data: Dict[str, Any]) -> None:
+    def save_action(self, record: str, durability: Optional[str] = None) -> Future:
         pass
 
     @abstractmethod
-    def load_actions(self) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+    def flush(self) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    @abstractmethod
+    def load_actions(
+        self, start: int = 0
+    ) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+        pass
+
+    @abstractmethod
+    def end_offset(self) -> int:
+        pass
+
+    @abstractmethod
+    def start_offset(self) -> int:
+        pass
+
+    @abstractmethod
+    def rotate(self) -> Future:
+        pass
+
+    @abstractmethod
+    def discard_before(self, offset: int) -> None:
         pass
 
 
@@ -36,11 +63,33 @@ class IReplayModeManager(ABC):
 
 class IPersistenceManager(ABC):
     @abstractmethod
-    def save_action(self, action: str, data: Dict[str, Any]) -> None:
+    def save_action(self, action: str, data: Dict[str, Any]) -> Future:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    @abstractmethod
+    def load_actions(
+        self, start: int = 0
+    ) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+        pass
+
+    @abstractmethod
+    def end_offset(self) -> int:
+        pass
+
+    @abstractmethod
+    def start_offset(self) -> int:
+        pass
+
+    @abstractmethod
+    def rotate(self) -> Future:
         pass
 
     @abstractmethod
-    def load_actions(self) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+    def discard_before(self, offset: int) -> None:
         pass
 
     @abstractmethod
@@ -48,5 +97,24 @@ class IPersistenceManager(ABC):
         self,
         handler_provider: "IActionHandlerProvider",
         replay_mode_manager: "IReplayModeManager",
+        start: int = 0,
     ) -> None:
         pass
+
+
+class ICheckpointer(ABC):
+    @abstractmethod
+    def checkpoint(self) -> int:
+        pass
+
+    @abstractmethod
+    def restore(self) -> int:
+        pass
+
+    @abstractmethod
+    def start(self) -> None:
+        pass
+
+    @abstractmethod
+    def stop(self) -> None:
+        pass
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Iterable, List, Optional, Set
 from app.db.models import Chunk
 
 
@@ -12,6 +12,10 @@ class IChunkRepository(ABC):
     def get_by_document(self, document_id: int) -> List[Chunk]:
         pass
 
+    @abstractmethod
+    def get_ids_by_documents(self, document_ids: Iterable[int]) -> Set[int]:
+        pass
+
     @abstractmethod
     def get_by_library(self, library_id: int) -> List[Chunk]:
         pass
@@ -20,6 +24,10 @@ class IChunkRepository(ABC):
     def get_all(self) -> List[Chunk]:
         pass
 
+    @abstractmethod
+    def sync_embeddings(self, library_id: Optional[int] = None) -> None:
+        pass
+
     @abstractmethod
     def create(
         self,
@@ -13,11 +13,23 @@ class ILibraryRepository(ABC):
         pass
 
     @abstractmethod
-    def create(self, name: str, disk_id: Optional[int] = None) -> Library:
+    def create(
+        self,
+        name: str,
+        disk_id: Optional[int] = None,
+        vector_storage: str = "float32",
+        analyzer: str = "default",
+    ) -> Library:
         pass
 
     @abstractmethod
-    def update(self, library_id: int, name: Optional[str]) -> Optional[Library]:
+    def update(
+        self,
+        library_id: int,
+        name: Optional[str],
+        vector_storage: Optional[str] = None,
+        analyzer: Optional[str] = None,
+    ) -> Optional[Library]:
         pass
 
     @abstractmethod
@@ -1,8 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, Iterable
 
 
 class IReplayableRepository(ABC):
     @abstractmethod
     def get_replay_handlers(self) -> Dict[str, Callable[[str, Dict[str, Any]], None]]:
         pass
+
+    @abstractmethod
+    def restore(self, entities: Iterable[Any]) -> None:
+        pass
@@ -1,11 +1,27 @@
 from abc import ABC, abstractmethod
 from typing import List, Tuple, Optional
+from app.core.filters import ChunkFilter
 from app.db.models import Chunk
 
 
 class ISearchRepository(ABC):
     @abstractmethod
     def search_word(
-        query: str, library_id: Optional[int] = None
-    ) -> List[Tuple[Chunk, int]]:
+        query: str,
+        library_id: Optional[int] = None,
+        chunk_filter: Optional[ChunkFilter] = None,
+        k: Optional[int] = None,
+        fuzziness: Optional[int] = None,
+    ) -> List[Tuple[Chunk, float]]:
+        pass
+
+    @abstractmethod
+    def search_words(
+        self,
+        queries: List[str],
+        library_id: Optional[int] = None,
+        chunk_filter: Optional[ChunkFilter] = None,
+        k: Optional[int] = None,
+        fuzziness: Optional[int] = None,
+    ) -> List[List[Tuple[Chunk, float]]]:
         pass
@@ -1,15 +1,30 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, TYPE_CHECKING
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from app.schemas.search import SearchResult
+    from app.schemas.search import SearchResult, SearchOptions
 
 
 class ISearchStrategy(ABC):
     @abstractmethod
-    def search(self, library_id: int, query: str, k: int) -> List[Dict[str, Any]]:
+    def search(
+        self,
+        library_id: int,
+        query: str,
+        k: int,
+        options: Optional["SearchOptions"] = None,
+    ) -> List[Dict[str, Any]]:
         pass
 
+    def search_batch(
+        self,
+        library_id: int,
+        queries: List[str],
+        k: int,
+        options: Optional["SearchOptions"] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        return [self.search(library_id, query, k, options) for query in queries]
+
 
 class ISearchService(ABC):
     @abstractmethod
@@ -18,6 +33,22 @@ class ISearchService(ABC):
 
     @abstractmethod
     def search(
-        self, strategy: str, library_id: int, query: str, k: int
+        self,
+        strategy: str,
+        library_id: int,
+        query: str,
+        k: int,
+        options: Optional["SearchOptions"] = None,
     ) -> List["SearchResult"]:
         pass
+
+    @abstractmethod
+    def search_batch(
+        self,
+        strategy: str,
+        library_id: int,
+        queries: List[str],
+        k: int,
+        options: Optional["SearchOptions"] = None,
+    ) -> List[List["SearchResult"]]:
+        pass
@@ -1,9 +1,12 @@
+import asyncio
 from contextlib import asynccontextmanager
+from typing import Dict, List, Set, Tuple
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from app.interfaces.repositories.replayable_repository import IReplayableRepository
 from app.core.containers import AppContainer
 from app.core.exceptions import DatabaseError, ValidationError, get_http_status_code
+from app.db.storage.durability import durability_level, durability_scope
 from app.api.routes import library, document, chunk, search
 
 
@@ -26,19 +29,83 @@ async def lifespan(app: FastAPI):
             handlers = repo.get_replay_handlers()
             registry.register_handlers(handlers)
 
+    checkpointer = db_container.checkpointer()
     db_container.persistence_manager().replay_actions(
         handler_provider=registry,
         replay_mode_manager=db_container.replay_mode_manager(),
+        start=checkpointer.restore(),
     )
+    # Replayed storage changes leave embeddings on chunks created before them.
+    db_container.chunk_repository().sync_embeddings()
 
-    chunk_repository = db_container.chunk_repository()
-    inverted_index = db_container.inverted_index()
-    for chunk in chunk_repository.get_all():
-        if chunk.text:
-            inverted_index.index_chunk(chunk.id, chunk.text)
+    snapshot_path = container.config.KEYWORD_INDEX_SNAPSHOT()
+    restore_keyword_index(db_container, snapshot_path)
+    checkpointer.start()
 
     yield
 
+    checkpointer.stop()
+    save_keyword_index(db_container, snapshot_path)
+    db_container.persistence_manager().close()
+
+
+def restore_keyword_index(db_container, snapshot_path: str) -> None:
+    """Load the keyword index snapshot and re-index only what the log entries
+    written after it touched; without a usable snapshot, index every chunk."""
+    chunks = db_container.chunk_repository().get_stored()
+    inverted_index = db_container.inverted_index()
+    persistence_manager = db_container.persistence_manager()
+    log_offset = inverted_index.load_snapshot(
+        snapshot_path,
+        persistence_manager.end_offset(),
+        persistence_manager.start_offset(),
+    )
+    dropped: Set[int] = set()
+    if log_offset is not None:
+        touched: Set[int] = set()
+        reanalyzed: Set[int] = set()
+        for action, data in persistence_manager.load_actions(log_offset):
+            if action in ("create_chunk", "update_chunk", "delete_chunk"):
+                touched.add(data["id"])
+            elif action == "update_library" and data.get("analyzer"):
+                reanalyzed.add(data["id"])
+            elif action == "delete_library":
+                dropped.add(data["id"])
+        for library in db_container.library_repository().get_all():
+            inverted_index.set_analyzer(library.id, library.analyzer)
+        for chunk_id in touched:
+            inverted_index.remove_chunk(chunk_id)
+        # A chunk is logged before it is indexed, so one logged just before
+        # a periodic snapshot's offset may be missing from the snapshot.
+        indexed = {
+            library_id: inverted_index.indexed_chunks(library_id)
+            for library_id in {chunk.library_id for chunk in chunks}
+        }
+        chunks = [
+            chunk
+            for chunk in chunks
+            if chunk.id in touched
+            or chunk.library_id in reanalyzed
+            or chunk.id not in indexed[chunk.library_id]
+        ]
+
+    libraries: Dict[int, List[Tuple[int, str]]] = {}
+    for chunk in chunks:
+        if chunk.text:
+            libraries.setdefault(chunk.library_id, []).append((chunk.id, chunk.text))
+    for library_id, library_chunks in libraries.items():
+        inverted_index.index_chunks(library_chunks, library_id)
+    for library_id in dropped:
+        inverted_index.drop_library(library_id)
+    inverted_index.merge()
+
+
+def save_keyword_index(db_container, snapshot_path: str) -> None:
+    """Snapshot the keyword index as of the current end of the log."""
+    db_container.inverted_index().save_snapshot(
+        snapshot_path, db_container.persistence_manager().end_offset()
+    )
+
 
 async def database_error_handler(_request: Request, exc: DatabaseError) -> JSONResponse:
     """Convert domain exceptions to HTTP responses."""
@@ -57,6 +124,23 @@ async def validation_error_handler(
     )
 
 
+async def log_durability(request: Request, call_next):
+    """Log the request's actions at the durability level of its
+    ``X-Durability`` header (default: ``ACTION_LOG_DURABILITY``), and respond
+    only once they are that durable. Waiting here, outside the repository
+    locks, lets concurrent requests share a group commit."""
+    level = request.headers.get("X-Durability")
+    if level is not None:
+        try:
+            durability_level(level)
+        except ValidationError as exc:
+            return await validation_error_handler(request, exc)
+    with durability_scope(level) as scope:
+        response = await call_next(request)
+    await asyncio.gather(*(asyncio.wrap_future(future) for future in scope.futures))
+    return response
+
+
 def get_application() -> FastAPI:
     application = FastAPI(
         title="Vector DB API",
@@ -67,6 +151,7 @@ def get_application() -> FastAPI:
 
     application.add_exception_handler(ValidationError, validation_error_handler)
     application.add_exception_handler(DatabaseError, database_error_handler)
+    application.middleware("http")(log_durability)
 
     # Register routers
     application.include_router(library.router, prefix="/libraries", tags=["Libraries"])
@@ -1,10 +1,21 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 from app.schemas.document import DocumentResponse
 
+VectorStorage = Literal["float32", "float16", "int8", "pq"]
+AnalyzerName = Literal["default", "standard", "english"]
+
 
 class LibraryBase(BaseModel):
     name: str = Field(..., description="Library name")
+    vector_storage: VectorStorage = Field(
+        default="float32",
+        description="How embeddings are stored for search: 'float32' (exact), 'float16' / 'int8' (scalar-quantized) or 'pq' (product-quantized); quantized modes re-rank against full vectors on disk",
+    )
+    analyzer: AnalyzerName = Field(
+        default="default",
+        description="Keyword analysis pipeline: 'default' (lowercase, strip ASCII punctuation), 'standard' (also Unicode normalization and accent folding) or 'english' (standard plus stopword removal and plural stemming)",
+    )
 
 
 class LibraryCreate(LibraryBase):
@@ -13,6 +24,13 @@ class LibraryCreate(LibraryBase):
 
 class LibraryUpdate(BaseModel):
     name: Optional[str] = Field(None, description="New library name")
+    vector_storage: Optional[VectorStorage] = Field(
+        None, description="New embedding storage mode"
+    )
+    analyzer: Optional[AnalyzerName] = Field(
+        None,
+        description="New keyword analysis pipeline (re-indexes the library's chunks)",
+    )
 
 
 class LibraryResponse(LibraryBase):
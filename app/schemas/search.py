@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import List, Literal, Optional
 from app.schemas.chunk import ChunkResponse
 
 
@@ -8,12 +8,88 @@ class SearchResult(BaseModel):
     chunk: ChunkResponse
 
 
-class SearchRequest(BaseModel):
-    query: str = Field(..., description="Query text")
+class SearchOptions(BaseModel):
+    ef_search: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="HNSW only: size of the candidate list explored per query (higher is slower but more accurate)",
+    )
+    nprobe: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="IVF only: number of nearest clusters scanned per query (higher is slower but more accurate)",
+    )
+    rerank: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Quantized libraries only: number of candidates re-scored against full-precision vectors (0 disables re-ranking)",
+    )
+    lsh_candidates: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="LSH only: number of candidates gathered across the hash tables and re-scored exactly (higher is slower but more accurate)",
+    )
+    document_ids: Optional[List[int]] = Field(
+        default=None,
+        description="Only return chunks belonging to these documents",
+    )
+    exclude_document_ids: Optional[List[int]] = Field(
+        default=None,
+        description="Never return chunks belonging to these documents",
+    )
+    chunk_ids: Optional[List[int]] = Field(
+        default=None,
+        description="Only return these chunks",
+    )
+    fuzziness: Optional[int] = Field(
+        default=None,
+        ge=0,
+        le=2,
+        description="Keyword only: let every query word match terms within this many edits (typos), fewer for short words",
+    )
+    fusion: Optional[Literal["rrf", "weighted"]] = Field(
+        default=None,
+        description="Hybrid only: merge keyword and vector results by reciprocal-rank fusion ('rrf', default) or min-max normalized scores ('weighted')",
+    )
+    keyword_weight: Optional[float] = Field(
+        default=None,
+        ge=0,
+        description="Hybrid only: weight of the keyword results (default 1.0)",
+    )
+    vector_weight: Optional[float] = Field(
+        default=None,
+        ge=0,
+        description="Hybrid only: weight of the vector results (default 1.0)",
+    )
+
+
+# Cohere's embed endpoint accepts at most 96 texts per call.
+MAX_BATCH_QUERIES = 96
+
+
+class SearchParameters(SearchOptions):
     k: int = Field(default=3, gt=0, description="Number of results")
-    search_type: Literal["keyword", "knn"] = Field(
-        default="knn",
-        description="Search type: 'keyword' for exact word matches, 'knn' for similarity search",
+    search_type: Literal["keyword", "knn", "hnsw", "ivf", "lsh", "pq", "hybrid"] = (
+        Field(
+            default="knn",
+            description="Search type: 'keyword' for exact word matches, 'knn' for exact similarity search, 'hnsw', 'ivf' or 'lsh' for approximate similarity search, 'pq' for code-only scoring of product-quantized libraries, 'hybrid' to fuse keyword and knn results",
+        )
+    )
+
+
+class SearchRequest(SearchParameters):
+    query: str = Field(
+        ...,
+        description='Query text; keyword search also accepts "quoted phrases", prefix*/wildcard? terms, fuzzy~n terms, NEAR/n proximity, AND/OR/NOT and parentheses',
+    )
+
+
+class BatchSearchRequest(SearchParameters):
+    queries: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BATCH_QUERIES,
+        description="Query texts, embedded together and searched in one pass",
     )
 
 
@@ -43,7 +43,9 @@ class ChunkService(IChunkService):
         created_chunk = self._chunk_repository.create(
             chunk.text, chunk.document_id, embedding=None
         )
-        self._inverted_index.index_chunk(created_chunk.id, created_chunk.text)
+        self._inverted_index.index_chunk(
+            created_chunk.id, created_chunk.text, created_chunk.library_id
+        )
         return created_chunk
 
     @chunk_exists
@@ -62,8 +64,8 @@ class ChunkService(IChunkService):
 
         if chunk.text is not None and old_text and chunk.text != old_text:
             embedding_to_set = None
-            self._inverted_index.remove_chunk(chunk_id, old_text)
-            self._inverted_index.index_chunk(chunk_id, chunk.text)
+            library_id = existing_chunk.library_id
+            self._inverted_index.index_chunk(chunk_id, chunk.text, library_id)
 
         if chunk.embedding is not None:
             embedding_to_set = chunk.embedding
@@ -80,5 +82,5 @@ class ChunkService(IChunkService):
     def delete_chunk(self, chunk_id: int) -> None:
         chunk = self._chunk_repository.get(chunk_id)
         if chunk:
-            self._inverted_index.remove_chunk(chunk_id, chunk.text)
+            self._inverted_index.remove_chunk(chunk_id, chunk.library_id)
         self._chunk_repository.delete(chunk_id)
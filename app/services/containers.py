@@ -26,6 +26,8 @@ class ServiceContainer(containers.DeclarativeContainer):
         "app.services.library_service.LibraryService",
         library_repository=db.library_repository,
         document_repository=db.document_repository,
+        chunk_repository=db.chunk_repository,
+        inverted_index=db.inverted_index,
     )
 
     document_service = providers.Singleton(
@@ -56,27 +58,81 @@ class ServiceContainer(containers.DeclarativeContainer):
         "app.services.search.strategies.knn_strategy.KnnSearchStrategy",
         chunk_repository=db.chunk_repository,
         embedding_service=embedding_service,
+        vector_index=db.vector_store,
+    )
+
+    hnsw_strategy = providers.Factory(
+        "app.services.search.strategies.knn_strategy.KnnSearchStrategy",
+        chunk_repository=db.chunk_repository,
+        embedding_service=embedding_service,
+        vector_index=db.hnsw_index,
+    )
+
+    ivf_strategy = providers.Factory(
+        "app.services.search.strategies.knn_strategy.KnnSearchStrategy",
+        chunk_repository=db.chunk_repository,
+        embedding_service=embedding_service,
+        vector_index=db.ivf_index,
+    )
+
+    lsh_strategy = providers.Factory(
+        "app.services.search.strategies.knn_strategy.KnnSearchStrategy",
+        chunk_repository=db.chunk_repository,
+        embedding_service=embedding_service,
+        vector_index=db.lsh_index,
+    )
+
+    pq_strategy = providers.Factory(
+        "app.services.search.strategies.pq_strategy.PqSearchStrategy",
+        chunk_repository=db.chunk_repository,
+        embedding_service=embedding_service,
+        vector_index=db.vector_store,
+        library_repository=db.library_repository,
     )
 
     keyword_strategy = providers.Factory(
         "app.services.search.strategies.keyword_strategy.KeywordSearchStrategy",
         search_repository=db.search_repository,
+        chunk_repository=db.chunk_repository,
+    )
+
+    hybrid_strategy = providers.Factory(
+        "app.services.search.strategies.hybrid_strategy.HybridSearchStrategy",
+        keyword_strategy=keyword_strategy,
+        vector_strategy=knn_strategy,
+        candidates=config.HYBRID_CANDIDATES.as_int(),
+        rrf_k=config.HYBRID_RRF_K.as_int(),
     )
 
     def _create_search_service(
         knn_strategy_instance,
+        hnsw_strategy_instance,
+        ivf_strategy_instance,
+        lsh_strategy_instance,
+        pq_strategy_instance,
         keyword_strategy_instance,
+        hybrid_strategy_instance,
     ):
         """Creates SearchService and registers strategies."""
         from app.services.search.search_service import SearchService
 
         service = SearchService()
         service.register_strategy("knn", knn_strategy_instance)
+        service.register_strategy("hnsw", hnsw_strategy_instance)
+        service.register_strategy("ivf", ivf_strategy_instance)
+        service.register_strategy("lsh", lsh_strategy_instance)
+        service.register_strategy("pq", pq_strategy_instance)
         service.register_strategy("keyword", keyword_strategy_instance)
+        service.register_strategy("hybrid", hybrid_strategy_instance)
         return service
 
     search_service = providers.Singleton(
         _create_search_service,
         knn_strategy_instance=knn_strategy,
+        hnsw_strategy_instance=hnsw_strategy,
+        ivf_strategy_instance=ivf_strategy,
+        lsh_strategy_instance=lsh_strategy,
+        pq_strategy_instance=pq_strategy,
         keyword_strategy_instance=keyword_strategy,
+        hybrid_strategy_instance=hybrid_strategy,
     )
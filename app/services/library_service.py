@@ -2,6 +2,8 @@ from typing import List
 from app.interfaces.services.library_service import ILibraryService
 from app.interfaces.repositories.library_repository import ILibraryRepository
 from app.interfaces.repositories.document_repository import IDocumentRepository
+from app.interfaces.repositories.chunk_repository import IChunkRepository
+from app.interfaces.indexing import IInvertedIndex
 from app.core.exceptions import EntityNotFoundError
 from app.core.decorators import library_exists
 from app.db.models import Library
@@ -14,9 +16,13 @@ class LibraryService(ILibraryService):
         self,
         library_repository: ILibraryRepository,
         document_repository: IDocumentRepository,
+        chunk_repository: IChunkRepository,
+        inverted_index: IInvertedIndex,
     ):
         self._library_repository = library_repository
         self._document_repository = document_repository
+        self._chunk_repository = chunk_repository
+        self._inverted_index = inverted_index
 
     @library_exists
     def get_library(self, library_id: int) -> Library:
@@ -36,6 +42,8 @@ class LibraryService(ILibraryService):
         return LibraryDetail(
             id=library.id,
             name=library.name,
+            vector_storage=library.vector_storage,
+            analyzer=library.analyzer,
             documents=document_responses,
         )
 
@@ -43,15 +51,37 @@ class LibraryService(ILibraryService):
         return self._library_repository.get_all()
 
     def create_library(self, library: LibraryCreate) -> Library:
-        return self._library_repository.create(library.name)
+        return self._library_repository.create(
+            library.name,
+            vector_storage=library.vector_storage,
+            analyzer=library.analyzer,
+        )
 
     @library_exists
     def update_library(self, library_id: int, library: LibraryUpdate) -> Library:
-        updated = self._library_repository.update(library_id, library.name)
+        if library.analyzer is not None:
+            # Re-indexed under the new analyzer and swapped in before the
+            # update is stored, so keyword searches never see the library
+            # empty; the repository then finds the analyzer already switched.
+            self._inverted_index.set_analyzer(
+                library_id,
+                library.analyzer,
+                lambda: [
+                    (chunk.id, chunk.text)
+                    for chunk in self._chunk_repository.get_by_library(library_id)
+                    if chunk.text
+                ],
+            )
+        updated = self._library_repository.update(
+            library_id, library.name, library.vector_storage, library.analyzer
+        )
         if updated is None:
             raise EntityNotFoundError.library(library_id)
+        if library.vector_storage is not None:
+            self._chunk_repository.sync_embeddings(library_id)
         return updated
 
     @library_exists
     def delete_library(self, library_id: int) -> None:
         self._library_repository.delete(library_id)
+        self._inverted_index.drop_library(library_id)
@@ -0,0 +1,24 @@
+from typing import Optional, Set
+from app.core.filters import ChunkFilter
+from app.interfaces.repositories.chunk_repository import IChunkRepository
+from app.schemas.search import SearchOptions
+
+
+def build_chunk_filter(
+    chunk_repository: IChunkRepository, options: Optional[SearchOptions]
+) -> Optional[ChunkFilter]:
+    """Resolve the document / chunk filters of a request into chunk id sets."""
+    if options is None:
+        return None
+    allowed: Optional[Set[int]] = None
+    if options.chunk_ids is not None:
+        allowed = set(options.chunk_ids)
+    if options.document_ids is not None:
+        document_chunks = chunk_repository.get_ids_by_documents(options.document_ids)
+        allowed = document_chunks if allowed is None else allowed & document_chunks
+    excluded: Set[int] = set()
+    if options.exclude_document_ids:
+        excluded = chunk_repository.get_ids_by_documents(options.exclude_document_ids)
+    if allowed is None and not excluded:
+        return None
+    return ChunkFilter(allowed, excluded)
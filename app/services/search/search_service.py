@@ -1,7 +1,7 @@
-from typing import List, Dict, Any
+from typing import Any, List, Dict, Optional
 from app.interfaces.services.search_service import ISearchService, ISearchStrategy
 from app.core.exceptions import ValidationError
-from app.schemas.search import SearchResult
+from app.schemas.search import SearchResult, SearchOptions
 from app.schemas.chunk import ChunkResponse
 
 
@@ -13,13 +13,37 @@ class SearchService(ISearchService):
         self._strategies[name] = strategy
 
     def search(
-        self, strategy: str, library_id: int, query: str, k: int
+        self,
+        strategy: str,
+        library_id: int,
+        query: str,
+        k: int,
+        options: Optional[SearchOptions] = None,
     ) -> List[SearchResult]:
+        raw_results = self._get_strategy(strategy).search(library_id, query, k, options)
+        return self._to_results(raw_results)
+
+    def search_batch(
+        self,
+        strategy: str,
+        library_id: int,
+        queries: List[str],
+        k: int,
+        options: Optional[SearchOptions] = None,
+    ) -> List[List[SearchResult]]:
+        raw_batch = self._get_strategy(strategy).search_batch(
+            library_id, queries, k, options
+        )
+        return [self._to_results(raw_results) for raw_results in raw_batch]
+
+    def _get_strategy(self, strategy: str) -> ISearchStrategy:
         if strategy not in self._strategies:
             raise ValidationError(
                 f"Strategy '{strategy}' not found. Available strategies: {list(self._strategies.keys())}"
             )
-        raw_results = self._strategies[strategy].search(library_id, query, k)
+        return self._strategies[strategy]
+
+    def _to_results(self, raw_results: List[Dict[str, Any]]) -> List[SearchResult]:
         return [
             SearchResult(
                 score=result["score"],
@@ -0,0 +1,94 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from app.interfaces.services.search_service import ISearchStrategy
+from app.schemas.search import SearchOptions
+
+
+class HybridSearchStrategy(ISearchStrategy):
+    """Keyword and vector search run side by side on bounded candidate pools,
+    merged by reciprocal-rank fusion ("rrf") or min-max normalized weighted scores ("weighted")."""
+
+    def __init__(
+        self,
+        keyword_strategy: ISearchStrategy,
+        vector_strategy: ISearchStrategy,
+        candidates: int,
+        rrf_k: int,
+        max_workers: int = 8,
+    ):
+        self._keyword_strategy = keyword_strategy
+        self._vector_strategy = vector_strategy
+        self._candidates = candidates
+        self._rrf_k = rrf_k
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="hybrid-search"
+        )
+
+    def search(
+        self,
+        library_id: int,
+        query: str,
+        k: int,
+        options: Optional[SearchOptions] = None,
+    ) -> List[Dict[str, Any]]:
+        return self.search_batch(library_id, [query], k, options)[0]
+
+    def search_batch(
+        self,
+        library_id: int,
+        queries: List[str],
+        k: int,
+        options: Optional[SearchOptions] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        options = options or SearchOptions()
+        pool = max(k, self._candidates)
+        weights = (
+            1.0 if options.keyword_weight is None else options.keyword_weight,
+            1.0 if options.vector_weight is None else options.vector_weight,
+        )
+        empty = [[] for _ in queries]
+        keyword_future = None
+        if weights[0]:
+            keyword_future = self._executor.submit(
+                self._keyword_strategy.search_batch, library_id, queries, pool, options
+            )
+        vector_batch = (
+            self._vector_strategy.search_batch(library_id, queries, pool, options)
+            if weights[1]
+            else empty
+        )
+        keyword_batch = keyword_future.result() if keyword_future is not None else empty
+
+        return [
+            self._fuse(
+                (keyword_results, vector_results), weights, k, options.fusion or "rrf"
+            )
+            for keyword_results, vector_results in zip(keyword_batch, vector_batch)
+        ]
+
+    def _fuse(self, sides, weights, k: int, fusion: str) -> List[Dict[str, Any]]:
+        chunks: Dict[int, Any] = {}
+        scores: Dict[int, float] = {}
+        for results, weight in zip(sides, weights):
+            if not results or not weight:
+                continue
+            if fusion == "rrf":
+                contributions = [
+                    weight / (self._rrf_k + rank) for rank in range(1, len(results) + 1)
+                ]
+            else:
+                raw = [result["score"] for result in results]
+                low, high = min(raw), max(raw)
+                contributions = [
+                    weight * ((score - low) / (high - low) if high > low else 1.0)
+                    for score in raw
+                ]
+            for result, contribution in zip(results, contributions):
+                chunk = result["chunk"]
+                chunks[chunk.id] = chunk
+                scores[chunk.id] = scores.get(chunk.id, 0.0) + contribution
+        ranked = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [
+            {"chunk": chunks[chunk_id], "score": score} for chunk_id, score in ranked
+        ]
@@ -1,11 +1,26 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.interfaces.services.search_service import ISearchStrategy
 from app.interfaces.repositories.search_repository import ISearchRepository
+from app.interfaces.repositories.chunk_repository import IChunkRepository
+from app.schemas.search import SearchOptions
+from app.services.search.filters import build_chunk_filter
 
 class KeywordSearchStrategy(ISearchStrategy):
-    def __init__(self, search_repository: ISearchRepository):
+    def __init__(self, search_repository: ISearchRepository, chunk_repository: IChunkRepository):
         self._search_repository = search_repository
+        self._chunk_repository = chunk_repository
 
-    def search(self, library_id: int, query: str, k: int) -> List[Dict[str, Any]]:
-        results = self._search_repository.search_word(query, library_id)
-        return [{"chunk": chunk, "score": float(score)} for chunk, score in results[:k]]
\ No newline at end of file
+    def search(self, library_id: int, query: str, k: int, options: Optional[SearchOptions] = None) -> List[Dict[str, Any]]:
+        chunk_filter = build_chunk_filter(self._chunk_repository, options)
+        fuzziness = options.fuzziness if options else None
+        results = self._search_repository.search_word(query, library_id, chunk_filter, k, fuzziness)
+        return [{"chunk": chunk, "score": float(score)} for chunk, score in results[:k]]
+
+    def search_batch(self, library_id: int, queries: List[str], k: int, options: Optional[SearchOptions] = None) -> List[List[Dict[str, Any]]]:
+        chunk_filter = build_chunk_filter(self._chunk_repository, options)
+        fuzziness = options.fuzziness if options else None
+        batch = self._search_repository.search_words(queries, library_id, chunk_filter, k, fuzziness)
+        return [
+            [{"chunk": chunk, "score": float(score)} for chunk, score in results[:k]]
+            for results in batch
+        ]
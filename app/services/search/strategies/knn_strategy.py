@@ -1,28 +1,33 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from app.interfaces.services.search_service import ISearchStrategy
 from app.interfaces.repositories.chunk_repository import IChunkRepository
 from app.interfaces.services.embedding_service import IEmbeddingService
-from app.core.math_utils import cosine_similarity
+from app.interfaces.indexing import IVectorIndex
+from app.schemas.search import SearchOptions
+from app.services.search.filters import build_chunk_filter
 
 class KnnSearchStrategy(ISearchStrategy):
-    def __init__(self, chunk_repository: IChunkRepository, embedding_service: IEmbeddingService):
+    def __init__(self, chunk_repository: IChunkRepository, embedding_service: IEmbeddingService, vector_index: IVectorIndex):
         self._chunk_repository = chunk_repository
         self._embedding_service = embedding_service
+        self._vector_index = vector_index
 
-    def _calculate_similarity(self, query_embedding: List[float], chunk_embedding: List[float]) -> float:
-        return cosine_similarity(query_embedding, chunk_embedding)
+    def search(self, library_id: int, query: str, k: int, options: Optional[SearchOptions] = None) -> List[Dict[str, Any]]:
+        return self.search_batch(library_id, [query], k, options)[0]
 
-    def search(self, library_id: int, query: str, k: int) -> List[Dict[str, Any]]:
-        query_embedding = self._embedding_service.generate_embeddings([query], input_type="search_query")
-        if not query_embedding:
-            return []
-        query_embedding = query_embedding[0]
-        chunks = self._chunk_repository.get_by_library(library_id)
+    def search_batch(self, library_id: int, queries: List[str], k: int, options: Optional[SearchOptions] = None) -> List[List[Dict[str, Any]]]:
+        query_embeddings = self._embedding_service.generate_embeddings(queries, input_type="search_query")
+        if not query_embeddings:
+            return [[] for _ in queries]
+        chunk_filter = build_chunk_filter(self._chunk_repository, options)
+        batch = self._vector_index.search_batch(library_id, query_embeddings, k, options, chunk_filter)
+        return [self._to_results(matches) for matches in batch]
+
+    def _to_results(self, matches: List[Tuple[int, float]]) -> List[Dict[str, Any]]:
         results = []
-        for chunk in chunks:
-            if chunk.embedding is None:
+        for chunk_id, score in matches:
+            chunk = self._chunk_repository.get(chunk_id)
+            if chunk is None:
                 continue
-            score = self._calculate_similarity(query_embedding, chunk.embedding)
             results.append({"chunk": chunk, "score": score})
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:k]
\ No newline at end of file
+        return results
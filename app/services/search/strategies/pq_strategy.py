@@ -0,0 +1,39 @@
+from typing import List, Dict, Any, Optional
+from app.interfaces.repositories.chunk_repository import IChunkRepository
+from app.interfaces.repositories.library_repository import ILibraryRepository
+from app.interfaces.services.embedding_service import IEmbeddingService
+from app.interfaces.indexing import IVectorIndex
+from app.core.exceptions import ValidationError
+from app.schemas.search import SearchOptions
+from app.services.search.strategies.knn_strategy import KnnSearchStrategy
+
+
+class PqSearchStrategy(KnnSearchStrategy):
+    """k-NN scored from product-quantized codes alone unless ``rerank`` is requested."""
+
+    def __init__(
+        self,
+        chunk_repository: IChunkRepository,
+        embedding_service: IEmbeddingService,
+        vector_index: IVectorIndex,
+        library_repository: ILibraryRepository,
+    ):
+        super().__init__(chunk_repository, embedding_service, vector_index)
+        self._library_repository = library_repository
+
+    def search_batch(
+        self,
+        library_id: int,
+        queries: List[str],
+        k: int,
+        options: Optional[SearchOptions] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        library = self._library_repository.get(library_id)
+        if library is not None and library.vector_storage != "pq":
+            raise ValidationError(
+                f"library {library_id} uses '{library.vector_storage}' vector storage, not 'pq'",
+                field="search_type",
+            )
+        if options is None or options.rerank is None:
+            options = (options or SearchOptions()).model_copy(update={"rerank": 0})
+        return super().search_batch(library_id, queries, k, options)
@@ -0,0 +1,76 @@
+"""Action log throughput at each durability level.
+
+Run from the repository root, pointing ``--dir`` at the disk the log will
+live on (fsync cost depends entirely on it)::
+
+    python -m benchmarks.action_log_durability --dir /var/lib/vector-db
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.db.storage.action_logger import ActionLogger
+from app.db.storage.durability import DURABILITY_LEVELS
+from app.db.storage.persistence_manager import PersistenceManager
+from app.db.storage.storage import Storage
+
+TEXT = "The quick brown fox jumps over the lazy dog. " * 10
+
+
+def run(
+    directory: str, level: str, actions: int, writers: int, wait: bool, args
+) -> float:
+    path = os.path.join(directory, f"bench_{level}_{writers}_{wait}.jsonl")
+    storage = Storage(
+        path,
+        group_window_ms=args.group_window_ms,
+        durability=level,
+        fsync_interval_ms=args.fsync_interval_ms,
+    )
+    manager = PersistenceManager(storage, ActionLogger())
+
+    def write(writer: int) -> None:
+        for i in range(actions // writers):
+            data = {"id": writer * actions + i, "text": TEXT, "document_id": 0}
+            future = manager.save_action("create_chunk", data)
+            if wait:
+                future.result()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(writers) as pool:
+        list(pool.map(write, range(writers)))
+    storage.flush()
+    elapsed = time.perf_counter() - start
+    storage.close()
+    os.remove(path)
+    return actions / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=None, help="directory for the log files")
+    parser.add_argument("--actions", type=int, default=20000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--group-window-ms", type=float, default=0.0)
+    parser.add_argument("--fsync-interval-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    modes = [
+        ("1 writer, no waiting", 1, False),
+        ("1 writer, waiting", 1, True),
+        (f"{args.writers} writers, waiting", args.writers, True),
+    ]
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        print(f"{'level':<15}" + "".join(f"{name:>26}" for name, _, _ in modes))
+        for level in DURABILITY_LEVELS:
+            rates = [
+                run(directory, level, args.actions, writers, wait, args)
+                for _, writers, wait in modes
+            ]
+            print(f"{level:<15}" + "".join(f"{rate:>20,.0f} ops/s" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Exact k-NN search latency percentiles by number of search threads.
+
+Each configuration runs ``--clients`` threads issuing queries back to back
+against one library, alone and alongside a writer that appends new rows or
+updates existing ones, and reports p50/p99 latency and throughput. Updates
+force scans that overlapped them to be redone under the store lock. Run from
+the repository root on the machine whose cores are being measured::
+
+    python -m benchmarks.vector_search_latency --rows 1000000 --dimension 256
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import numpy as np
+from app.db.vector_store import VectorStore
+
+
+def build(rows: int, dimension: int, threads: int, shard_min_rows: int) -> VectorStore:
+    store = VectorStore(
+        lock=threading.RLock(), search_threads=threads, shard_min_rows=shard_min_rows
+    )
+    rng = np.random.default_rng(0)
+    for start in range(0, rows, 65536):
+        for chunk_id, vector in enumerate(
+            rng.standard_normal((min(65536, rows - start), dimension)), start
+        ):
+            store.add(0, chunk_id, vector.tolist())
+    return store
+
+
+def run(store: VectorStore, args, writer_mode: str) -> List[float]:
+    rng = np.random.default_rng(1)
+    queries = rng.standard_normal((args.queries, args.dimension)).tolist()
+    stopped = threading.Event()
+
+    def write() -> None:
+        writer_rng = np.random.default_rng(2)
+        next_id = args.rows
+        while not stopped.is_set():
+            if writer_mode == "append":
+                chunk_id, next_id = next_id, next_id + 1
+            else:
+                chunk_id = int(writer_rng.integers(args.rows))
+            store.add(0, chunk_id, writer_rng.standard_normal(args.dimension).tolist())
+            time.sleep(args.write_interval_ms / 1000)
+
+    def query(client: int) -> List[float]:
+        latencies = []
+        for i in range(client, len(queries), args.clients):
+            start = time.perf_counter()
+            store.search(0, queries[i], args.k)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    writer = threading.Thread(target=write, daemon=True)
+    if writer_mode != "none":
+        writer.start()
+    try:
+        with ThreadPoolExecutor(args.clients) as pool:
+            return [
+                t
+                for latencies in pool.map(query, range(args.clients))
+                for t in latencies
+            ]
+    finally:
+        stopped.set()
+        if writer.is_alive():
+            writer.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=262144)
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--shard-min-rows", type=int, default=16384)
+    parser.add_argument("--write-interval-ms", type=float, default=1.0)
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="search thread counts to compare",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{args.rows:,} rows x {args.dimension} dims, {args.clients} clients, k={args.k}"
+    )
+    print(f"{'threads':>8}{'writer':>10}{'p50 ms':>10}{'p99 ms':>10}{'queries/s':>12}")
+    for threads in args.threads:
+        store = build(args.rows, args.dimension, threads, args.shard_min_rows)
+        for writer_mode in ("none", "append", "update"):
+            start = time.perf_counter()
+            latencies = np.array(run(store, args, writer_mode)) * 1000
+            elapsed = time.perf_counter() - start
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(
+                f"{threads:>8}{writer_mode:>10}"
+                f"{p50:>10.2f}{p99:>10.2f}{len(latencies) / elapsed:>12,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
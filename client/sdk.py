@@ -4,6 +4,10 @@ from typing import List, Dict, Any, Optional, Literal
 
 logger = logging.getLogger(__name__)
 
+SearchType = Literal["knn", "hnsw", "ivf", "lsh", "pq", "keyword", "hybrid"]
+VectorStorage = Literal["float32", "float16", "int8", "pq"]
+Analyzer = Literal["default", "standard", "english"]
+
 
 class Client:
     def __init__(self, base_url: str = "http://localhost:8000"):
@@ -41,14 +45,35 @@ class Client:
     def get_all_libraries(self) -> List[Dict[str, Any]]:
         return self._request("GET", "/libraries")
 
-    def create_library(self, name: str) -> Dict[str, Any]:
-        return self._request("POST", "/libraries", json={"name": name})
+    def create_library(
+        self,
+        name: str,
+        vector_storage: VectorStorage = "float32",
+        analyzer: Optional[Analyzer] = None,
+    ) -> Dict[str, Any]:
+        data = {"name": name, "vector_storage": vector_storage}
+        if analyzer is not None:
+            data["analyzer"] = analyzer
+        return self._request("POST", "/libraries", json=data)
 
     def get_library(self, library_id: int) -> Dict[str, Any]:
         return self._request("GET", f"/libraries/{library_id}")
 
-    def update_library(self, library_id: int, name: str) -> Dict[str, Any]:
-        return self._request("PATCH", f"/libraries/{library_id}", json={"name": name})
+    def update_library(
+        self,
+        library_id: int,
+        name: Optional[str] = None,
+        vector_storage: Optional[VectorStorage] = None,
+        analyzer: Optional[Analyzer] = None,
+    ) -> Dict[str, Any]:
+        data = {}
+        if name is not None:
+            data["name"] = name
+        if vector_storage is not None:
+            data["vector_storage"] = vector_storage
+        if analyzer is not None:
+            data["analyzer"] = analyzer
+        return self._request("PATCH", f"/libraries/{library_id}", json=data)
 
     def create_document(self, library_id: int, name: str) -> Dict[str, Any]:
         data = {"name": name, "library_id": library_id}
@@ -91,7 +116,73 @@ class Client:
         library_id: int,
         query: str,
         k: int = 10,
-        search_type: Literal["knn", "keyword"] = "knn",
+        search_type: SearchType = "knn",
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        rerank: Optional[int] = None,
+        lsh_candidates: Optional[int] = None,
+        document_ids: Optional[List[int]] = None,
+        exclude_document_ids: Optional[List[int]] = None,
+        chunk_ids: Optional[List[int]] = None,
+        fuzziness: Optional[int] = None,
+        fusion: Optional[Literal["rrf", "weighted"]] = None,
+        keyword_weight: Optional[float] = None,
+        vector_weight: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
-        data = {"query": query, "k": k, "search_type": search_type}
+        data = self._search_payload(
+            query=query,
+            k=k,
+            search_type=search_type,
+            ef_search=ef_search,
+            nprobe=nprobe,
+            rerank=rerank,
+            lsh_candidates=lsh_candidates,
+            document_ids=document_ids,
+            exclude_document_ids=exclude_document_ids,
+            chunk_ids=chunk_ids,
+            fuzziness=fuzziness,
+            fusion=fusion,
+            keyword_weight=keyword_weight,
+            vector_weight=vector_weight,
+        )
         return self._request("POST", f"/libraries/{library_id}/search", json=data)
+
+    def search_library_batch(
+        self,
+        library_id: int,
+        queries: List[str],
+        k: int = 10,
+        search_type: SearchType = "knn",
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        rerank: Optional[int] = None,
+        lsh_candidates: Optional[int] = None,
+        document_ids: Optional[List[int]] = None,
+        exclude_document_ids: Optional[List[int]] = None,
+        chunk_ids: Optional[List[int]] = None,
+        fuzziness: Optional[int] = None,
+        fusion: Optional[Literal["rrf", "weighted"]] = None,
+        keyword_weight: Optional[float] = None,
+        vector_weight: Optional[float] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        data = self._search_payload(
+            queries=queries,
+            k=k,
+            search_type=search_type,
+            ef_search=ef_search,
+            nprobe=nprobe,
+            rerank=rerank,
+            lsh_candidates=lsh_candidates,
+            document_ids=document_ids,
+            exclude_document_ids=exclude_document_ids,
+            chunk_ids=chunk_ids,
+            fuzziness=fuzziness,
+            fusion=fusion,
+            keyword_weight=keyword_weight,
+            vector_weight=vector_weight,
+        )
+        return self._request("POST", f"/libraries/{library_id}/search/batch", json=data)
+
+    @staticmethod
+    def _search_payload(**fields: Any) -> Dict[str, Any]:
+        return {name: value for name, value in fields.items() if value is not None}
@@ -1,6 +1,7 @@
 import os
 import sys
 import tempfile
+from concurrent.futures import Future
 import pytest
 from fastapi.testclient import TestClient
 
@@ -68,13 +69,16 @@ def stub_embeddings(monkeypatch):
 def prevent_db_writes(monkeypatch):
     """Prevent all database writes during tests to keep test isolation."""
 
-    def noop_save_action(self, action: str, data: dict) -> None:
+    def noop_save_action(self, record: str, durability=None) -> Future:
         """No-op method that prevents any writes to the database file."""
-        pass
+        future = Future()
+        future.set_result(None)
+        return future
 
     from app.db.storage.storage import Storage
 
     monkeypatch.setattr(Storage, "save_action", noop_save_action)
+    monkeypatch.setattr("app.main.save_keyword_index", lambda *args: None)
     yield
 
 
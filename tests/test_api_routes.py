@@ -1,3 +1,6 @@
+from concurrent.futures import Future
+
+
 def test_full_api_flow(client):
     create_library = client.post("/libraries", json={"name": "lib1"})
     assert create_library.status_code == 201
@@ -34,3 +37,84 @@ def test_full_api_flow(client):
     assert knn_search.status_code == 200
     knn_data = knn_search.json()
     assert isinstance(knn_data, list)
+
+
+def test_batch_search(client):
+    lib = client.post("/libraries", json={"name": "lib1"}).json()
+    doc = client.post(
+        "/documents", json={"name": "doc1", "library_id": lib["id"]}
+    ).json()
+    client.post("/chunks", json={"text": "hello world", "document_id": doc["id"]})
+    client.post("/chunks", json={"text": "goodbye world", "document_id": doc["id"]})
+    client.post(f"/libraries/{lib['id']}/index")
+
+    keyword = client.post(
+        f"/libraries/{lib['id']}/search/batch",
+        json={
+            "queries": ["hello", "world", "nothing"],
+            "k": 3,
+            "search_type": "keyword",
+        },
+    )
+    assert keyword.status_code == 200
+    assert [len(results) for results in keyword.json()] == [1, 2, 0]
+
+    knn = client.post(
+        f"/libraries/{lib['id']}/search/batch",
+        json={"queries": ["hello", "world"], "k": 1, "search_type": "knn"},
+    )
+    assert knn.status_code == 200
+    assert [len(results) for results in knn.json()] == [1, 1]
+
+    empty = client.post(f"/libraries/{lib['id']}/search/batch", json={"queries": []})
+    assert empty.status_code == 422
+
+
+def test_library_analyzer_applies_to_keyword_search(client):
+    lib = client.post("/libraries", json={"name": "lib1", "analyzer": "english"}).json()
+    assert lib["analyzer"] == "english"
+    doc = client.post(
+        "/documents", json={"name": "doc1", "library_id": lib["id"]}
+    ).json()
+    client.post("/chunks", json={"text": "The Café queries", "document_id": doc["id"]})
+
+    def search(query):
+        response = client.post(
+            f"/libraries/{lib['id']}/search",
+            json={"query": query, "k": 3, "search_type": "keyword"},
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    assert len(search("cafe query")) == 1
+    assert search("the") == []
+
+    updated = client.patch(f"/libraries/{lib['id']}", json={"analyzer": "default"})
+    assert updated.status_code == 200 and updated.json()["analyzer"] == "default"
+    assert len(search("the")) == 1
+    assert search("cafe") == []
+
+
+def test_durability_header_selects_the_log_level(client, monkeypatch):
+    from app.db.storage.storage import Storage
+
+    levels = []
+
+    def save_action(self, record, durability=None):
+        levels.append(durability)
+        future = Future()
+        future.set_result(None)
+        return future
+
+    monkeypatch.setattr(Storage, "save_action", save_action)
+    response = client.post(
+        "/libraries", json={"name": "lib"}, headers={"X-Durability": "sometimes"}
+    )
+    assert response.status_code == 422 and response.json()["field"] == "durability"
+    headers = {"X-Durability": "fsync-each"}
+    assert (
+        client.post("/libraries", json={"name": "lib"}, headers=headers).status_code
+        == 201
+    )
+    assert client.post("/libraries", json={"name": "lib"}).status_code == 201
+    assert levels == ["fsync-each", None]
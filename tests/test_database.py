@@ -1,7 +1,23 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from app.core.config import Settings
+from app.core.containers import AppContainer
+from app.db.index_snapshot import read_snapshot
+from app.db.storage.action_logger import ActionLogger
+from app.db.storage.persistence_manager import PersistenceManager
+from app.db.storage.storage import Storage
+from app.main import restore_keyword_index
 from app.schemas.library import LibraryCreate
 from app.schemas.document import DocumentCreate
 from app.schemas.chunk import ChunkCreate, ChunkUpdate
 
+# Captured before the autouse fixture that disables log writes replaces it.
+SAVE_ACTION = Storage.save_action
+
 
 def test_create_library_document_chunk_and_search(test_container):
     """Test creating library, document, chunk and searching using services."""
@@ -34,10 +50,208 @@ def test_create_library_document_chunk_and_search(test_container):
     results = search_repository.search_word("chunk", library_id=lib.id)
     assert len(results) == 1 and results[0][0].id == chunk2.id
 
-    inverted_index.remove_chunk(chunk.id, "Hello world")
+    inverted_index.remove_chunk(chunk.id)
     chunk_service.update_chunk(
         chunk.id, ChunkUpdate(text="Goodbye world", embedding=None)
     )
     inverted_index.index_chunk(chunk.id, "Goodbye world")
     res2 = search_repository.search_word("hello", library_id=lib.id)
     assert res2 == []
+
+
+def _boot(db_file):
+    """Replay the log into a fresh container and restore its keyword index."""
+    container = AppContainer()
+    container.config.from_pydantic(
+        Settings(DB_FILE=db_file, COHERE_API_KEY="test", _env_file=None)
+    )
+    db = container.db()
+    registry = db.action_handler_registry()
+    for repo in db.replayable_repositories():
+        registry.register_handlers(repo.get_replay_handlers())
+    db.persistence_manager().replay_actions(
+        handler_provider=registry,
+        replay_mode_manager=db.replay_mode_manager(),
+        start=db.checkpointer().restore(),
+    )
+    db.chunk_repository().sync_embeddings()
+    restore_keyword_index(db, container.config.KEYWORD_INDEX_SNAPSHOT())
+    return container, db
+
+
+def test_startup_reindexes_only_the_log_after_the_keyword_snapshot(test_db_file):
+    def log(*actions):
+        with open(test_db_file, "a") as f:
+            for action, data in actions:
+                f.write(json.dumps({"action": action, "data": data}) + "\n")
+
+    log(
+        ("create_library", {"id": 0, "name": "Lib"}),
+        ("create_library", {"id": 1, "name": "Gone"}),
+        ("create_document", {"id": 0, "name": "Doc", "library_id": 0}),
+        ("create_document", {"id": 1, "name": "Doc", "library_id": 1}),
+        ("create_chunk", {"id": 0, "text": "apple banana", "document_id": 0}),
+        ("create_chunk", {"id": 1, "text": "cherry apples", "document_id": 0}),
+        ("create_chunk", {"id": 2, "text": "apple", "document_id": 1}),
+    )
+    container, db = _boot(test_db_file)
+    snapshot_path = container.config.KEYWORD_INDEX_SNAPSHOT()
+    db.inverted_index().save_snapshot(
+        snapshot_path, db.persistence_manager().end_offset()
+    )
+
+    log(
+        ("update_chunk", {"id": 0, "text": "durian"}),
+        ("create_chunk", {"id": 3, "text": "banana apple", "document_id": 0}),
+        ("delete_chunk", {"id": 1}),
+        ("update_library", {"id": 0, "analyzer": "english"}),
+        ("delete_library", {"id": 1}),
+    )
+    container, db = _boot(test_db_file)
+    inverted_index = db.inverted_index()
+    assert set(inverted_index.search_word("apple", library_id=0)) == {3}
+    assert set(inverted_index.search_word("durian", library_id=0)) == {0}
+    assert inverted_index.search_word("cherry", library_id=0) == {}
+    assert 1 not in inverted_index.partitions
+
+    os.remove(snapshot_path)
+    _, rebuilt = _boot(test_db_file)
+    for query in ("apple", "banana", "durian", "the"):
+        assert inverted_index.search_word(query, library_id=0) == pytest.approx(
+            rebuilt.inverted_index().search_word(query, library_id=0)
+        )
+
+
+def test_checkpoint_compacts_the_log_and_replays_only_its_tail(
+    test_db_file, monkeypatch
+):
+    monkeypatch.setattr(Storage, "save_action", SAVE_ACTION)
+    _, db = _boot(test_db_file)
+    libraries, documents, chunks = (
+        db.library_repository(),
+        db.document_repository(),
+        db.chunk_repository(),
+    )
+    library = libraries.create("Lib")
+    kept = documents.create("Doc", library.id)
+    gone = documents.create("Gone", library.id)
+    chunks.create("apple", kept.id, embedding=[1.0, 0.0])
+    chunks.create("banana", kept.id)
+    chunks.create("cherry", gone.id, embedding=[0.0, 1.0])
+    chunks.update(1, None, None, [0.5, 0.5])
+    chunks.delete(0)
+    documents.delete(gone.id)
+    documents.update(kept.id, "Kept")
+    compact = libraries.create("Compact", vector_storage="int8")
+    chunks.create(
+        "elder", documents.create("Codes", compact.id).id, embedding=[0.3, 0.4]
+    )
+
+    log_offset = db.checkpointer().checkpoint()
+    assert read_snapshot(db.checkpointer().path)[1]["embeddings"].dtype == np.float32
+    # Written directly to the repositories, so the keyword snapshot lacks them.
+    keyword_snapshot = read_snapshot(db.checkpointer().keyword_index_path)
+    assert keyword_snapshot[0]["log_offset"] == log_offset
+    manager = db.persistence_manager()
+    assert manager.start_offset() == log_offset
+    assert not [
+        name for name in os.listdir(os.path.dirname(test_db_file)) if ".jsonl." in name
+    ]
+    chunks.create("durian", kept.id, embedding=[1.0, 1.0])
+    libraries.update(library.id, "Renamed", analyzer="english")
+    manager.close()
+    assert [action for action, _ in manager.load_actions()] == [
+        "create_chunk",
+        "update_library",
+    ]
+
+    def state(db):
+        return (
+            [library.model_dump() for library in db.library_repository().get_all()],
+            [document.model_dump() for document in db.document_repository().get_all()],
+            [chunk.model_dump() for chunk in db.chunk_repository().get_all()],
+            db.id_generator().get_next_ids(),
+            db.vector_store().count(library.id),
+        )
+
+    expected = state(db)
+    _, restored = _boot(test_db_file)
+    assert state(restored) == expected
+    assert restored.chunk_repository().get_ids_by_documents([gone.id]) == {2}
+    assert restored.chunk_repository().chunks[3].embedding is None
+    assert restored.chunk_repository().get(3).embedding == pytest.approx([0.3, 0.4])
+    assert set(
+        restored.inverted_index().search_word("elder", library_id=compact.id)
+    ) == {3}
+    assert set(
+        restored.inverted_index().search_word("durian", library_id=library.id)
+    ) == {4}
+
+
+def test_action_log_groups_concurrent_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(Storage, "save_action", SAVE_ACTION)
+    storage = Storage(str(tmp_path / "log.jsonl"), group_bytes=4096, group_window_ms=1)
+    manager = PersistenceManager(storage, ActionLogger())
+
+    def write(thread):
+        return [
+            manager.save_action("create_chunk", {"id": i, "thread": thread})
+            for i in range(500)
+        ]
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [future for batch in pool.map(write, range(4)) for future in batch]
+    offset = manager.end_offset()
+    assert all(future.done() for future in futures)
+    actions = [data for _, data in manager.load_actions()]
+    for thread in range(4):
+        assert [data["id"] for data in actions if data["thread"] == thread] == list(
+            range(500)
+        )
+
+    manager.close()
+    manager.save_action("delete_chunk", {"id": 0}).result(timeout=5)
+    manager.close()
+    assert list(manager.load_actions(offset)) == [("delete_chunk", {"id": 0})]
+
+
+def test_action_log_durability_levels(tmp_path, monkeypatch):
+    monkeypatch.setattr(Storage, "save_action", SAVE_ACTION)
+    fsyncs = []
+    monkeypatch.setattr(os, "fsync", fsyncs.append)
+
+    storage = Storage(str(tmp_path / "each.jsonl"), durability="fsync-each")
+    for i in range(3):
+        storage.save_action(json.dumps({"action": "a", "data": {"id": i}})).result(
+            timeout=5
+        )
+    assert len(fsyncs) == 3
+    storage.close()
+
+    fsyncs.clear()
+    storage = Storage(str(tmp_path / "none.jsonl"), durability="none")
+    storage.save_action(json.dumps({"action": "a", "data": {}})).result(timeout=5)
+    assert fsyncs == [] and os.path.getsize(storage.file_path) == 0
+    storage.save_action(json.dumps({"action": "b", "data": {}}), "fsync-each").result(
+        timeout=5
+    )
+    assert len(fsyncs) == 1 and [action for action, _ in storage.load_actions()] == [
+        "a",
+        "b",
+    ]
+    storage.close()
+
+    fsyncs.clear()
+    storage = Storage(
+        str(tmp_path / "batched.jsonl"),
+        durability="fsync-batched",
+        fsync_interval_ms=50,
+    )
+    for i in range(2):
+        storage.save_action(json.dumps({"action": "a", "data": {"id": i}})).result(
+            timeout=5
+        )
+    assert len(fsyncs) == 1 and len(list(storage.load_actions())) == 2
+    time.sleep(0.2)
+    assert len(fsyncs) == 2
+    storage.close()
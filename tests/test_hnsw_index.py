@@ -0,0 +1,134 @@
+import threading
+import numpy as np
+from app.db.vector_store import VectorStore
+from app.db.hnsw_index import HnswIndex
+from app.schemas.search import SearchOptions
+
+
+def _build(n=500, d=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, d)).astype(np.float32)
+    store = VectorStore(lock=threading.RLock())
+    index = HnswIndex(
+        store, m=8, ef_construction=64, ef_search=32, lock=threading.RLock()
+    )
+    for chunk_id, vector in enumerate(vectors):
+        store.add(0, chunk_id, vector.tolist())
+        index.add(0, chunk_id, vector.tolist())
+    index.search(0, vectors[0].tolist(), 1)
+    index.wait_for_build(0, timeout=30)
+    return store, index, rng
+
+
+def test_hnsw_recall_against_exact_search():
+    store, index, rng = _build()
+    hits = 0
+    queries = rng.standard_normal((50, 16))
+    for query in queries:
+        exact = {c for c, _ in store.search(0, query.tolist(), 5)}
+        approx = {
+            c
+            for c, _ in index.search(0, query.tolist(), 5, SearchOptions(ef_search=64))
+        }
+        hits += len(exact & approx)
+    assert hits / (5 * len(queries)) >= 0.9
+
+
+def test_hnsw_first_query_builds_the_graph_in_the_background():
+    store = VectorStore(lock=threading.RLock())
+    index = HnswIndex(
+        store, m=8, ef_construction=64, ef_search=32, lock=threading.RLock()
+    )
+    store.add(0, 0, [1.0, 0.0])
+    assert index.search(0, [1.0, 0.0], 1) == store.search(0, [1.0, 0.0], 1)
+    store.add(0, 1, [0.0, 1.0])
+    index.add(0, 1, [0.0, 1.0])
+    index.wait_for_build(0, timeout=30)
+    assert index.graphs[0].size == 2
+    assert index.search(0, [0.0, 1.0], 1)[0][0] == 1
+
+
+def test_hnsw_widens_the_beam_past_tombstones():
+    store, index, _ = _build(n=200)
+    query = np.ones(16)
+    nearest = [c for c, _ in store.search(0, query.tolist(), 60)]
+    for chunk_id in nearest:
+        store.remove(0, chunk_id)
+        index.remove(0, chunk_id)
+    results = index.search(0, query.tolist(), 10, SearchOptions(ef_search=10))
+    assert len(results) == 10 and not set(nearest) & {c for c, _ in results}
+
+
+def test_hnsw_incremental_insert_and_tombstone_delete():
+    store, index, _ = _build(n=100)
+    target = [0.0] * 15 + [100.0]
+    store.add(0, 1000, target)
+    index.add(0, 1000, target)
+    assert index.search(0, target, 1)[0][0] == 1000
+
+    store.remove(0, 1000)
+    index.remove(0, 1000)
+    assert 1000 not in {c for c, _ in index.search(0, target, 10)}
+
+
+def test_hnsw_search_type_through_service(test_container):
+    from app.schemas.library import LibraryCreate
+    from app.schemas.document import DocumentCreate
+    from app.schemas.chunk import ChunkCreate, ChunkUpdate
+
+    library_service = test_container.services.library_service()
+    document_service = test_container.services.document_service()
+    chunk_service = test_container.services.chunk_service()
+    search_service = test_container.services.search_service()
+
+    lib = library_service.create_library(LibraryCreate(name="lib"))
+    doc = document_service.create_document(
+        DocumentCreate(name="doc", library_id=lib.id)
+    )
+    c1 = chunk_service.create_chunk(ChunkCreate(text="a", document_id=doc.id))
+    c2 = chunk_service.create_chunk(ChunkCreate(text="b", document_id=doc.id))
+    chunk_service.update_chunk(c1.id, ChunkUpdate(embedding=[0.0, 1.0]))
+    chunk_service.update_chunk(c2.id, ChunkUpdate(embedding=[1.0, 0.1]))
+
+    res = search_service.search(
+        "hnsw", lib.id, "query", k=1, options=SearchOptions(ef_search=8)
+    )
+    assert res[0].chunk.id == c2.id
+
+
+def test_drop_library_discards_the_graph_and_builds_in_flight(monkeypatch):
+    store, index, _ = _build(n=100)
+    get_vectors = store.get_vectors
+
+    def get_vectors_then_drop(library_id):
+        snapshot = get_vectors(library_id)
+        store.drop_library(library_id)
+        index.drop_library(library_id)
+        return snapshot
+
+    monkeypatch.setattr(store, "get_vectors", get_vectors_then_drop)
+    index.build(0)
+    assert 0 not in index.graphs
+    assert not index._pending and not index._building
+
+
+def test_hnsw_search_walks_the_graph_outside_the_lock():
+    store, index, rng = _build(n=200)
+    graph = index.graphs[0]
+    walk = graph.search
+    writes = []
+
+    def search(*args):
+        # Another thread can write while the graph is walked.
+        writer = threading.Thread(
+            target=lambda: writes.append(
+                index.add(0, 1000, rng.standard_normal(16).tolist())
+            )
+        )
+        writer.start()
+        writer.join(timeout=5)
+        return walk(*args)
+
+    graph.search = search
+    assert len(index.search(0, rng.standard_normal(16).tolist(), 5)) == 5
+    assert writes and 1000 in graph.nodes
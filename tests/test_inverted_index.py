@@ -1,5 +1,9 @@
+import numpy as np
+import pytest
+from app.core.exceptions import ValidationError
+from app.core.filters import ChunkFilter
 from app.db.inverted_index import InvertedIndex
-from app.db.tokenization import DefaultTokenizationStrategy
+from app.db.tokenization import ANALYZERS, DefaultTokenizationStrategy
 
 
 def test_index_and_search_single_word():
@@ -19,3 +23,383 @@ def test_index_and_search_multiple_chunks():
     assert res[1] == 1 and res[2] == 1
     res2 = idx.search_word("apple banana")
     assert res2[1] == 2 and res2.get(2) == 1
+
+
+def test_search_words_scores_each_query():
+    tokenization_strategy = DefaultTokenizationStrategy()
+    idx = InvertedIndex(tokenization_strategy=tokenization_strategy)
+    idx.index_chunk(1, "apple banana")
+    idx.index_chunk(2, "banana cherry")
+    res = idx.search_words(["apple banana", "cherry", "durian"])
+    assert res == [{1: 2, 2: 1}, {2: 1}, {}]
+
+
+def test_bm25_ranks_by_term_frequency_and_length():
+    idx = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(), scoring="bm25"
+    )
+    idx.index_chunk(1, "apple apple banana", library_id=0)
+    idx.index_chunk(2, "apple banana cherry durian elderberry fig", library_id=0)
+    idx.index_chunk(3, "banana cherry", library_id=0)
+    res = idx.search_word("apple")
+    assert set(res) == {1, 2}
+    assert res[1] > res[2] > 0
+    # "durian" is rarer than "banana", so it contributes more.
+    res2 = idx.search_word("banana durian")
+    assert max(res2, key=res2.get) == 2
+
+
+def test_bm25_statistics_update_incrementally_per_library():
+    idx = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(), scoring="bm25"
+    )
+    idx.index_chunk(1, "apple banana", library_id=0)
+    idx.index_chunk(2, "apple cherry", library_id=0)
+    idx.index_chunk(3, "banana cherry", library_id=1)
+    library = idx.partitions[0]
+    assert {word: library.document_frequency(word) for word in library.vocabulary} == {
+        "apple": 2,
+        "banana": 1,
+        "cherry": 1,
+    }
+    assert len(idx.partitions[1]) == 1
+
+    before = idx.search_word("apple")[1]
+    idx.remove_chunk(2, library_id=0)
+    assert {word: library.document_frequency(word) for word in library.vocabulary} == {
+        "apple": 1,
+        "banana": 1,
+    }
+    assert library.total_length == 2
+    assert idx.search_word("apple")[1] > before
+
+    idx.remove_chunk(3)
+    assert 1 not in idx.partitions
+
+
+def test_search_is_scoped_to_library_partition():
+    idx = InvertedIndex(tokenization_strategy=DefaultTokenizationStrategy())
+    idx.index_chunk(1, "apple banana", library_id=0)
+    idx.index_chunk(2, "apple cherry", library_id=1)
+    assert idx.search_word("apple", library_id=1) == {2: 1}
+    assert idx.search_word("apple") == {1: 1, 2: 1}
+
+    idx.drop_library(1)
+    assert idx.search_word("apple", library_id=1) == {}
+    assert idx.search_word("apple") == {1: 1}
+
+
+@pytest.mark.parametrize("scoring", ["count", "bm25"])
+def test_top_k_matches_exhaustive_scoring(scoring):
+    rng = np.random.default_rng(0)
+    vocab = [f"w{i}" for i in range(200)]
+    idx = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(), scoring=scoring
+    )
+    for chunk_id in range(2000):
+        words = rng.zipf(1.3, int(rng.integers(5, 40))) % len(vocab)
+        idx.index_chunk(chunk_id, " ".join(vocab[w] for w in words), library_id=0)
+    queries = [" ".join(vocab[w] for w in rng.integers(0, 60, 4)) for _ in range(20)]
+    chunk_filter = ChunkFilter(excluded=range(0, 2000, 3))
+    for k in (1, 5, 50):
+        exhaustive = idx.search_words(queries, chunk_filter, library_id=0)
+        top = idx.search_words(queries, chunk_filter, library_id=0, k=k)
+        for full, best in zip(exhaustive, top):
+            expected = sorted(full.values(), reverse=True)[:k]
+            assert list(best.values()) == pytest.approx(expected)
+            assert all(
+                full[chunk_id] == pytest.approx(score)
+                for chunk_id, score in best.items()
+            )
+
+
+def test_single_term_top_k_skips_posting_blocks(monkeypatch):
+    idx = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(), scoring="bm25"
+    )
+    for chunk_id in range(5000):
+        repeats = 6 if chunk_id % 1000 == 7 else 1
+        idx.index_chunk(
+            chunk_id, " ".join(["apple"] * repeats + ["filler"] * 8), library_id=0
+        )
+    idx.index_chunk(5000, "apple " + "filler " * 9, library_id=0)
+    exhaustive = idx.search_word("apple", library_id=0)
+
+    scored = set()
+    score = InvertedIndex._scores
+    monkeypatch.setattr(
+        InvertedIndex,
+        "_scores",
+        lambda self, partition, idf, chunk_ids, frequencies: (
+            scored.update(chunk_ids.tolist())
+            or score(self, partition, idf, chunk_ids, frequencies)
+        ),
+    )
+    top = idx.search_word("apple", library_id=0, k=5)
+    assert list(top.values()) == pytest.approx(
+        sorted(exhaustive.values(), reverse=True)[:5]
+    )
+    assert set(top) == {7, 1007, 2007, 3007, 4007}
+    assert 0 < len(scored) < len(exhaustive) // 4
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_phrase_and_proximity_queries(compress):
+    idx = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(),
+        scoring="bm25",
+        compress=compress,
+        positions=True,
+    )
+    idx.index_chunk(1, "machine learning models learn", library_id=0)
+    idx.index_chunk(2, "learning about the machine", library_id=0)
+    idx.index_chunk(3, "a machine for deep learning", library_id=0)
+    idx.merge()
+    idx.index_chunk(4, "Machine learning, machine learning!", library_id=0)
+
+    assert set(idx.search_word('"machine learning"')) == {1, 4}
+    res = idx.search_word('"machine learning"', k=2)
+    assert list(res) == [4, 1]
+    assert set(idx.search_word("machine NEAR/1 learning")) == {1, 4}
+    assert set(idx.search_word("machine NEAR/3 learning")) == {1, 2, 3, 4}
+    assert set(idx.search_word('"deep learning" NEAR/3 machine')) == {3}
+    assert set(idx.search_word('"machine learning" models')) == {1, 4}
+
+    idx.remove_chunk(4, library_id=0)
+    assert set(idx.search_word('"machine learning"')) == {1}
+
+
+def test_phrase_without_positions_matches_all_words():
+    idx = InvertedIndex(tokenization_strategy=DefaultTokenizationStrategy())
+    idx.index_chunk(1, "machine learning", library_id=0)
+    idx.index_chunk(2, "learning about the machine", library_id=0)
+    idx.index_chunk(3, "machine", library_id=0)
+    assert set(idx.search_word('"machine learning"')) == {1, 2}
+
+
+def test_boolean_queries_follow_set_algebra():
+    rng = np.random.default_rng(1)
+    vocab = [f"w{i}" for i in range(30)]
+    idx = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(), scoring="bm25"
+    )
+    chunks = {}
+    for chunk_id in range(500):
+        words = {vocab[w] for w in rng.zipf(1.5, 8) % len(vocab)}
+        chunks[chunk_id] = words
+        idx.index_chunk(chunk_id, " ".join(words), library_id=0)
+
+    def having(word):
+        return {c for c, words in chunks.items() if word in words}
+
+    w0, w1, w2, w5 = having("w0"), having("w1"), having("w2"), having("w5")
+    cases = {
+        "w0 AND w1": w0 & w1,
+        "w0 AND (w1 OR w5) NOT w2": (w0 & (w1 | w5)) - w2,
+        "(w1 OR w5) AND NOT w0": (w1 | w5) - w0,
+        "w1 w5 NOT w2": (w1 | w5) - w2,
+        "NOT w0": set(),
+    }
+    for query, expected in cases.items():
+        assert set(idx.search_word(query)) == expected, query
+        top = idx.search_word(query, k=10)
+        full = idx.search_word(query)
+        assert list(top.values()) == pytest.approx(
+            sorted(full.values(), reverse=True)[:10]
+        )
+    assert set(idx.search_word("w0 AND w1", ChunkFilter(allowed=range(100)))) == {
+        c for c in w0 & w1 if c < 100
+    }
+
+
+def test_wildcard_queries_expand_through_the_term_dictionary():
+    idx = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(),
+        scoring="bm25",
+        positions=True,
+    )
+    idx.index_chunk(1, "learning to rank", library_id=0)
+    idx.index_chunk(2, "the learner learns", library_id=0)
+    idx.index_chunk(3, "earning money", library_id=0)
+    assert set(idx.search_word("Learn*")) == {1, 2}
+    assert set(idx.search_word("*earning")) == {1, 3}
+    assert set(idx.search_word("learn* AND NOT *ing")) == {2}
+    assert set(idx.search_word("lea* NEAR/1 rank")) == set()
+    assert set(idx.search_word("lea* NEAR/2 rank")) == {1}
+
+    idx.remove_chunk(1, library_id=0)
+    assert set(idx.search_word("*earning")) == {3}
+
+
+def test_wildcard_literals_the_analyzer_drops_are_kept():
+    idx = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(), max_expansions=1
+    )
+    idx.set_analyzer(0, "english")
+    idx.index_chunk(1, "a theory of everything", library_id=0)
+    idx.index_chunk(2, "an apple", library_id=0)
+    # "the" is an english stopword; the pattern must not collapse to "*".
+    assert set(idx.search_word("The*", library_id=0)) == {1}
+    assert idx.search_word("--*", library_id=0) == {}
+    with pytest.raises(ValidationError):
+        idx.search_word("**", library_id=0)
+
+
+def test_fuzzy_queries_match_terms_within_the_edit_distance():
+    idx = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(),
+        scoring="bm25",
+        positions=True,
+    )
+    idx.index_chunk(1, "retrieval augmented generation", library_id=0)
+    idx.index_chunk(2, "information retrieval systems", library_id=0)
+    idx.index_chunk(3, "generative models", library_id=0)
+    assert idx.search_word("retreival", library_id=0) == {}
+    assert set(idx.search_word("retreival~", library_id=0)) == {1, 2}
+    assert set(idx.search_word("retreival~1", library_id=0)) == set()
+    assert set(idx.search_word("retreival generaton", library_id=0, fuzziness=2)) == {
+        1,
+        2,
+    }
+    assert set(idx.search_word('"retreival"', library_id=0, fuzziness=2)) == set()
+    assert set(idx.search_word("informaton~ NEAR/1 retrieval", library_id=0)) == {2}
+
+    exact, typo = (
+        idx.search_word("systems", library_id=0),
+        idx.search_word("systemz~1", library_id=0),
+    )
+    assert typo[2] == pytest.approx(exact[2] / 2)
+    assert idx.search_word("systemz~1", library_id=0, k=1) == typo
+
+    idx.remove_chunk(2, library_id=0)
+    assert set(idx.search_word("retreival~", library_id=0)) == {1}
+    assert idx.search_word("systemz~1", library_id=0) == {}
+
+
+@pytest.mark.parametrize("positions", [False, True])
+def test_reindexing_a_chunk_matches_a_fresh_index(positions):
+    texts = {1: "apple banana cherry", 2: "banana banana durian", 3: "cherry apple"}
+    edited = {**texts, 2: "banana apple apple fig", 3: "cherry apple"}
+    idx = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(),
+        scoring="bm25",
+        positions=positions,
+    )
+    fresh = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(),
+        scoring="bm25",
+        positions=positions,
+    )
+    for chunk_id, text in texts.items():
+        idx.index_chunk(chunk_id, text, library_id=0)
+    for chunk_id, text in edited.items():
+        idx.index_chunk(chunk_id, text, library_id=0)
+        fresh.index_chunk(chunk_id, text, library_id=0)
+    for query in ("apple", "banana", "durian", "fig", '"banana apple"'):
+        assert idx.search_word(query, library_id=0) == pytest.approx(
+            fresh.search_word(query, library_id=0)
+        )
+        assert idx.search_word(query, library_id=0, k=1) == pytest.approx(
+            fresh.search_word(query, library_id=0, k=1)
+        )
+
+    idx.remove_chunk(2, library_id=0)
+    assert idx.search_word("fig", library_id=0) == {}
+    assert "fig" not in idx.partitions[0].vocabulary
+
+
+def test_libraries_analyze_with_their_own_pipeline():
+    english = ANALYZERS["english"]
+    texts = [
+        "The Naïve queries, indexes and classes",
+        "ﬁne “quoted” Straße",
+        "",
+        "a\x00b",
+    ]
+    assert english.tokenize_many(texts) == [english.terms(text) for text in texts]
+    assert english.terms(texts[0]) == ["naive", "query", "indexe", "classe"]
+    assert ANALYZERS["standard"].terms(texts[1]) == ["fine", "quoted", "strasse"]
+    assert ANALYZERS["standard"].terms("a\u2028b\u2029c—d") == ["a", "b", "cd"]
+    default = DefaultTokenizationStrategy()
+    assert default.tokenize_many(texts) == [default.terms(text) for text in texts]
+
+    idx = InvertedIndex(tokenization_strategy=default, scoring="bm25")
+    idx.set_analyzer(1, "english")
+    idx.index_chunks([(1, texts[0]), (2, "the query")], library_id=1)
+    idx.index_chunk(3, texts[0], library_id=2)
+    assert set(idx.search_word("naive QUERY", library_id=1)) == {1, 2}
+    assert idx.search_word("the", library_id=1) == {}
+    assert set(idx.search_word("the")) == {3}
+    assert "the" not in idx.partitions[1].vocabulary
+
+    idx.set_analyzer(1, "default")
+    assert idx.search_word("query", library_id=1) == {}
+
+
+def test_switching_analyzers_swaps_in_a_reindexed_partition():
+    idx = InvertedIndex(
+        tokenization_strategy=DefaultTokenizationStrategy(), scoring="bm25"
+    )
+    idx.index_chunks([(1, "running queries"), (2, "the query")], library_id=1)
+
+    def chunks():
+        # Searches still use the old pipeline and postings while re-indexing,
+        # and writes meanwhile reach the new partition too.
+        assert set(idx.search_word("running", library_id=1)) == {1}
+        idx.index_chunk(3, "indexed queries", library_id=1)
+        idx.remove_chunk(2, library_id=1)
+        return [(1, "running queries"), (2, "the query")]
+
+    idx.set_analyzer(1, "english", chunks)
+    assert set(idx.search_word("query", library_id=1)) == {1, 3}
+    assert set(idx.partitions[1].forward) == {1, 3}
+    assert idx.search_word("the", library_id=1) == {}
+    assert not idx._journals
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_snapshot_round_trip_matches_the_live_index(tmp_path, compress):
+    def new_index(positions=True):
+        return InvertedIndex(
+            tokenization_strategy=DefaultTokenizationStrategy(),
+            scoring="bm25",
+            compress=compress,
+            positions=positions,
+        )
+
+    idx = new_index()
+    idx.set_analyzer(2, "english")
+    idx.index_chunks(
+        [(1, "apple banana cherry"), (2, "banana cherry banana"), (5, "durian apple")],
+        library_id=1,
+    )
+    idx.index_chunks([(3, "The queries and indexes")], library_id=2)
+    idx.index_chunk(4, "banana split")
+    idx.remove_chunk(2, library_id=1)
+    path = str(tmp_path / "keyword.snapshot")
+    idx.save_snapshot(path, 123)
+
+    loaded = new_index()
+    assert loaded.load_snapshot(path) == 123
+    queries = ["apple", "banana", '"banana cherry"', "appel~", "ban*", "query", "the"]
+    for library_id in (1, 2, None):
+        for query in queries:
+            assert loaded.search_word(query, library_id=library_id) == pytest.approx(
+                idx.search_word(query, library_id=library_id)
+            )
+            assert loaded.search_word(
+                query, library_id=library_id, k=1
+            ) == pytest.approx(idx.search_word(query, library_id=library_id, k=1))
+
+    for index in (idx, loaded):
+        index.index_chunk(1, "fig apple", library_id=1)
+        index.index_chunk(6, "apple apple", library_id=1)
+        index.remove_chunk(5, library_id=1)
+        index.merge()
+    for query in ("apple", "fig", "durian", '"fig apple"'):
+        assert loaded.search_word(query, library_id=1) == pytest.approx(
+            idx.search_word(query, library_id=1)
+        )
+
+    assert new_index(positions=False).load_snapshot(path) is None
+    assert new_index().load_snapshot(str(tmp_path / "missing.snapshot")) is None
@@ -0,0 +1,125 @@
+import threading
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from app.core.config import Settings
+from app.db.vector_store import VectorStore
+from app.db.ivf_index import IvfIndex
+from app.schemas.search import SearchOptions
+
+
+def _clustered(n=600, d=8, centers=6, seed=0):
+    rng = np.random.default_rng(seed)
+    means = rng.standard_normal((centers, d)) * 5
+    return means[rng.integers(0, centers, n)] + rng.standard_normal((n, d)), rng
+
+
+def test_ivf_trains_in_background_and_matches_exact_search():
+    vectors, rng = _clustered()
+    store = VectorStore(lock=threading.RLock())
+    index = IvfIndex(
+        store,
+        nlist=6,
+        nprobe=2,
+        min_train_size=500,
+        retrain_growth=2.0,
+        lock=threading.RLock(),
+    )
+    for chunk_id, vector in enumerate(vectors):
+        store.add(0, chunk_id, vector.tolist())
+        index.add(0, chunk_id, vector.tolist())
+    index.wait_for_training(0, timeout=30)
+    assert 0 in index.partitions
+
+    hits = 0
+    for query in vectors[:20]:
+        exact = {c for c, _ in store.search(0, query.tolist(), 5)}
+        approx = {
+            c for c, _ in index.search(0, query.tolist(), 5, SearchOptions(nprobe=3))
+        }
+        hits += len(exact & approx)
+    assert hits / 100 >= 0.9
+
+
+def test_ivf_falls_back_to_exact_search_and_tracks_deletes():
+    vectors, _ = _clustered(n=50)
+    store = VectorStore(lock=threading.RLock())
+    index = IvfIndex(
+        store,
+        nlist=4,
+        nprobe=1,
+        min_train_size=1000,
+        retrain_growth=2.0,
+        lock=threading.RLock(),
+    )
+    for chunk_id, vector in enumerate(vectors):
+        store.add(0, chunk_id, vector.tolist())
+        index.add(0, chunk_id, vector.tolist())
+    assert 0 not in index.partitions
+    assert index.search(0, vectors[7].tolist(), 1)[0][0] == 7
+
+    index.train(0)
+    assert index.search(0, vectors[7].tolist(), 1)[0][0] == 7
+    store.remove(0, 7)
+    index.remove(0, 7)
+    assert 7 not in {
+        c for c, _ in index.search(0, vectors[7].tolist(), 5, SearchOptions(nprobe=4))
+    }
+
+
+def test_ivf_skips_emptied_lists_when_probing():
+    vectors, _ = _clustered()
+    store = VectorStore(lock=threading.RLock())
+    index = IvfIndex(
+        store,
+        nlist=6,
+        nprobe=1,
+        min_train_size=500,
+        retrain_growth=2.0,
+        lock=threading.RLock(),
+    )
+    for chunk_id, vector in enumerate(vectors):
+        store.add(0, chunk_id, vector.tolist())
+        index.add(0, chunk_id, vector.tolist())
+    index.wait_for_training(0, timeout=30)
+    partition = index.partitions[0]
+    emptied = partition.assignments[0]
+    for chunk_id, label in list(partition.assignments.items()):
+        if label == emptied:
+            store.remove(0, chunk_id)
+            index.remove(0, chunk_id)
+    assert len(index.search(0, vectors[0].tolist(), 3)) == 3
+
+
+def test_settings_reject_retrain_growth_that_retrains_every_write():
+    with pytest.raises(ValidationError):
+        Settings(COHERE_API_KEY="test", IVF_RETRAIN_GROWTH=1.0, _env_file=None)
+
+
+def test_drop_library_discards_the_partition_and_training_in_flight(monkeypatch):
+    vectors, _ = _clustered()
+    store = VectorStore(lock=threading.RLock())
+    index = IvfIndex(
+        store,
+        nlist=6,
+        nprobe=1,
+        min_train_size=500,
+        retrain_growth=2.0,
+        lock=threading.RLock(),
+    )
+    for chunk_id, vector in enumerate(vectors):
+        store.add(0, chunk_id, vector.tolist())
+        index.add(0, chunk_id, vector.tolist())
+    index.wait_for_training(0, timeout=30)
+    get_vectors = store.get_vectors
+
+    def get_vectors_then_drop(library_id):
+        snapshot = get_vectors(library_id)
+        store.drop_library(library_id)
+        index.drop_library(library_id)
+        return snapshot
+
+    monkeypatch.setattr(store, "get_vectors", get_vectors_then_drop)
+    index.train(0)
+    assert 0 not in index.partitions
+    assert not index._pending and not index._training
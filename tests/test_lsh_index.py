@@ -0,0 +1,70 @@
+import threading
+import numpy as np
+from app.core.filters import ChunkFilter
+from app.db.lsh_index import LshIndex, LshTables
+from app.db.vector_store import VectorStore
+from app.schemas.search import SearchOptions
+
+
+def _build(n=2000, d=32, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, d)).astype(np.float32)
+    store = VectorStore(lock=threading.RLock())
+    index = LshIndex(
+        store, n_bits=128, candidates=200, lock=threading.RLock(), n_tables=4
+    )
+    for chunk_id, vector in enumerate(vectors):
+        store.add(0, chunk_id, vector.tolist())
+        index.add(0, chunk_id, vector.tolist())
+    return store, index, vectors, rng
+
+
+def test_lsh_recall_against_exact_search():
+    store, index, vectors, rng = _build()
+    hits = 0
+    queries = vectors[rng.choice(len(vectors), 30)] + 0.5 * rng.standard_normal(
+        (30, 32)
+    )
+    for query in queries:
+        exact = {c for c, _ in store.search(0, query.tolist(), 5)}
+        approx = index.search(0, query.tolist(), 5, SearchOptions(lsh_candidates=400))
+        hits += len(exact & {c for c, _ in approx})
+    assert hits / (5 * len(queries)) >= 0.9
+
+
+def test_lsh_scores_are_exact_and_updates_are_incremental():
+    store, index, vectors, _ = _build(n=300)
+    query = vectors[7].tolist()
+    assert index.search(0, query, 1)[0] == store.search(0, query, 1)[0]
+
+    target = [0.0] * 31 + [1.0]
+    store.add(0, 7, target)
+    index.add(0, 7, target)
+    assert index.search(0, target, 1)[0][0] == 7
+    store.remove(0, 7)
+    index.remove(0, 7)
+    assert 7 not in {c for c, _ in index.search(0, target, 10)}
+
+    allowed = index.search(0, query, 5, chunk_filter=ChunkFilter(allowed={3, 4}))
+    assert {c for c, _ in allowed} == {3, 4}
+
+
+def test_lsh_candidates_are_the_union_of_each_tables_nearest():
+    store, index, vectors, _ = _build(n=500)
+    tables = index.tables[0]
+    query = vectors[11]
+    candidates = set(tables.nearest(query, 10).tolist())
+    single = LshTables(32, 128, seed=0)
+    single.hyperplanes = tables.hyperplanes[:128]
+    for chunk_id, vector in enumerate(vectors):
+        single.block.upsert(chunk_id, single.signature(vector / np.linalg.norm(vector)))
+    assert set(single.nearest(query, 10).tolist()) <= candidates
+    assert 10 < len(candidates) <= 40
+    assert len(index.search(0, query.tolist(), 5, SearchOptions(lsh_candidates=8))) == 5
+
+
+def test_drop_library_releases_the_tables():
+    store, index, vectors, _ = _build(n=50)
+    index.drop_library(0)
+    assert 0 not in index.tables
+    assert index.search(0, vectors[0].tolist(), 5) == []
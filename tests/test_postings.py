@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from app.core.filters import ChunkFilter
+from app.core.math_utils import intersect_sorted
+from app.db.postings import PostingList, decode_varint, encode_varint
+
+
+def test_varint_round_trip():
+    values = np.array(
+        [0, 1, 127, 128, 16383, 16384, 2**21, 2**28, 2**32 - 1], dtype=np.uint32
+    )
+    data = encode_varint(values)
+    assert len(data) == 1 + 1 + 1 + 2 + 2 + 3 + 4 + 5 + 5
+    assert decode_varint(data).tolist() == values.tolist()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_posting_list_matches_dict_across_merges(compress):
+    rng = np.random.default_rng(0)
+    postings = PostingList(compress)
+    expected = {}
+    for _ in range(3000):
+        chunk_id = int(rng.integers(0, 500))
+        if rng.random() < 0.3:
+            assert postings.remove(chunk_id) == (
+                expected.pop(chunk_id, None) is not None
+            )
+        else:
+            frequency = int(rng.integers(1, 300))
+            postings.add(chunk_id, frequency)
+            expected[chunk_id] = frequency
+        assert len(postings) == len(expected)
+
+    ids, frequencies = postings.arrays()
+    assert ids.tolist() == sorted(expected)
+    assert frequencies.tolist() == [expected[c] for c in sorted(expected)]
+    postings.merge()
+    assert postings.arrays()[0].tolist() == sorted(expected)
+
+
+def test_merge_freezes_postings_compactly():
+    postings = PostingList(compress=True)
+    for chunk_id in range(10000):
+        postings.add(chunk_id, 1)
+    postings.merge()
+    assert len(postings._ids) + len(postings._frequencies) == 20000
+    assert postings.arrays()[0].tolist() == list(range(10000))
+
+
+def test_sorted_intersection_and_filter_mask():
+    a = np.array([1, 3, 5, 7, 9], dtype=np.uint32)
+    b = np.arange(0, 1000, 3, dtype=np.uint32)
+    assert intersect_sorted(a, b).tolist() == [3, 9]
+    assert ChunkFilter(allowed=[5, 9, 11]).mask(a).tolist() == [
+        False,
+        False,
+        True,
+        False,
+        True,
+    ]
+    assert ChunkFilter(excluded=[1]).mask(a).tolist() == [False, True, True, True, True]
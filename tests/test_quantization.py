@@ -0,0 +1,175 @@
+import os
+import threading
+import numpy as np
+import pytest
+from app.db.vector_store import VectorStore
+from app.db.quantization import PqBlock
+from app.core.exceptions import ValidationError
+from app.schemas.search import SearchOptions
+
+
+def _vectors(n=400, d=32, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n, d)).astype(np.float32)
+
+
+def test_pq_block_encodes_after_training_and_reranks(tmp_path):
+    vectors = _vectors()
+    store = VectorStore(
+        lock=threading.RLock(),
+        data_dir=str(tmp_path),
+        pq_m=8,
+        quantization_min_train_size=300,
+        rerank=50,
+    )
+    store.set_storage(0, "pq")
+    for chunk_id, vector in enumerate(vectors):
+        store.add(0, chunk_id, vector.tolist())
+    store.wait_for_training(0)
+    block = store.libraries[0]
+    path = str(tmp_path / "library_0.f32")
+    assert block.trained
+    assert block.codes.dtype == np.uint8 and block.codes.shape[0] == 8
+    assert os.path.exists(path)
+
+    query = vectors[3] / np.linalg.norm(vectors[3])
+    assert block.search(query, 1)[0] == (3, pytest.approx(1.0, abs=1e-5))
+    coarse = block.search(query, 10, SearchOptions(rerank=0))
+    assert 3 in {chunk_id for chunk_id, _ in coarse}
+
+    block.remove(3)
+    assert 3 not in {chunk_id for chunk_id, _ in block.search(query, 10)}
+    store.drop_library(0)
+    assert not os.path.exists(path)
+    assert 0 not in store.storage_modes
+
+
+def test_pq_training_reencodes_rows_written_meanwhile():
+    vectors = _vectors()
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    block = PqBlock(32, m=8, min_train_size=300, rerank=50)
+    for chunk_id, vector in enumerate(vectors[:300]):
+        block.upsert(chunk_id, vector)
+    assert block.needs_training and not block.trained
+
+    codec = block.fit(block.training_sample())
+    chunk_ids, originals = block.copy_rows(0)
+    codes = block.quantize(codec, originals)
+    block.upsert(5, vectors[350])
+    block.upsert(301, vectors[301])
+    block.install(codec, chunk_ids, codes)
+
+    assert block.trained
+    for chunk_id, vector in ((5, vectors[350]), (301, vectors[301]), (7, vectors[7])):
+        row = block.rows[chunk_id]
+        assert (block.codes[:, row] == codec.encode(vector[None, :])[:, 0]).all()
+
+
+def test_vector_store_converts_between_storage_modes(tmp_path):
+    vectors = _vectors(n=50)
+    store = VectorStore(
+        lock=threading.RLock(),
+        data_dir=str(tmp_path),
+        pq_m=4,
+        quantization_min_train_size=20,
+    )
+    for chunk_id, vector in enumerate(vectors):
+        store.add(0, chunk_id, vector.tolist())
+    exact = store.search(0, vectors[7].tolist(), 5)
+
+    store.set_storage(0, "pq")
+    assert isinstance(store.libraries[0], PqBlock)
+    assert store.search(0, vectors[7].tolist(), 5) == [
+        (c, pytest.approx(s, abs=1e-5)) for c, s in exact
+    ]
+
+    store.set_storage(0, "float32")
+    assert store.search(0, vectors[7].tolist(), 1)[0][0] == 7
+
+
+def test_pq_strategy_requires_pq_library(test_container):
+    from app.schemas.library import LibraryCreate
+    from app.schemas.document import DocumentCreate
+    from app.schemas.chunk import ChunkCreate, ChunkUpdate
+
+    library_service = test_container.services.library_service()
+    document_service = test_container.services.document_service()
+    chunk_service = test_container.services.chunk_service()
+    search_service = test_container.services.search_service()
+
+    plain = library_service.create_library(LibraryCreate(name="plain"))
+    with pytest.raises(ValidationError):
+        search_service.search("pq", plain.id, "query", k=1)
+
+    lib = library_service.create_library(
+        LibraryCreate(name="compact", vector_storage="pq")
+    )
+    doc = document_service.create_document(
+        DocumentCreate(name="doc", library_id=lib.id)
+    )
+    chunk = chunk_service.create_chunk(ChunkCreate(text="a", document_id=doc.id))
+    chunk_service.update_chunk(chunk.id, ChunkUpdate(embedding=[1.0, 0.0]))
+    assert search_service.search("pq", lib.id, "query", k=1)[0].chunk.id == chunk.id
+    assert search_service.search("knn", lib.id, "query", k=1)[0].chunk.id == chunk.id
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_scalar_quantized_storage_rescores_exactly(tmp_path, storage):
+    vectors = _vectors(n=300)
+    store = VectorStore(
+        lock=threading.RLock(),
+        data_dir=str(tmp_path),
+        quantization_min_train_size=100,
+        rerank=20,
+    )
+    reference = VectorStore(lock=threading.RLock())
+    store.set_storage(0, storage)
+    for chunk_id, vector in enumerate(vectors):
+        store.add(0, chunk_id, vector.tolist())
+        reference.add(0, chunk_id, vector.tolist())
+    store.wait_for_training(0)
+    block = store.libraries[0]
+    assert block.trained and block.codes.dtype == np.dtype(storage)
+
+    for query in vectors[:10]:
+        expected = reference.search(0, query.tolist(), 5)
+        actual = store.search(0, query.tolist(), 5)
+        assert [c for c, _ in actual] == [c for c, _ in expected]
+        assert [s for _, s in actual] == pytest.approx(
+            [s for _, s in expected], abs=1e-5
+        )
+
+
+def test_quantized_library_chunks_do_not_keep_embeddings(test_container):
+    from app.schemas.library import LibraryCreate, LibraryUpdate
+    from app.schemas.document import DocumentCreate
+    from app.schemas.chunk import ChunkCreate, ChunkUpdate
+
+    library_service = test_container.services.library_service()
+    document_service = test_container.services.document_service()
+    chunk_service = test_container.services.chunk_service()
+    chunk_repository = test_container.db.chunk_repository()
+
+    lib = library_service.create_library(LibraryCreate(name="plain"))
+    doc = document_service.create_document(
+        DocumentCreate(name="doc", library_id=lib.id)
+    )
+    embedding = [3.0, -4.0, 0.5]
+    chunk = chunk_service.create_chunk(ChunkCreate(text="a", document_id=doc.id))
+    chunk_service.update_chunk(chunk.id, ChunkUpdate(embedding=embedding))
+    assert chunk_repository.chunks[chunk.id].embedding == embedding
+
+    library_service.update_library(lib.id, LibraryUpdate(vector_storage="int8"))
+    assert chunk_repository.chunks[chunk.id].embedding is None
+    assert chunk_service.get_chunk(chunk.id).embedding == pytest.approx(
+        embedding, rel=1e-6
+    )
+
+    other = chunk_service.create_chunk(ChunkCreate(text="b", document_id=doc.id))
+    assert chunk_service.update_chunk(
+        other.id, ChunkUpdate(embedding=[1.0, 2.0, 2.0])
+    ).embedding == pytest.approx([1.0, 2.0, 2.0])
+    assert chunk_repository.chunks[other.id].embedding is None
+    assert chunk_service.get_chunks_by_library(lib.id)[1].embedding == pytest.approx(
+        [1.0, 2.0, 2.0]
+    )
@@ -1,3 +1,4 @@
+import pytest
 from app.schemas.library import LibraryCreate
 from app.schemas.document import DocumentCreate
 from app.schemas.chunk import ChunkCreate
@@ -42,3 +43,97 @@ def test_search_keyword_and_knn(test_container):
     assert knn[0].chunk is not None
     assert knn[0].score is not None
     assert knn[0].chunk.id == c1.id
+
+
+def test_search_filters_by_document_and_chunk(test_container):
+    library_service = test_container.services.library_service()
+    document_service = test_container.services.document_service()
+    chunk_service = test_container.services.chunk_service()
+    search_service = test_container.services.search_service()
+
+    from app.schemas.chunk import ChunkUpdate
+    from app.schemas.search import SearchOptions
+
+    lib = library_service.create_library(LibraryCreate(name="lib1"))
+    docs = [
+        document_service.create_document(DocumentCreate(name=f"doc{i}", library_id=lib.id))
+        for i in range(2)
+    ]
+    chunks = []
+    for doc in docs:
+        for j in range(3):
+            chunk = chunk_service.create_chunk(ChunkCreate(text="shared words", document_id=doc.id))
+            chunk_service.update_chunk(chunk.id, ChunkUpdate(embedding=[1.0, float(j)]))
+            chunks.append(chunk)
+
+    only_second = SearchOptions(document_ids=[docs[1].id])
+    without_first = SearchOptions(exclude_document_ids=[docs[0].id])
+    for strategy in ("keyword", "knn", "hnsw"):
+        for options in (only_second, without_first):
+            results = search_service.search(strategy, lib.id, "shared", k=10, options=options)
+            assert {r.chunk.document_id for r in results} == {docs[1].id}
+            assert len(results) == 3
+
+    picked = SearchOptions(document_ids=[docs[0].id], chunk_ids=[chunks[1].id, chunks[4].id])
+    results = search_service.search("knn", lib.id, "shared", k=10, options=picked)
+    assert [r.chunk.id for r in results] == [chunks[1].id]
+
+
+def test_hybrid_search_fuses_keyword_and_vector_results(test_container):
+    library_service = test_container.services.library_service()
+    document_service = test_container.services.document_service()
+    chunk_service = test_container.services.chunk_service()
+    search_service = test_container.services.search_service()
+
+    from app.schemas.chunk import ChunkUpdate
+    from app.schemas.search import SearchOptions
+
+    lib = library_service.create_library(LibraryCreate(name="lib1"))
+    doc = document_service.create_document(DocumentCreate(name="doc1", library_id=lib.id))
+    # The stubbed query embedding is [1, 0]: "near" wins the vector side, "apple" the keyword side.
+    near = chunk_service.create_chunk(ChunkCreate(text="unrelated text", document_id=doc.id))
+    both = chunk_service.create_chunk(ChunkCreate(text="apple apple", document_id=doc.id))
+    keyword_only = chunk_service.create_chunk(ChunkCreate(text="apple pie", document_id=doc.id))
+    chunk_service.update_chunk(near.id, ChunkUpdate(embedding=[1.0, 0.0]))
+    chunk_service.update_chunk(both.id, ChunkUpdate(embedding=[1.0, 0.2]))
+    chunk_service.update_chunk(keyword_only.id, ChunkUpdate(embedding=[-1.0, 0.0]))
+
+    rrf = search_service.search("hybrid", lib.id, "apple", k=3)
+    assert rrf[0].chunk.id == both.id
+    assert {r.chunk.id for r in rrf} == {near.id, both.id, keyword_only.id}
+
+    vector_only = search_service.search(
+        "hybrid", lib.id, "apple", k=3, options=SearchOptions(keyword_weight=0)
+    )
+    assert [r.chunk.id for r in vector_only] == [near.id, both.id, keyword_only.id]
+
+    weighted = search_service.search(
+        "hybrid", lib.id, "apple", k=3, options=SearchOptions(fusion="weighted", vector_weight=0.1)
+    )
+    # Min-max normalized: "both" tops the keyword side (1.0) and is nearly tied
+    # with "near" on the vector side (0.99), "keyword_only" is last on both.
+    assert [r.chunk.id for r in weighted] == [both.id, near.id, keyword_only.id]
+    assert [r.score for r in weighted] == pytest.approx([1.0 + 0.1 * 0.99029, 0.1, 0.0], abs=1e-4)
+
+
+def test_deleting_a_library_drops_it_from_every_vector_index(test_container):
+    library_service = test_container.services.library_service()
+    document_service = test_container.services.document_service()
+    chunk_service = test_container.services.chunk_service()
+    search_service = test_container.services.search_service()
+    db = test_container.db
+
+    from app.schemas.chunk import ChunkUpdate
+
+    lib = library_service.create_library(LibraryCreate(name="lib1"))
+    doc = document_service.create_document(DocumentCreate(name="doc1", library_id=lib.id))
+    chunk = chunk_service.create_chunk(ChunkCreate(text="apple", document_id=doc.id))
+    chunk_service.update_chunk(chunk.id, ChunkUpdate(embedding=[1.0, 0.0]))
+    search_service.search("hnsw", lib.id, "apple", k=1)
+    db.hnsw_index().wait_for_build(lib.id, timeout=30)
+    assert lib.id in db.hnsw_index().graphs and lib.id in db.lsh_index().tables
+
+    library_service.delete_library(lib.id)
+    assert lib.id not in db.hnsw_index().graphs
+    assert lib.id not in db.lsh_index().tables
+    assert db.vector_store().count(lib.id) == 0
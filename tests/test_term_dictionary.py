@@ -0,0 +1,37 @@
+from app.db.term_dictionary import TermDictionary
+
+
+def test_expand_prefix_suffix_and_single_character_wildcards():
+    terms = TermDictionary()
+    for term in [
+        "learn",
+        "learned",
+        "learning",
+        "lean",
+        "earning",
+        "yearning",
+        "clean",
+    ]:
+        terms.add(term)
+    assert terms.expand("learn*", 10) == ["learn", "learned", "learning"]
+    assert sorted(terms.expand("*earning", 10)) == ["earning", "learning", "yearning"]
+    assert terms.expand("lea?", 10) == ["lean"]
+    assert sorted(terms.expand("*ea*n", 10)) == ["clean", "lean", "learn"]
+    assert terms.expand("learn*", 2) == ["learn", "learned"]
+    assert terms.expand("lean", 10) == ["lean"]
+
+    terms.remove("learned")
+    terms.add("learner")
+    assert terms.expand("learn*", 10) == ["learn", "learner", "learning"]
+    assert len(terms) == 7
+
+
+def test_bulk_changes_rebuild_the_sorted_lists():
+    terms = TermDictionary()
+    for i in range(3000):
+        terms.add(f"t{i:04d}")
+    assert terms.expand("t000*", 100) == [f"t{i:04d}" for i in range(10)]
+    for i in range(0, 3000, 2):
+        terms.remove(f"t{i:04d}")
+    assert sorted(terms.expand("*1", 1000)) == [f"t{i:04d}" for i in range(1, 3000, 10)]
+    assert len(terms) == 1500
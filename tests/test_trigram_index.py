@@ -0,0 +1,74 @@
+import random
+from app.db.trigram_index import TrigramIndex, bounded_levenshtein, trigrams
+
+
+def _levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, start=1):
+        current = [i]
+        for j, other in enumerate(b, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char != other),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def test_bounded_levenshtein_matches_the_dynamic_program():
+    rng = random.Random(0)
+    for _ in range(2000):
+        a = "".join(rng.choices("abc", k=rng.randint(0, 8)))
+        b = "".join(rng.choices("abc", k=rng.randint(0, 8)))
+        distance = _levenshtein(a, b)
+        for max_distance in range(4):
+            expected = distance if distance <= max_distance else None
+            assert bounded_levenshtein(a, b, max_distance) == expected
+
+
+def test_similar_finds_every_term_within_the_edit_distance():
+    rng = random.Random(1)
+    terms = {"".join(rng.choices("abcde", k=rng.randint(3, 9))) for _ in range(3000)}
+    index = TrigramIndex()
+    for term in terms:
+        index.add(term)
+    removed = set(rng.sample(sorted(terms), 1500))
+    for term in removed:
+        index.remove(term)
+    live = terms - removed
+
+    for word in rng.sample(sorted(terms), 50):
+        for max_edits in (1, 2):
+            found = index.similar(word, max_edits, limit=len(terms))
+            # Short words get fewer edits so that matches share two trigrams.
+            allowed = min(max_edits, (len(set(trigrams(word))) - 2) // 3)
+            expected = sorted(
+                (_levenshtein(word, term), term)
+                for term in live
+                if _levenshtein(word, term) <= allowed
+            )
+            assert found == [(term, distance) for distance, term in expected]
+    assert index.similar("ab", 2, limit=10) == ([("ab", 0)] if "ab" in live else [])
+
+
+def test_removing_most_terms_rebuilds_with_only_the_live_ones():
+    rng = random.Random(2)
+    terms = sorted(
+        {"".join(rng.choices("abcde", k=rng.randint(3, 9))) for _ in range(3000)}
+    )
+    index = TrigramIndex()
+    index.add_all(terms)
+    index.similar("abc", 1, 10)
+    removed = set(terms[: 2 * len(terms) // 3])
+    for term in removed:
+        index.remove(term)
+    assert len(index._terms) < len(terms)
+    live = [term for term in terms if term not in removed]
+    for word in rng.sample(terms, 20):
+        expected = sorted(
+            (_levenshtein(word, t), t) for t in live if _levenshtein(word, t) <= 1
+        )
+        assert index.similar(word, 1, len(live)) == [(t, d) for d, t in expected]
@@ -0,0 +1,113 @@
+import threading
+import numpy as np
+import pytest
+from app.db.vector_blocks import VectorBlock
+from app.db.vector_store import VectorStore
+from app.core.exceptions import ValidationError
+from app.core.filters import ChunkFilter
+
+
+def test_search_returns_top_k_by_cosine():
+    store = VectorStore(lock=threading.RLock())
+    store.add(0, 1, [1.0, 0.0])
+    store.add(0, 2, [0.0, 2.0])
+    store.add(0, 3, [1.0, 1.0])
+    res = store.search(0, [3.0, 0.0], k=2)
+    assert [chunk_id for chunk_id, _ in res] == [1, 3]
+    assert res[0][1] == pytest.approx(1.0)
+
+
+def test_update_and_remove_keep_rows_consistent():
+    store = VectorStore(lock=threading.RLock())
+    for chunk_id in range(100):
+        store.add(0, chunk_id, [float(chunk_id), 1.0])
+    store.add(0, 5, [0.0, -1.0])
+    for chunk_id in range(0, 100, 2):
+        store.remove(0, chunk_id)
+    res = store.search(0, [0.0, -1.0], k=1)
+    assert res[0][0] == 5
+    ids = {chunk_id for chunk_id, _ in store.search(0, [1.0, 0.0], k=100)}
+    assert ids == set(range(1, 100, 2))
+
+
+def test_libraries_are_isolated_and_dimensions_checked():
+    store = VectorStore(lock=threading.RLock())
+    store.add(0, 1, [1.0, 0.0])
+    store.add(1, 2, [1.0, 0.0, 0.0])
+    assert [c for c, _ in store.search(1, [1.0, 0.0, 0.0], k=5)] == [2]
+    with pytest.raises(ValidationError):
+        store.add(0, 3, [1.0, 0.0, 0.0])
+    assert store.search(2, [1.0, 0.0], k=5) == []
+
+
+def test_search_batch_matches_single_queries():
+    rng = np.random.default_rng(0)
+    store = VectorStore(lock=threading.RLock())
+    for chunk_id, vector in enumerate(rng.standard_normal((200, 8))):
+        store.add(0, chunk_id, vector.tolist())
+    queries = rng.standard_normal((5, 8)).tolist()
+    batch = store.search_batch(0, queries, k=4)
+    assert len(batch) == 5
+    for query, results in zip(queries, batch):
+        single = store.search(0, query, k=4)
+        assert [c for c, _ in results] == [c for c, _ in single]
+        assert [s for _, s in results] == pytest.approx([s for _, s in single])
+    assert store.search_batch(1, queries, k=4) == [[] for _ in queries]
+
+
+def test_search_applies_chunk_filter_before_top_k():
+    store = VectorStore(lock=threading.RLock())
+    for chunk_id in range(50):
+        store.add(0, chunk_id, [1.0, chunk_id / 50])
+    query = [1.0, 0.0]
+    allowed = store.search(
+        0, query, k=3, chunk_filter=ChunkFilter(allowed={10, 40, 7, 999})
+    )
+    assert [c for c, _ in allowed] == [7, 10, 40]
+    excluded = store.search(0, query, k=2, chunk_filter=ChunkFilter(excluded={0, 1}))
+    assert [c for c, _ in excluded] == [2, 3]
+    assert store.search(0, query, k=3, chunk_filter=ChunkFilter(allowed=set())) == []
+
+
+def test_sharded_search_matches_single_scan():
+    rng = np.random.default_rng(1)
+    sharded = VectorStore(lock=threading.RLock(), search_threads=4, shard_min_rows=16)
+    single = VectorStore(lock=threading.RLock(), search_threads=1)
+    for chunk_id, vector in enumerate(rng.standard_normal((500, 8))):
+        sharded.add(0, chunk_id, vector.tolist())
+        single.add(0, chunk_id, vector.tolist())
+    chunk_filter = ChunkFilter(allowed=range(0, 500, 3))
+    for query in rng.standard_normal((5, 8)).tolist():
+        for f in (None, chunk_filter):
+            expected = single.search(0, query, 7, chunk_filter=f)
+            actual = sharded.search(0, query, 7, chunk_filter=f)
+            assert [c for c, _ in actual] == [c for c, _ in expected]
+            assert [s for _, s in actual] == pytest.approx([s for _, s in expected])
+
+
+def test_search_scans_outside_the_lock_and_rescans_after_an_update(monkeypatch):
+    store = VectorStore(lock=threading.RLock(), search_threads=1)
+    store.add(0, 1, [1.0, 0.0])
+    store.add(0, 2, [0.0, 1.0])
+    scanning, release = threading.Event(), threading.Event()
+    search = VectorBlock.search
+
+    def blocking_search(self, *args, **kwargs):
+        scanning.set()
+        release.wait(5)
+        return search(self, *args, **kwargs)
+
+    monkeypatch.setattr(VectorBlock, "search", blocking_search)
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.extend(store.search(0, [0.0, 1.0], k=1))
+    )
+    thread.start()
+    assert scanning.wait(5)
+    # Writes go through while the scan is running...
+    store.add(0, 2, [0.0, -1.0])
+    store.add(0, 3, [1.0, 1.0])
+    release.set()
+    thread.join(5)
+    # ...and the scan that saw chunk 2 before its update is redone.
+    assert [chunk_id for chunk_id, _ in results] == [3]